@@ -0,0 +1,54 @@
+# ConvertModels.spec
+# -*- mode: python; coding: utf-8 -*-
+# Separate bundle for convert_models.py (.h5 → .onnx), so TensorFlow never
+# ships in, or slows down, the tracker itself. Only needed when models change.
+
+packages = ['tensorflow', 'tf2onnx', 'onnx']
+datas = []
+binaries = []
+hiddenimports = []
+
+from PyInstaller.utils.hooks import collect_all
+from PyInstaller.building.build_main import Analysis, PYZ, EXE, COLLECT
+
+for pkg in packages:
+    d, b, h = collect_all(pkg)
+    datas.extend(d)
+    binaries.extend(b)
+    hiddenimports.extend(h)
+
+block_cipher = None
+
+a = Analysis(
+    ['convert_models.py'],
+    pathex=['.'],
+    binaries=binaries,
+    datas=datas,
+    hiddenimports=hiddenimports,
+    hookspath=[],
+    excludes=[],
+    noarchive=True,
+    optimize=0,
+)
+pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    exclude_binaries=True,
+    name='ConvertModels',
+    debug=False,
+    strip=False,
+    upx=False,
+    console=True,
+    icon='./images/deprivedlogo_transparentandwhitebackground.ico'
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name='ConvertModels',
+)
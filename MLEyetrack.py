@@ -1,48 +1,126 @@
 #!/usr/bin/env python3
-print("Loading... (Exe has to decompress first. I hate python and this slowness)")
-
 import os
-import json
 import time
 import logging
-import threading
-from queue import Queue, Empty
-import numpy as np
-import cv2
+import argparse
+import multiprocessing
+from queue import Queue
 from inference import InferenceTask
 from osc import OSCSenderTask
-from helpers import *
-from config import ConfigTask
-from capture import CaptureTask
+from config import ConfigTask, SharedConfig
+from capture import CaptureTask, FrameMailbox
 from cameras.CameraFactory import CameraFactory
+from cameras.FrameStore import FrameRecorder
+from cameras.JpegDecode import decode_pool
+from processes import StageSupervisor
+from server import start_server
+from stats import STATS, StatsServer
 
 # ----------------------------
-# Main
+# Pipeline
 # ----------------------------
-def main():    
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s", datefmt="%H:%M:%S")
-    shared_cfg = {}
-    cfg_lock = threading.Lock()
+class Pipeline:
+    """The running pieces of one tracker, as started by start_pipeline()."""
+    def __init__(self, config, mailbox, results, inference, capL, capR, capture, osc, recorders=()):
+        self.config = config
+        self.mailbox, self.results = mailbox, results
+        self.inference, self.capture, self.osc = inference, capture, osc
+        self.capL, self.capR = capL, capR
+        self.recorders = list(recorders)
+
+    def close(self):
+        for recorder in self.recorders:
+            recorder.close()
+
+    def reset_stats(self):
+        STATS.reset()
+
+    def sync_stats(self, timeout=2.0):
+        pass  # everything reports straight into STATS
+
+    def processes(self):
+        return {}
+
+class ProcessPipeline:
+    """start_pipeline() with "multiProcess": cameras and inference run in child processes (processes.py)."""
+    def __init__(self, config, results, supervisor, osc):
+        self.config = config
+        self.results = results
+        self.supervisor, self.osc = supervisor, osc
+
+    def close(self):
+        self.supervisor.stop()
+
+    def reset_stats(self):
+        self.supervisor.reset_stats()
+
+    def sync_stats(self, timeout=2.0):
+        """Wait for fresh STATS from every child process."""
+        self.supervisor.sync_stats(timeout)
+
+    def processes(self):
+        return self.supervisor.processes()
+
+def record_paths(cfg):
+    """{eye: .mjr path} when recordDir is set, else {}."""
+    if not cfg.get("recordDir"):
+        return {}
+    os.makedirs(cfg["recordDir"], exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return {eye: os.path.join(cfg["recordDir"], f"{stamp}-{side}.mjr") for eye, side in (("L", "left"), ("R", "right"))}
+
+def start_process_pipeline(config, cfg):
+    """Same pipeline, one process per camera and one for inference, frames through shared memory."""
+    results = Queue(maxsize=5)
+    paths = record_paths(cfg)
+    if cfg.get("lazyDecode", False):
+        logging.info("lazyDecode is for threads only, camera processes decode every frame into their ring")
+    cameras = {eye: {"source": cfg[key], "decodeMode": cfg.get("decodeMode", "color"),
+                     "chunkSize": cfg.get("mjpegChunkSize", 1024), "record": paths.get(eye)}
+               for eye, key in (("L", "leftEye"), ("R", "rightEye"))}
+    supervisor = StageSupervisor(config, results, cameras)
+    supervisor.start()
+
+    # models first, the supervisor starts the camera processes once they're loaded
+    while not supervisor.models_ready.wait(0.1):
+        pass
+    if supervisor.failed:
+        supervisor.stop()
+        raise RuntimeError(supervisor.failed)
+    logging.info("Models loaded, waiting for at least one camera to become ready…")
+    while not supervisor.primed.wait(0.1):
+        pass
+
+    osc = OSCSenderTask(results, config)
+    osc.start()
+    return ProcessPipeline(config, results, supervisor, osc)
+
+def start_pipeline(settings_path="./Settings.json"):
+    """Start config watcher, models, cameras, capture and OSC threads. Returns a Pipeline."""
+    config = SharedConfig()
 
     # start config watcher
-    ConfigTask("./Settings.json", shared_cfg, cfg_lock).start()
-    # wait for initial config
-    while True:
-        with cfg_lock:
-            if shared_cfg:
-                break
-        time.sleep(0.1)
-        
-    # Configs
-    with cfg_lock:
-        cfg = dict(shared_cfg)
+    ConfigTask(settings_path, config).start()
+    # wait for initial config (short waits so Ctrl-C still works)
+    cfg = None
+    while cfg is None:
+        cfg = config.wait(0.1)
 
-    # queues
-    qL, qR = Queue(maxsize=1), Queue(maxsize=1)
+    # local telemetry endpoint (JSON + Prometheus)
+    if cfg.get("statsPort", 0):
+        StatsServer(cfg["statsPort"]).start()
+
+    # process per stage instead of threads (GIL contention under two busy streams)
+    if cfg.get("multiProcess", False):
+        return start_process_pipeline(config, cfg)
+
+    # latest-frame mailbox (cameras → inference) and result queue
+    mailbox = FrameMailbox()
     results = Queue(maxsize=5)
 
     # Setup models before cameras
-    InferenceTask(cfg, qL, qR, results, shared_cfg, cfg_lock).start()
+    inference = InferenceTask(cfg, mailbox, results, config)
+    inference.start()
     logging.info("Models loaded and cameras ready.")
 
     # setup camera
@@ -50,8 +128,19 @@ def main():
     # capR = MJPEGVideoCapture(f"http://{cfg['rightEye']}"); capR.open()
     # capL = SystemCamera(0); capL.open()
     # capR = SystemCamera(1); capR.open()
-    capL = CameraFactory.get_camera_from_string_type(cfg['leftEye']); capL.open()
-    capR = CameraFactory.get_camera_from_string_type(cfg['rightEye']); capR.open()
+    decode_mode = cfg.get("decodeMode", "color")
+    chunk_size  = cfg.get("mjpegChunkSize", 1024)
+    # lazyDecode: cameras keep the newest JPEG, inference decodes what it takes (both eyes on the pool)
+    lazy = cfg.get("lazyDecode", False)
+    pool = decode_pool(cfg.get("decodeThreads", 1)) if lazy else None
+    capL = CameraFactory.get_camera_from_string_type(cfg['leftEye'], decode_mode, chunk_size, lazy, pool)
+    capR = CameraFactory.get_camera_from_string_type(cfg['rightEye'], decode_mode, chunk_size, lazy, pool)
+
+    # tee raw camera frames to disk, play them back with "replay:<file>" as leftEye/rightEye
+    paths = record_paths(cfg)
+    recorders = [FrameRecorder(cap, paths[eye]) for cap, eye in ((capL, "L"), (capR, "R")) if eye in paths]
+    capL.open()
+    capR.open()
     logging.info("Waiting for at least one camera to become ready…")
     while not (capL.isPrimed() or capR.isPrimed()):
         time.sleep(0.1)
@@ -59,9 +148,30 @@ def main():
         "Camera ready. leftPrimed=%s, rightPrimed=%s",
         capL.isPrimed(), capR.isPrimed()
     )
-    CaptureTask(capL, capR, qL, qR).start()
+    capture = CaptureTask(capL, capR, mailbox)
+    capture.start()
+
+    osc = OSCSenderTask(results, config)
+    osc.start()
 
-    OSCSenderTask(results, shared_cfg, cfg_lock).start()
+    return Pipeline(config, mailbox, results, inference, capL, capR, capture, osc, recorders)
+
+# ----------------------------
+# Main
+# ----------------------------
+def main():    
+    ap = argparse.ArgumentParser(description="ML eye tracking for VRChat over OSC")
+    ap.add_argument("--settings", default="./Settings.json")
+    ap.add_argument("--server", metavar="PROFILES",
+                    help="serve several headsets from one profiles file (see server.py)")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s", datefmt="%H:%M:%S")
+    if args.server:
+        start_server(args.server)
+        pipeline = None
+    else:
+        pipeline = start_pipeline(args.settings)
 
     # keep main alive
     try:
@@ -69,6 +179,9 @@ def main():
             time.sleep(1)
     except KeyboardInterrupt:
         logging.info("Shutting down…")
+        if pipeline is not None:
+            pipeline.close()
 
 if __name__ == "__main__":
-    main()
+    multiprocessing.freeze_support()  # multiProcess children of the frozen .exe
+    main()
\ No newline at end of file
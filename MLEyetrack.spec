@@ -3,7 +3,9 @@
 FAST_BUILD = True  # True = directory build; False = single-file .exe
 
 # 1. Collect everything for these packages in one loop
-packages = ['cv2', 'tf2onnx', 'onnxruntime', 'onnxruntime-gpu', 'tensorflow']
+packages = ['cv2', 'onnxruntime', 'onnxruntime-gpu', 'watchdog']  # watchdog picks its observer per platform at runtime
+# Model conversion lives in convert_models.py / ConvertModels.spec, keep its toolchain out
+excludes = ['tensorflow', 'tf2onnx', 'onnx', 'keras', 'convert_models']
 datas = []
 binaries = []
 hiddenimports = []
@@ -31,7 +33,7 @@ for pkg in packages:
     binaries.extend(b)
     hiddenimports.extend(h)
 
-hiddenimports += ['colorama', 'tensorflow']
+hiddenimports += ['colorama']
 
 # How the fuck does python have this much bloat?!?!
 # print("\n")
@@ -58,7 +60,7 @@ if FAST_BUILD:
         hiddenimports=hiddenimports,
         hookspath=[],
         runtime_hooks=['OpenCVPatch.py'],
-        excludes=[],
+        excludes=excludes,
         noarchive=True,
         optimize=0,
     )
@@ -100,7 +102,7 @@ else:
         hiddenimports=hiddenimports,
         hookspath=[],
         runtime_hooks=['OpenCVPatch.py'],
-        excludes=[],
+        excludes=excludes,
         noarchive=False,
         optimize=0,
     )
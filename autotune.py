@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Pick ONNX Runtime session options for this machine.
+
+Every model the settings use is run on recorded (or synthetic) eye frames,
+paced like the tracker (infrencePerSecondLimit), under a grid of thread
+counts, spinning, optimization level and execution mode. Per model the
+fastest p95 wins; among candidates within --tolerance of it, the one that
+burns the least CPU, so the cores stay free for VRChat.
+
+    python autotune.py                                   # print the best sessionOptions
+    python autotune.py --frames rec/left.mjr --write     # store them in Settings.json
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import onnxruntime as ort
+
+from benchmarks.eye_frames import decoded_frames, model_feeds
+from sessions import get_onnx_providers, required_models, session_options
+from model_manifest import onnx_paths, stale_models
+
+def candidates(key, cpus):
+    threads = sorted({t for t in (1, 2, 4, cpus // 2) if 1 <= t <= cpus})
+    modes = [("sequential", 1)]
+    if key.startswith("stereo_"):
+        modes.append(("parallel", 2))  # two independent eye branches
+    for intra in threads:
+        for mode, inter in modes:
+            for level in ("extended", "all"):
+                for spinning in (False, True):
+                    yield {"intraOpThreads": intra, "interOpThreads": inter, "graphOptimization": level,
+                           "executionMode": mode, "allowSpinning": spinning}
+
+def measure(path, spec, providers, images, runs, rate):
+    sess = ort.InferenceSession(path, sess_options=session_options(spec), providers=providers)
+    feeds = model_feeds(sess, images)
+    for feed in feeds[:5]:
+        sess.run(None, feed)
+
+    interval = 1.0 / rate if rate else 0.0
+    latencies = np.empty(runs)
+    cpu0 = time.process_time()
+    wall0 = next_time = time.perf_counter()
+    for i in range(runs):
+        t0 = time.perf_counter()
+        sess.run(None, feeds[i % len(feeds)])
+        latencies[i] = time.perf_counter() - t0
+        if interval:
+            next_time += interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+    return {
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "cpu_ms": cpu / runs * 1000,          # includes spinning between runs
+        "cores": cpu / wall,
+    }
+
+def pick(results, tolerance):
+    best_p95 = min(r["p95_ms"] for _, r in results)
+    close = [(spec, r) for spec, r in results if r["p95_ms"] <= best_p95 * (1 + tolerance)]
+    # ties go to the less aggressive setting
+    return min(close, key=lambda sr: (round(sr[1]["cpu_ms"], 2), sr[0]["allowSpinning"], sr[0]["intraOpThreads"]))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--settings", default="./Settings.json")
+    ap.add_argument("--models", nargs="*", help="session keys to tune (default: the ones the settings use)")
+    ap.add_argument("--frames", help=".mjr recording, multipart stream or directory of .jpg (default: synthetic)")
+    ap.add_argument("--runs", type=int, default=100, help="timed runs per candidate")
+    ap.add_argument("--rate", type=float, help="runs per second (default: infrencePerSecondLimit, 0 = back to back)")
+    ap.add_argument("--tolerance", type=float, default=0.1, help="p95 slack traded for lower CPU use")
+    ap.add_argument("--write", action="store_true", help="store the result in --settings")
+    args = ap.parse_args()
+
+    with open(args.settings) as f:
+        cfg = json.load(f)
+    model_dir = cfg["modelFile"]
+    keys = args.models or sorted(required_models(cfg))
+    variant, fused = cfg.get("modelVariant", "fp32"), cfg.get("fusedPostprocess", False)
+    stale = stale_models(model_dir, keys, variant, fused)
+    if stale:
+        raise SystemExit(f"{variant} models out of date ({', '.join(stale)}), run convert_models.py / quantize_models.py first")
+    rate = args.rate if args.rate is not None else cfg.get("infrencePerSecondLimit", 0)
+
+    images = decoded_frames(args.frames, cfg.get("decodeMode", "color"))
+    providers = get_onnx_providers()
+    cpus = os.cpu_count() or 1
+    paths = onnx_paths(model_dir, variant, fused)
+
+    best = {}
+    for key in keys:
+        print(f"\n=== {key} ===")
+        print("  intra inter optimize  mode        spin    p50 ms   p95 ms   CPU ms/run  cores")
+        results = []
+        for spec in candidates(key, cpus):
+            r = measure(paths[key], spec, providers, images, args.runs, rate)
+            results.append((spec, r))
+            print(f"  {spec['intraOpThreads']:5d} {spec['interOpThreads']:5d} {spec['graphOptimization']:9s} "
+                  f"{spec['executionMode']:11s} {str(spec['allowSpinning']):5s} "
+                  f"{r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['cpu_ms']:12.2f} {r['cores']:6.2f}")
+        spec, r = pick(results, args.tolerance)
+        best[key] = spec
+        print(f"  → {spec} (p95 {r['p95_ms']:.2f} ms, {r['cpu_ms']:.2f} CPU ms/run)")
+
+    options = dict(cfg.get("sessionOptions", {}))
+    options.update(best)
+    if args.write:
+        cfg["sessionOptions"] = options
+        with open(args.settings, "w") as f:
+            json.dump(cfg, f, indent=4)
+        print(f"\nWrote sessionOptions to {args.settings}")
+    else:
+        print("\n" + json.dumps({"sessionOptions": options}, indent=4))
+
+if __name__ == "__main__":
+    main()
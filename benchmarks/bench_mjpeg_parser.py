@@ -0,0 +1,115 @@
+"""
+MJPEG parser microbenchmark.
+
+Feeds a recorded (or synthetic) multipart MJPEG stream through
+cameras.MJPEGStreamParser and through the old bytes-concatenation parser,
+chunk by chunk, and reports throughput.
+
+    python -m benchmarks.bench_mjpeg_parser                         # synthetic stream
+    python -m benchmarks.bench_mjpeg_parser --stream eye.mjpeg      # recorded stream
+    python -m benchmarks.bench_mjpeg_parser --record http://192.168.50.238 --seconds 10 --stream eye.mjpeg
+
+Run from the repository root.
+"""
+import argparse
+import time
+
+import numpy as np
+import requests
+
+from cameras.MJPEGStreamParser import MJPEGStreamParser
+
+BOUNDARY = b"123456789000000000000987654321"
+
+def synthetic_stream(frames: int, width: int, height: int, content_length: bool) -> bytes:
+    """Multipart body like the ESP32 cameras send, with noisy eye-sized JPEGs."""
+    import cv2
+
+    rng = np.random.default_rng(0)
+    parts = []
+    for _ in range(frames):
+        img = rng.integers(0, 255, (height, width), np.uint8)
+        img = cv2.GaussianBlur(img, (0, 0), 3)  # compresses like a real eye image
+        ok, jpg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        jpg = jpg.tobytes()
+        header = b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+        if content_length:
+            header += b"Content-Length: %d\r\n" % len(jpg)
+        parts.append(header + b"\r\n" + jpg + b"\r\n")
+    return b"".join(parts)
+
+def record(url: str, seconds: float, path: str):
+    """Dump the raw HTTP body of a camera stream to disk."""
+    deadline = time.time() + seconds
+    with requests.get(url, stream=True, timeout=2) as resp, open(path, "wb") as f:
+        for chunk in resp.iter_content(chunk_size=4096):
+            f.write(chunk)
+            if time.time() >= deadline:
+                break
+
+def legacy_parse(chunks):
+    """The parser MJPEGVideoCapture used before MJPEGStreamParser."""
+    byte_buffer = b""
+    frames = 0
+    for chunk in chunks:
+        byte_buffer += chunk
+        while True:
+            start = byte_buffer.find(b"\xff\xd8")
+            end = byte_buffer.find(b"\xff\xd9")
+            if start != -1 and end != -1:
+                jpg = byte_buffer[start:end + 2]
+                byte_buffer = byte_buffer[end + 2:]
+                frames += 1
+            else:
+                break
+    return frames
+
+def incremental_parse(chunks):
+    parser = MJPEGStreamParser()
+    frames = 0
+    for chunk in chunks:
+        frames += len(parser.feed(chunk))
+    return frames
+
+def bench(name, fn, chunks, total_bytes, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        frames = fn(chunks)
+        best = min(best, time.perf_counter() - t0)
+    print(f"{name:12s} {frames:6d} frames  {total_bytes / best / 1e6:8.1f} MB/s  "
+          f"{best / max(frames, 1) * 1e6:8.2f} µs/frame")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--stream", help="recorded multipart MJPEG body (raw bytes)")
+    ap.add_argument("--record", metavar="URL", help="record URL into --stream first")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--frames", type=int, default=300, help="synthetic frames")
+    ap.add_argument("--size", default="320x240", help="synthetic frame size WxH")
+    ap.add_argument("--no-content-length", action="store_true", help="synthetic parts without Content-Length")
+    ap.add_argument("--chunk-sizes", default="1024,4096,16384")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    if args.record:
+        if not args.stream:
+            ap.error("--record needs --stream to write to")
+        record(args.record, args.seconds, args.stream)
+
+    if args.stream:
+        with open(args.stream, "rb") as f:
+            data = f.read()
+    else:
+        w, h = (int(v) for v in args.size.split("x"))
+        data = synthetic_stream(args.frames, w, h, not args.no_content_length)
+
+    print(f"Stream: {len(data) / 1e6:.2f} MB")
+    for chunk_size in (int(v) for v in args.chunk_sizes.split(",")):
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        print(f"-- chunk size {chunk_size}")
+        bench("legacy", legacy_parse, chunks, len(data), args.repeat)
+        bench("incremental", incremental_parse, chunks, len(data), args.repeat)
+
+if __name__ == "__main__":
+    main()
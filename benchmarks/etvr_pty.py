@@ -0,0 +1,72 @@
+"""
+Fake ETVR serial camera on a pseudo-terminal (Linux/macOS) for SerialCamera.
+
+    python -m benchmarks.etvr_pty --fps 120      # prints the /dev/pts/N to put in Settings.json
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+from benchmarks.eye_frames import frame_source
+from cameras.SerialCameraCapture import ETVR_HEADER
+
+class FakeETVRDevice(threading.Thread):
+    """Writes ETVR packets (header, u16 length, JPEG) to a pty at `fps`."""
+    def __init__(self, jpegs, fps: float = 120.0):
+        super().__init__(daemon=True, name="FakeETVRDevice")
+        self.master, self.slave = os.openpty()
+        self.port = os.ttyname(self.slave)
+        self.packets = [ETVR_HEADER + len(j).to_bytes(2, "little") + j for j in jpegs]
+        self.fps = fps
+        self.stopped = False
+        self.sent = 0
+
+    def run(self):
+        interval = 1.0 / self.fps
+        next_time = time.perf_counter()
+        i = 0
+        while not self.stopped:
+            packet = self.packets[i % len(self.packets)]
+            view = memoryview(packet)
+            while view:
+                try:
+                    n = os.write(self.master, view)
+                except OSError:
+                    return
+                view = view[n:]
+            self.sent += 1
+            i += 1
+
+            next_time += interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.perf_counter()
+
+    def stop(self):
+        self.stopped = True
+        os.close(self.master)
+        os.close(self.slave)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--fps", type=float, default=120.0)
+    ap.add_argument("--frames", help=".mjr recording, multipart stream or directory of .jpg")
+    ap.add_argument("--size", default="240x240", help="synthetic frame size WxH")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    device = FakeETVRDevice(frame_source(args.frames, args.size), args.fps)
+    device.start()
+    logging.info(f"Fake ETVR camera on {device.port} at {args.fps} fps")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        device.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+JPEG frame sources for the benchmark stand-ins: a recorded multipart MJPEG
+stream, a directory of .jpg files, or synthetic eye images.
+"""
+import os
+
+import cv2
+import numpy as np
+
+from cameras.FrameStore import FrameReader, is_frame_store
+from cameras.MJPEGStreamParser import MJPEGStreamParser
+
+def synthetic_eye_jpegs(count: int = 120, width: int = 240, height: int = 240, quality: int = 80):
+    """
+    IR-looking eye images: grey iris disc with a dark pupil moving on a
+    Lissajous path, with occasional blinks, so motion-dependent stages
+    see realistic variation.
+    """
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 6, (height, width)).astype(np.float32)
+    jpegs = []
+    for i in range(count):
+        t = i / count * 2 * np.pi
+        img = np.full((height, width), 150, np.float32) + noise
+        cx = int(width  * (0.5 + 0.2 * np.sin(3 * t)))
+        cy = int(height * (0.5 + 0.15 * np.sin(2 * t)))
+        r = min(width, height) // 5
+        cv2.circle(img, (cx, cy), r, 95, -1)
+        cv2.circle(img, (cx, cy), r // 2, 20, -1)
+        cv2.circle(img, (cx + r // 4, cy - r // 4), r // 8, 250, -1)  # glint
+        if i % 40 in (0, 1, 2):  # blink
+            lid = int(height * (0.6 if i % 40 == 1 else 0.3))
+            img[:lid] = 120
+        img = cv2.GaussianBlur(np.clip(img, 0, 255).astype(np.uint8), (0, 0), 1.5)
+        ok, jpg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        jpegs.append(jpg.tobytes())
+    return jpegs
+
+def load_jpegs(path: str):
+    """All JPEGs from a .mjr recording, a recorded multipart stream file or a directory of .jpg files."""
+    if is_frame_store(path):
+        reader = FrameReader(path)
+        jpegs = [bytes(jpeg) for jpeg in reader]
+        reader.close()
+        return jpegs
+
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith((".jpg", ".jpeg")))
+        jpegs = []
+        for name in names:
+            with open(os.path.join(path, name), "rb") as f:
+                jpegs.append(f.read())
+        return jpegs
+
+    parser = MJPEGStreamParser()
+    jpegs = []
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(64 * 1024)
+            if not chunk:
+                break
+            jpegs += parser.feed(chunk)
+    return jpegs
+
+def frame_source(path: str = None, size: str = "240x240", count: int = 120):
+    """Recorded frames if `path` is given, synthetic ones of `size` (WxH) otherwise."""
+    if path:
+        jpegs = load_jpegs(path)
+        if not jpegs:
+            raise ValueError(f"No JPEG frames found in {path}")
+        return jpegs
+    w, h = (int(v) for v in size.split("x"))
+    return synthetic_eye_jpegs(count, w, h)
+
+def decoded_frames(path: str = None, decode_mode: str = "color", count: int = 64):
+    """Up to `count` frames from frame_source(), decoded the way the cameras would."""
+    from cameras.JpegDecode import JpegDecoder
+    decoder = JpegDecoder(decode_mode)
+    return [decoder.decode(jpeg) for jpeg in frame_source(path)[:count]]
+
+def model_feeds(sess, images, count: int = 32):
+    """
+    `count` feed dicts for `sess` built from eye images the way
+    InferenceTask.preprocess does. Image inputs of multi-input models get
+    consecutive frames, fused post-processing inputs neutral settings,
+    pose-like inputs 0.75.
+    """
+    from model_manifest import POST_INPUTS
+    from sessions import ORT_DTYPES, concrete_shape
+    feeds = []
+    for i in range(count):
+        feed = {}
+        for j, meta in enumerate(sess.get_inputs()):
+            shape = concrete_shape(meta.shape)
+            if meta.name in POST_INPUTS:
+                feed[meta.name] = np.array(POST_INPUTS[meta.name], np.float32)
+            elif len(shape) == 4:
+                _, h, w, c = shape
+                img = images[(i + j) % len(images)]
+                if c == 1 and img.ndim == 3:
+                    img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                img = cv2.resize(img, (w, h))
+                if img.ndim == 2:
+                    img = np.repeat(img[..., None], c, axis=2)
+                feed[meta.name] = (img[None].astype(np.float32) / 255.0).astype(ORT_DTYPES[meta.type])
+            else:
+                feed[meta.name] = np.full(shape, 0.75, ORT_DTYPES[meta.type])
+        feeds.append(feed)
+    return feeds
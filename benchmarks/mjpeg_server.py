@@ -0,0 +1,104 @@
+"""
+Local MJPEG camera stand-in for MJPEGVideoCapture.
+
+    python -m benchmarks.mjpeg_server --port 8081 --fps 90                 # synthetic 240x240
+    python -m benchmarks.mjpeg_server --port 8081 --frames eye.mjpeg       # recorded stream
+"""
+import argparse
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.eye_frames import frame_source
+
+BOUNDARY = b"123456789000000000000987654321"
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def do_GET(self):
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace;boundary=" + BOUNDARY.decode())
+        self.end_headers()
+
+        interval = 1.0 / server.fps
+        next_time = time.perf_counter()
+        i = 0
+        try:
+            while not server.stopped:
+                jpg = server.jpegs[i % len(server.jpegs)]
+                header = b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+                if server.content_length:
+                    header += b"Content-Length: %d\r\n" % len(jpg)
+                self.wfile.write(header + b"\r\n" + jpg + b"\r\n")
+                self.wfile.flush()
+                server.sent += 1
+                i += 1
+
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.perf_counter()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, fmt, *args):
+        pass
+
+class MJPEGServer(threading.Thread):
+    """Streams `jpegs` in a loop at `fps` to every client of http://host:port/."""
+    def __init__(self, jpegs, port: int = 0, fps: float = 90.0, host: str = "127.0.0.1",
+                 content_length: bool = True):
+        super().__init__(daemon=True, name=f"MJPEGServer:{port}")
+        self.httpd = ThreadingHTTPServer((host, port), _StreamHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.jpegs = jpegs
+        self.httpd.fps = fps
+        self.httpd.content_length = content_length
+        self.httpd.stopped = False
+        self.httpd.sent = 0
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def sent(self):
+        return self.httpd.sent
+
+    def run(self):
+        self.httpd.serve_forever(poll_interval=0.1)
+
+    def stop(self):
+        self.httpd.stopped = True
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8081)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--fps", type=float, default=90.0)
+    ap.add_argument("--frames", help=".mjr recording, multipart stream or directory of .jpg")
+    ap.add_argument("--size", default="240x240", help="synthetic frame size WxH")
+    ap.add_argument("--no-content-length", action="store_true")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    server = MJPEGServer(frame_source(args.frames, args.size), args.port, args.fps, args.host,
+                         not args.no_content_length)
+    server.start()
+    logging.info(f"Streaming on {server.url} at {args.fps} fps")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
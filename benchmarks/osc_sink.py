@@ -0,0 +1,98 @@
+"""
+UDP OSC sink standing in for VRChat: timestamps every datagram and counts
+the messages inside (plain messages or #bundle).
+
+    python -m benchmarks.osc_sink --port 8889
+"""
+import argparse
+import logging
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+def count_messages(packet: bytes) -> int:
+    """Number of OSC messages in a datagram, recursing into bundles."""
+    if not packet.startswith(b"#bundle\0"):
+        return 1
+    n, pos = 0, 16
+    while pos + 4 <= len(packet):
+        size = struct.unpack_from(">i", packet, pos)[0]
+        n += count_messages(packet[pos + 4:pos + 4 + size])
+        pos += 4 + size
+    return n
+
+class OSCSink(threading.Thread):
+    def __init__(self, port: int = 0, host: str = "127.0.0.1"):
+        super().__init__(daemon=True, name="OSCSink")
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.arrivals = []   # perf_counter() per datagram
+        self.messages = 0
+        self.bytes = 0
+        self.stopped = False
+
+    @property
+    def address(self):
+        host, port = self.sock.getsockname()
+        return f"{host}:{port}"
+
+    def run(self):
+        while not self.stopped:
+            try:
+                packet = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self.arrivals.append(time.perf_counter())
+            self.messages += count_messages(packet)
+            self.bytes += len(packet)
+
+    def reset(self):
+        self.arrivals = []
+        self.messages = self.bytes = 0
+
+    def report(self):
+        """Packet/message rates and inter-arrival jitter since the last reset()."""
+        arrivals = np.array(self.arrivals)
+        out = {"packets": len(arrivals), "messages": self.messages, "bytes": self.bytes}
+        if len(arrivals) >= 2:
+            span = arrivals[-1] - arrivals[0]
+            gaps = np.diff(arrivals) * 1000
+            out.update({
+                "packets_per_s": (len(arrivals) - 1) / span,
+                "messages_per_s": self.messages / span,
+                "gap_p50_ms": float(np.percentile(gaps, 50)),
+                "gap_p99_ms": float(np.percentile(gaps, 99)),
+                "gap_std_ms": float(gaps.std()),
+            })
+        return out
+
+    def stop(self):
+        self.stopped = True
+        self.sock.close()
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8889)
+    ap.add_argument("--host", default="127.0.0.1")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    sink = OSCSink(args.port, args.host)
+    sink.start()
+    logging.info(f"OSC sink on {sink.address}")
+    try:
+        while True:
+            time.sleep(5)
+            logging.info(sink.report())
+            sink.reset()
+    except KeyboardInterrupt:
+        sink.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Offline end-to-end benchmark of the full tracker pipeline.
+
+For every configuration (combined vs independent models × MJPEG vs serial
+cameras) this starts two local camera stand-ins and an OSC sink, runs
+MLEyetrack.start_pipeline headless in a child process against a generated
+Settings.json, and reports throughput, latency percentiles, CPU per thread
+and memory.
+
+    python -m benchmarks.run_pipeline                                   # all configurations
+    python -m benchmarks.run_pipeline --models combined --cameras mjpeg --duration 30
+    python -m benchmarks.run_pipeline --frames eye.mjpeg --fps 120 --set decodeMode=color --json out.json
+
+Run from the repository root. Serial stand-ins need a pty (Linux/macOS).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RESULT_PREFIX = "RESULT "
+WARM_MARK = "WARM"
+
+LATENCY_STAGES = ("capture_to_send", "capture_to_result", "decode", "ring_handoff", "enqueue",
+                  "preprocess", "run", "postprocess", "osc_send", "osc_tick_late")
+
+# ----------------------------
+# Child: run the pipeline and measure
+# ----------------------------
+def thread_cpu_times():
+    """{thread name: CPU seconds} for this process. Native threads (ORT pools) are grouped."""
+    names = {t.native_id: t.name for t in threading.enumerate()}
+    try:
+        import psutil
+        times = {t.id: t.user_time + t.system_time for t in psutil.Process().threads()}
+    except ImportError:
+        tick = os.sysconf("SC_CLK_TCK")
+        times = {}
+        for tid in os.listdir("/proc/self/task"):
+            try:
+                with open(f"/proc/self/task/{tid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            times[int(tid)] = (int(fields[11]) + int(fields[12])) / tick
+
+    out = {}
+    for tid, cpu in times.items():
+        name = names.get(tid, "native (onnxruntime/opencv pools)")
+        out[name] = out.get(name, 0.0) + cpu
+    return out
+
+def process_cpu_times(pids):
+    """{"process <name>": CPU seconds} for the pipeline's child processes ("multiProcess")."""
+    out = {}
+    for name, pid in pids.items():
+        try:
+            import psutil
+            t = psutil.Process(pid).cpu_times()
+            out[f"process {name}"] = t.user + t.system
+        except ImportError:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            out[f"process {name}"] = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        except Exception:
+            pass  # exited meanwhile
+    return out
+
+def memory_mb():
+    """(current RSS, peak RSS) in MB."""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return info.rss / 1e6, getattr(info, "peak_wset", info.rss) / 1e6
+    except ImportError:
+        import resource
+        rss = 0.0
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) / 1e3
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+        return rss, peak
+
+def run_child(settings_path, warmup, duration):
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    from MLEyetrack import start_pipeline
+    from stats import STATS
+
+    pipeline = start_pipeline(settings_path)
+    time.sleep(warmup)
+
+    pids = pipeline.processes()
+    pipeline.reset_stats()
+    cpu0, t0 = {**thread_cpu_times(), **process_cpu_times(pids)}, time.perf_counter()
+    print(WARM_MARK, flush=True)
+    time.sleep(duration)
+    cpu1, elapsed = {**thread_cpu_times(), **process_cpu_times(pids)}, time.perf_counter() - t0
+    pipeline.sync_stats()
+
+    snap = STATS.to_json()
+    counters = {}
+    for c in snap["counters"]:
+        # child process counters carry a process label, same names as in threaded mode
+        label = ",".join(f"{k}={v}" for k, v in c.items() if k not in ("name", "value", "process"))
+        key = c["name"] + (f"[{label}]" if label else "")
+        counters[key] = counters.get(key, 0) + c["value"]
+    rss, peak = memory_mb()
+
+    result = {
+        "seconds": elapsed,
+        "inferences_per_s": counters.get("inferences", 0) / elapsed,
+        "osc_packets_per_s": counters.get("osc_packets", 0) / elapsed,
+        "counters": counters,
+        "latency_ms": [s for s in snap["stages"] if s["stage"] in LATENCY_STAGES],
+        "cpu_percent": {name: (cpu1.get(name, 0.0) - cpu0.get(name, 0.0)) / elapsed * 100
+                        for name in cpu1},
+        "rss_mb": rss,
+        "peak_rss_mb": peak,
+    }
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    pipeline.close()
+    os._exit(0)  # pipeline threads are daemons without a stop switch
+
+# ----------------------------
+# Parent: stand-ins, settings, reporting
+# ----------------------------
+def start_cameras(kind, jpegs, fps):
+    if kind == "mjpeg":
+        from benchmarks.mjpeg_server import MJPEGServer
+        cams = [MJPEGServer(jpegs, fps=fps) for _ in range(2)]
+        for cam in cams:
+            cam.start()
+        return cams, [cam.url for cam in cams]
+    from benchmarks.etvr_pty import FakeETVRDevice
+    cams = [FakeETVRDevice(jpegs, fps) for _ in range(2)]
+    for cam in cams:
+        cam.start()
+    return cams, [cam.port for cam in cams]
+
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def run_config(args, base_cfg, models, cameras, jpegs):
+    from benchmarks.osc_sink import OSCSink
+
+    sink = OSCSink()
+    sink.start()
+    cams, sources = start_cameras(cameras, jpegs, args.fps)
+
+    independent = models == "independent"
+    cfg = dict(base_cfg)
+    cfg.update({
+        "leftEye": sources[0], "rightEye": sources[1], "vrcOsc": sink.address,
+        "independentEyes": independent, "independentOpenness": independent,
+        "statsPort": 0,
+    })
+    if args.model_dir:
+        cfg["modelFile"] = args.model_dir
+    for item in args.set:
+        key, value = item.split("=", 1)
+        cfg[key] = parse_value(value)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(cfg, f, indent=4)
+        settings_path = f.name
+
+    result = None
+    try:
+        child = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.run_pipeline", "--child", settings_path,
+             "--warmup", str(args.warmup), "--duration", str(args.duration)],
+            stdout=subprocess.PIPE, text=True)
+        for line in child.stdout:
+            if line.strip() == WARM_MARK:
+                sink.reset()
+            elif line.startswith(RESULT_PREFIX):
+                result = json.loads(line[len(RESULT_PREFIX):])
+                result["osc_sink"] = sink.report()
+        child.wait(timeout=30)
+    finally:
+        os.unlink(settings_path)
+        for cam in cams:
+            cam.stop()
+        sink.stop()
+    return result
+
+def print_result(name, r):
+    print(f"\n=== {name} ===")
+    if r is None:
+        print("  no result (pipeline failed to start?)")
+        return
+    sink = r["osc_sink"]
+    print(f"  throughput: {r['inferences_per_s']:.1f} inferences/s, "
+          f"{sink.get('packets_per_s', 0):.1f} OSC packets/s ({sink.get('messages_per_s', 0):.1f} msgs/s) at the sink")
+    if "gap_p50_ms" in sink:
+        print(f"  OSC arrival gaps: p50 {sink['gap_p50_ms']:.2f} ms, p99 {sink['gap_p99_ms']:.2f} ms, "
+              f"std {sink['gap_std_ms']:.2f} ms")
+    print("  latency (ms)            p50      p95      p99")
+    for s in r["latency_ms"]:
+        label = s["stage"] + "".join(f"[{v}]" for k, v in s.items()
+                                     if k not in ("stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"))
+        fmt = lambda v: f"{v:8.2f}" if v is not None else "       -"
+        print(f"  {label:22s} {fmt(s['p50_ms'])} {fmt(s['p95_ms'])} {fmt(s['p99_ms'])}")
+    print("  CPU per thread (% of one core)")
+    for name, pct in sorted(r["cpu_percent"].items(), key=lambda kv: -kv[1]):
+        if pct >= 0.1:
+            print(f"    {name:40s} {pct:6.1f}")
+    print(f"  memory: RSS {r['rss_mb']:.0f} MB, peak {r['peak_rss_mb']:.0f} MB")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--settings", default="./Settings.json", help="base settings to override")
+    ap.add_argument("--model-dir", help="override modelFile")
+    ap.add_argument("--models", choices=("combined", "independent", "all"), default="all")
+    ap.add_argument("--cameras", choices=("mjpeg", "serial", "all"), default="all")
+    ap.add_argument("--frames", help=".mjr recording, multipart stream or directory of .jpg (default: synthetic)")
+    ap.add_argument("--size", default="240x240", help="synthetic frame size WxH")
+    ap.add_argument("--fps", type=float, default=90.0, help="camera frame rate")
+    ap.add_argument("--warmup", type=float, default=3.0)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="extra Settings.json override (JSON value), repeatable")
+    ap.add_argument("--json", help="write all results to this file")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        run_child(args.child, args.warmup, args.duration)
+        return
+
+    from benchmarks.eye_frames import frame_source
+    with open(args.settings) as f:
+        base_cfg = json.load(f)
+    jpegs = frame_source(args.frames, args.size)
+
+    models = ("combined", "independent") if args.models == "all" else (args.models,)
+    cameras = ("mjpeg", "serial") if args.cameras == "all" else (args.cameras,)
+    if "serial" in cameras and not hasattr(os, "openpty"):
+        print("No pty support on this platform, skipping serial cameras")
+        cameras = tuple(c for c in cameras if c != "serial")
+
+    results = {}
+    for cam in cameras:
+        for model in models:
+            name = f"{model} / {cam}"
+            results[name] = run_config(args, base_cfg, model, cam, jpegs)
+            print_result(name, results[name])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
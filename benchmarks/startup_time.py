@@ -0,0 +1,96 @@
+"""
+Startup-time check: how long a fresh process takes to import the tracker and
+get the models its settings use loaded and warmed up, and whether the
+conversion toolchain slipped back into the runtime imports. Exits non-zero
+when over budget, so it can gate a build.
+
+    python -m benchmarks.startup_time                          # modelFile from ./Settings.json
+    python -m benchmarks.startup_time --model-dir ./models --budget 1.5 --runs 5
+
+Run from the repository root, after convert_models.py. The first run fills the
+optimized-model cache (optimizedModelCache), later runs show a warm start.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+RESULT_PREFIX = "RESULT "
+
+# Only convert_models.py may pull these in
+FORBIDDEN_MODULES = ("tensorflow", "tf2onnx", "onnx", "keras")
+
+def run_child(settings_path, model_dir):
+    from benchmarks.run_pipeline import memory_mb
+
+    t0 = time.perf_counter()
+    import MLEyetrack  # noqa: F401  (everything the tracker imports at startup)
+    from sessions import ModelPool, required_models
+    t_import = time.perf_counter() - t0
+
+    # same as InferenceTask: the sessions these settings use, warmed up
+    with open(settings_path) as f:
+        cfg = json.load(f)
+    model_dir = model_dir or cfg["modelFile"]
+    cache_dir = os.path.join(model_dir, ".ortcache") if cfg.get("optimizedModelCache", True) else None
+    t0 = time.perf_counter()
+    pool = ModelPool(model_dir, cache_dir, cfg.get("sessionOptions"), cfg.get("modelVariant", "fp32"),
+                     cfg.get("fusedPostprocess", False))
+    sessions = pool.load(required_models(cfg) or {"left_theta"})
+    t_load = time.perf_counter() - t0
+
+    result = {
+        "import_s": t_import,
+        "load_s": t_load,
+        "sessions": len(sessions),
+        "rss_mb": memory_mb()[0],
+        "forbidden": sorted(m for m in FORBIDDEN_MODULES if m in sys.modules),
+    }
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+def measure(settings_path, model_dir):
+    cmd = [sys.executable, "-m", "benchmarks.startup_time", "--child", "--settings", settings_path]
+    if model_dir:
+        cmd += ["--model-dir", model_dir]
+    out = subprocess.run(cmd, stdout=subprocess.PIPE, text=True, check=True).stdout
+    for line in out.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError("startup child printed no result")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--model-dir", help="defaults to modelFile in --settings")
+    ap.add_argument("--settings", default="./Settings.json")
+    ap.add_argument("--budget", type=float, default=2.0, help="seconds allowed for import + model load (median)")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        run_child(args.settings, args.model_dir)
+        return
+
+    results = [measure(args.settings, args.model_dir) for _ in range(args.runs)]
+    for i, r in enumerate(results):
+        print(f"run {i + 1}: import {r['import_s'] * 1000:7.1f} ms, load {r['load_s'] * 1000:7.1f} ms "
+              f"({r['sessions']} sessions), RSS {r['rss_mb']:.0f} MB")
+
+    totals = sorted(r["import_s"] + r["load_s"] for r in results)
+    median = totals[len(totals) // 2]
+    forbidden = sorted({m for r in results for m in r["forbidden"]})
+    failed = False
+    if forbidden:
+        print(f"FAIL: runtime imported {', '.join(forbidden)}")
+        failed = True
+    if median > args.budget:
+        print(f"FAIL: median startup {median:.2f} s is over the {args.budget:.2f} s budget")
+        failed = True
+    if not failed:
+        print(f"OK: median startup {median:.2f} s (budget {args.budget:.2f} s)")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,17 @@ pip install pyinstaller || exit /b
 @REM del /s /q .\build\*
 @REM rmdir /s /q .\build\
 
-REM Build using your .spec file
+REM Convert the .h5 models to ONNX (+ manifest) up front, the tracker doesn't ship TensorFlow
+python convert_models.py --model-dir models || exit /b
+
+REM Build using your .spec files
 pyinstaller MLEyetrack.spec -y || exit /b
+pyinstaller ConvertModels.spec -y || exit /b
 
-REM Copy models folder
-xcopy /E /I /Y models dist\MLEyetrack\models
+REM Copy models folder (converted only, the .h5 files are for ConvertModels)
+if not exist dist\MLEyetrack\models mkdir dist\MLEyetrack\models
+copy /Y models\*.onnx dist\MLEyetrack\models\
+copy /Y models\manifest.json dist\MLEyetrack\models\
 
 REM Copy Settings.json
 copy /Y Settings.json dist\MLEyetrack\
@@ -3,30 +3,44 @@ import logging
 
 from .ICameraSource import ICameraSource
 from .MJPEGVideoCapture import MJPEGVideoCapture
+from .ReplayCamera import ReplayCamera
 from .SerialCameraCapture import SerialCamera
 from .SystemCameraCapture import SystemCamera
 
 # Sorry for the (non-OOP) Python devs. Factory time!
 class CameraFactory:
     @staticmethod
-    def get_camera_from_string_type(sourceName: str) -> ICameraSource:
-        source = str(sourceName).strip()
+    def get_camera_from_string_type(sourceName: str, decodeMode: str = "color", chunkSize: int = 1024,
+                                    lazyDecode: bool = False, decodePool=None) -> ICameraSource:
+        camera = CameraFactory._from_string(str(sourceName).strip(), decodeMode, chunkSize)
+        # JPEG sources can hand out frames undecoded and leave decoding to whoever takes them
+        if lazyDecode and camera.emits_jpeg:
+            camera.decode_lazily(decodePool)
+        return camera
+
+    @staticmethod
+    def _from_string(source: str, decodeMode: str, chunkSize: int) -> ICameraSource:
+
+        # 0) Recording made with recordDir (replay:/path/left.mjr[?mode=fast&speed=2&loop=1])
+        if source.lower().startswith("replay:"):
+            logging.log(logging.INFO, f"Replay camera selected: {source}")
+            return ReplayCamera.from_source(source, decodeMode)
 
         # 1) HTTP(S) URL
         if re.match(r'^(https?://)', source, re.IGNORECASE):
             logging.log(logging.INFO, f"MJPEG camera selected: {source}")
-            return MJPEGVideoCapture(source)
+            return MJPEGVideoCapture(source, decodeMode, chunkSize)
 
         # 2) Plain IPv4 address (assume HTTP)
         if re.match(r'^(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?$', source):
             url = f"http://{source}"
             logging.log(logging.INFO, f"Plain IP address detected, using MJPEG camera: {url}")
-            return MJPEGVideoCapture(url)
+            return MJPEGVideoCapture(url, decodeMode, chunkSize)
 
-        # 3) Serial ports on Windows (COM), macOS (/dev/cu) or Linux (/dev/tty)
-        if source.lower().startswith(("com", "/dev/cu", "/dev/tty")):
+        # 3) Serial ports on Windows (COM), macOS (/dev/cu) or Linux (/dev/tty, /dev/pts for ptys)
+        if source.lower().startswith(("com", "/dev/cu", "/dev/tty", "/dev/pts")):
             logging.log(logging.INFO, f"Serial camera selected: {source}")
-            return SerialCamera(source)
+            return SerialCamera(source, decode_mode=decodeMode)
 
         # 4) Fallback to system camera (e.g. integer index or device path)
         logging.log(logging.INFO, f"System camera selected: {source}")
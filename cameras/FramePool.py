@@ -0,0 +1,81 @@
+import threading
+
+import numpy as np
+
+from stats import STATS
+
+# Reusable frame buffers for one camera (or one ring reader), with explicit
+# ownership. Everyone holding on to a pooled frame holds one reference:
+#
+#   acquire()  the writer gets a free buffer, holding the first reference
+#   retain()   another holder takes a reference (mailbox slot, StereoSync's
+#              last frame for "reuse", wait_frame() callers)
+#   release()  a holder is done with it; at zero the buffer is free again
+#   detach()   the buffer leaves the pool for good (read() hands it away)
+#
+# One frame's path: the source (or RingReader) acquires it and keeps its
+# reference until the next frame replaces it. FrameMailbox.post() retains
+# one, which take() hands to the consumer, or which is released when the
+# frame is overwritten untaken. InferenceTask releases its frames once
+# they're preprocessed.
+#
+# Frames carry their pool (Frame.pool); the retain()/release() functions
+# below take Frames and do nothing for frames that aren't pooled (decoded
+# JPEGs are fresh arrays from cv2.imdecode, which can't decode into a buffer).
+
+class FramePool:
+    """Up to `limit` uint8 buffers, reused once every reference is released."""
+    def __init__(self, limit: int = 8, **labels):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.free = []
+        self.held = {}   # id(buffer) → [buffer, references]
+        self.allocs = STATS.counter("frame_buffer_allocs", **labels)
+        STATS.gauge("frame_buffers", lambda: len(self.free) + len(self.held), **labels)
+
+    def acquire(self, shape):
+        """A buffer of `shape` nobody holds, with one reference for the caller."""
+        shape = tuple(shape)
+        with self.lock:
+            while self.free:
+                buf = self.free.pop()
+                if buf.shape == shape:
+                    self.held[id(buf)] = [buf, 1]
+                    return buf
+                # resolution changed, drop the old size
+            pooled = len(self.held) < self.limit
+        buf = np.empty(shape, np.uint8)
+        self.allocs.inc()
+        if pooled:
+            with self.lock:
+                self.held[id(buf)] = [buf, 1]
+        return buf
+
+    def retain(self, buf):
+        with self.lock:
+            entry = self.held.get(id(buf))
+            if entry is not None:
+                entry[1] += 1
+
+    def release(self, buf):
+        with self.lock:
+            entry = self.held.get(id(buf))
+            if entry is None:
+                return  # over the limit or detached, not ours to reuse
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.held[id(buf)]
+                self.free.append(buf)
+
+    def detach(self, buf):
+        """Never reuse `buf` again, whoever still holds it."""
+        with self.lock:
+            self.held.pop(id(buf), None)
+
+def retain(frame):
+    if frame is not None and frame.pool is not None:
+        frame.pool.retain(frame.image)
+
+def release(frame):
+    if frame is not None and frame.pool is not None:
+        frame.pool.release(frame.image)
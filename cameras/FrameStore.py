@@ -0,0 +1,208 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Recorded camera streams ("*.mjr").
+#
+#   <name>.mjr      16 byte header (magic, wall clock at creation) followed
+#                   by the raw JPEG payloads back to back, append-only
+#   <name>.mjr.idx  one INDEX_DTYPE entry per frame: payload offset/length
+#                   in the .mjr and the capture time in unix seconds
+#
+# Capture times are time.perf_counter() values shifted onto the wall clock,
+# so recordings of the left and right eye made together stay comparable.
+# The writer copies payloads into a memory map of the .mjr, the file only gets
+# its final length on close. Readers memory-map both files, payloads are
+# handed out as views of the map.
+
+MAGIC = b"MLETREC\x01"
+HEADER = struct.Struct("<8sd")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4"), ("pad", "<u4"), ("ts", "<f8")])
+INDEX_SUFFIX = ".idx"
+
+FLUSH_EVERY = 30                # frames between index flushes
+GROW_BY = 16 * 1024 * 1024      # bytes the writer's map is extended by when full
+
+def is_frame_store(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+class FrameWriter:
+    """
+    Appends JPEG payloads with their capture timestamps. Safe to call from any one thread at a time.
+    Payloads are copied into a memory map of the .mjr, grown GROW_BY at a time;
+    close() trims the unused tail. The small index entries are plain appends.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        # perf_counter → wall clock, taken once so frame spacing stays exact
+        self.clock_offset = time.time() - time.perf_counter()
+
+        index_path = path + INDEX_SUFFIX
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            if not is_frame_store(path):
+                raise ValueError(f"{path} exists and is not a frame recording")
+            # continue after the last indexed payload: an unclosed recording
+            # still has its map's zero tail, or entries that lost their data
+            reader = FrameReader(path)
+            frames = len(reader)
+            end = int(reader.index["offset"][-1] + reader.index["length"][-1]) if frames else HEADER.size
+            reader.close()
+            if os.path.exists(index_path):
+                os.truncate(index_path, frames * INDEX_DTYPE.itemsize)
+            self.file = open(path, "r+b")
+        else:
+            self.file = open(path, "w+b")
+            self.file.write(HEADER.pack(MAGIC, time.time()))
+            self.file.flush()
+            end = HEADER.size
+        self.index = open(index_path, "ab")
+        self.offset = end
+        self.data = None
+        self._grow(end)
+        self.frames = 0
+        self._entry = np.zeros(1, INDEX_DTYPE)
+
+    def _grow(self, need):
+        # remapped instead of resized in place: Windows can't extend a mapped file
+        if self.data is not None:
+            self.data.close()
+        size = max(need, self.offset + GROW_BY)
+        self.file.truncate(size)
+        self.data = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_WRITE)
+
+    def write(self, payload, ts: float = None):
+        """Append one JPEG. `ts` is a time.perf_counter() capture time (now if None)."""
+        if ts is None:
+            ts = time.perf_counter()
+        payload = memoryview(payload).cast("B")  # cv2.imencode hands out an (n, 1) array
+        with self.lock:
+            if self.data is None:
+                return
+            length = len(payload)
+            end = self.offset + length
+            if end > len(self.data):
+                self._grow(end)
+            self.data[self.offset:end] = payload
+            entry = self._entry[0]
+            entry["offset"], entry["length"], entry["ts"] = self.offset, length, ts + self.clock_offset
+            self.index.write(self._entry.tobytes())
+            self.offset = end
+            self.frames += 1
+            if self.frames % FLUSH_EVERY == 0:
+                # the payloads reach the page cache as they're copied into the
+                # map, so flushed entries can't point past the data
+                self.index.flush()
+
+    def close(self):
+        with self.lock:
+            if self.data is not None:
+                self.index.close()
+                self.data.close()
+                self.data = None
+                self.file.truncate(self.offset)
+                self.file.close()
+
+class FrameReader:
+    """
+    Read-only view of a recording. Payloads are memoryviews into the mapped
+    file, nothing is copied until something decodes them.
+    """
+    def __init__(self, path: str):
+        if not is_frame_store(path):
+            raise ValueError(f"{path} is not a frame recording")
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.created = HEADER.unpack_from(self.data)[1]
+
+        self._index_map = None
+        index = np.zeros(0, INDEX_DTYPE)
+        index_path = path + INDEX_SUFFIX
+        if os.path.exists(index_path) and os.path.getsize(index_path) >= INDEX_DTYPE.itemsize:
+            with open(index_path, "rb") as f:
+                self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            count = len(self._index_map) // INDEX_DTYPE.itemsize  # ignore a torn last entry
+            index = np.frombuffer(self._index_map, INDEX_DTYPE, count)
+        # drop entries whose payload never made it to disk
+        valid = index["offset"] + index["length"] <= len(self.data)
+        self.index = index if valid.all() else index[:np.argmin(valid)]
+        self.view = memoryview(self.data)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        """Payload of frame i as a memoryview into the mapped file."""
+        entry = self.index[i]
+        offset = int(entry["offset"])
+        return self.view[offset:offset + int(entry["length"])]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def ts(self, i) -> float:
+        return float(self.index["ts"][i])
+
+    @property
+    def duration(self) -> float:
+        if len(self) < 2:
+            return 0.0
+        return float(self.index["ts"][-1] - self.index["ts"][0])
+
+    def close(self):
+        self.index = None
+        try:
+            self.view.release()
+            self.data.close()
+            if self._index_map is not None:
+                self._index_map.close()
+        except BufferError:
+            pass  # a payload view is still alive somewhere, the maps go with it
+
+class FrameRecorder:
+    """
+    Tees every frame of a camera into a FrameWriter. JPEG sources are recorded
+    byte for byte before decoding; others (SystemCamera) get re-encoded.
+    Attach before open() to catch the first frame.
+    """
+    def __init__(self, source, path: str, quality: int = 95):
+        self.writer = FrameWriter(path)
+        self.quality = quality
+        if source.emits_jpeg:
+            source.subscribe_raw(self.writer.write)
+        else:
+            source.subscribe(self._encode)
+        logging.info(f"Recording {source.name} to {path}")
+
+    def _encode(self, frame):
+        ok, jpg = cv2.imencode(".jpg", frame.image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if ok:
+            self.writer.write(jpg, frame.ts)
+
+    def close(self):
+        self.writer.close()
+
+if __name__ == "__main__":
+    import sys
+    from cameras.JpegDecode import jpeg_size
+
+    for path in sys.argv[1:]:
+        reader = FrameReader(path)
+        n = len(reader)
+        fps = (n - 1) / reader.duration if reader.duration else 0.0
+        size = jpeg_size(reader[0]) if n else None
+        print(f"{path}: {n} frames, {reader.duration:.2f} s, {fps:.1f} fps, size {size}, "
+              f"recorded {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(reader.created))}")
+        reader.close()
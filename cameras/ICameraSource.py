@@ -1,27 +1,219 @@
 # Called ICamera, but it's going to be abstract
 
 from abc import abstractmethod
+from collections import namedtuple
 import threading
+import time
 
 import requests
 
+from stats import STATS
+
 # License is Project babble's. (because this is derived)
 # Also derived from: https://github.com/MagicBOTAlex/EyeTrackVR/blob/v2.0-beta-feature-branch/EyeTrackApp/Camera/ICameraSource.py
 
+# What sources hand to subscribers: the decoded image, a per-camera sequence
+# number that only ever increases, the time.perf_counter() capture timestamp
+# (JPEG fully received) and when decoding finished. `reused` marks a frame
+# StereoSync hands out a second time (stereoDeadlinePolicy "reuse"); its ts
+# is still the original capture time, so it says nothing about latency.
+# `pool` is the FramePool the image belongs to, None if it isn't pooled.
+Frame = namedtuple("Frame", ["image", "seq", "ts", "decoded", "reused", "pool"], defaults=(None, False, None))
+
+class PendingFrame:
+    """
+    A received JPEG that isn't decoded yet (lazyDecode). Sources publish these
+    instead of Frames, so a payload that gets overwritten before anyone takes
+    it is never decoded. resolve() decodes it once, on whichever thread asks
+    first, and returns the Frame (None if the JPEG is corrupt).
+
+    `jpeg` is bytes the frame owns outright, never a view into a buffer the
+    source reuses (the MJPEG and serial parsers' read buffers, a replay's
+    mmap): _publish_jpeg() copies views, and the copy lives as long as the
+    frame does.
+    """
+    __slots__ = ("jpeg", "seq", "ts", "source", "_lock", "_frame", "_done")
+    reused = False
+    pool = None  # fresh arrays from cv2.imdecode, never pooled
+
+    def __init__(self, jpeg, seq, ts, source):
+        self.jpeg = jpeg
+        self.seq = seq
+        self.ts = ts
+        self.source = source
+        self._lock = threading.Lock()
+        self._frame = None
+        self._done = False
+
+    def resolve(self):
+        with self._lock:
+            if not self._done:
+                self._frame = self.source._decode_pending(self)
+                self._done = True
+                self.jpeg = None
+            return self._frame
+
+    def prefetch(self):
+        """Start decoding on the source's decode pool, if it has one."""
+        if self.source.decode_pool is not None and not self._done:
+            self.source.decode_pool.submit(self.resolve)
+
+    # reads like a Frame for code that doesn't care
+    @property
+    def image(self):
+        frame = self.resolve()
+        return frame.image if frame is not None else None
+
+    @property
+    def decoded(self):
+        frame = self.resolve()
+        return frame.decoded if frame is not None else None
+
+def resolve_frames(frames):
+    """
+    `frames` with every PendingFrame decoded (None where the JPEG was corrupt).
+    With a decode pool all but the last start on the pool and the last is
+    decoded on this thread meanwhile; cv2.imdecode drops the GIL, so both eyes
+    decode in parallel.
+    """
+    pending = [f for f in frames if isinstance(f, PendingFrame)]
+    for f in pending[:-1]:
+        f.prefetch()
+    return [f.resolve() if isinstance(f, PendingFrame) else f for f in frames]
+
 class ICameraSource:
+    # True for sources that receive JPEG payloads and call _publish_raw()
+    emits_jpeg = False
+
     def __init__(self):
         self.stream = None
         self.byte_buffer = b""
         self.frame = None
+        self.frame_pool = None  # FramePool of self.frame, which holds one reference to it
         self.running = False
         self.lock = threading.Lock()
         self.thread = None
+        self.name = type(self).__name__  # label for stats/logs, sources override it
+
+        self.seq = 0
+        self.frame_ts = 0.0
+        self.new_frame = threading.Condition(self.lock)
+        self.subscribers = []
+        self.raw_subscribers = []
+        self.lazy_decode = False
+        self.decode_pool = None
+
+    def subscribe(self, callback):
+        """callback(Frame) runs on the camera thread for every new frame; keep it short."""
+        self.subscribers.append(callback)
+
+    def subscribe_raw(self, callback):
+        """callback(jpeg, ts) runs on the camera thread for every JPEG received, before decoding."""
+        self.raw_subscribers.append(callback)
+
+    def _publish_raw(self, jpeg, ts):
+        for callback in self.raw_subscribers:
+            callback(jpeg, ts)
+
+    def _publish(self, frame, ts=None, pool=None):
+        """
+        Store the newest frame, wake waiters and notify subscribers. A frame
+        from `pool` comes with the source's reference, kept until the next one.
+        """
+        decoded = time.perf_counter()
+        if ts is None:
+            ts = decoded
+        else:
+            self._decode_hist.observe(decoded - ts)
+        self._frame_counter.inc()
+        with self.lock:
+            self.seq += 1
+            old, old_pool = self.frame, self.frame_pool
+            self.frame, self.frame_pool = frame, pool
+            self.frame_ts = ts
+            seq = self.seq
+            self.new_frame.notify_all()
+        if old_pool is not None and old is not None:
+            old_pool.release(old)
+        for callback in self.subscribers:
+            callback(Frame(frame, seq, ts, decoded, pool=pool))
+
+    # --- JPEG sources ---
+    def decode_lazily(self, pool=None):
+        """Publish received JPEGs undecoded (PendingFrame), decoded when a consumer takes one. `pool` is shared by every camera."""
+        self.lazy_decode = True
+        self.decode_pool = pool
+
+    def _publish_jpeg(self, jpeg, ts):
+        """Decode and publish a received JPEG, or with lazy decoding publish it as is."""
+        if not self.lazy_decode:
+            frame = self.decoder.decode(jpeg)
+            self._decode_counter.inc()
+            if frame is None:
+                self._decode_failed()
+            else:
+                self._publish(frame, ts)
+            return
+
+        self._frame_counter.inc()
+        with self.lock:
+            self.seq += 1
+            pending = PendingFrame(bytes(jpeg), self.seq, ts, self)  # no-op for bytes, copies views
+            old, old_pool = self.frame, self.frame_pool
+            self.frame, self.frame_pool = pending, None
+            self.frame_ts = ts
+            self.new_frame.notify_all()
+        if old_pool is not None and old is not None:
+            old_pool.release(old)
+        for callback in self.subscribers:
+            callback(pending)
+
+    def _decode_pending(self, pending):
+        image = self.decoder.decode(pending.jpeg)
+        decoded = time.perf_counter()
+        self._decode_counter.inc()
+        if image is None:
+            self._decode_failed()
+            return None
+        # includes the time it waited for a consumer, same as enqueue does in eager mode
+        self._decode_hist.observe(decoded - pending.ts)
+        return Frame(image, pending.seq, pending.ts, decoded)
+
+    def _decode_failed(self):
+        """A received JPEG didn't decode. Called on whichever thread decoded it."""
+        pass
+
+    def wait_frame(self, after_seq=0, timeout=None):
+        """
+        Block until a frame newer than `after_seq` exists. Returns a Frame or
+        None on timeout. A pooled Frame is retained for the caller, who
+        releases it (FramePool.release(frame)) when done.
+        """
+        with self.lock:
+            if not self.new_frame.wait_for(lambda: self.seq > after_seq and self.frame is not None, timeout):
+                return None
+            frame = self.frame
+            if not isinstance(frame, PendingFrame):
+                if self.frame_pool is not None:
+                    self.frame_pool.retain(frame)
+                return Frame(frame, self.seq, self.frame_ts, pool=self.frame_pool)
+        return frame.resolve()
     
     def read(self):
-        if self.frame is not None:
-            frame_copy = self.frame.copy()
-            self.frame = None
-            return True, frame_copy
+        """
+        Take the newest frame: (True, image), or (False, None) if there is none
+        since the last read(). The image is handed over, not copied: a pooled
+        one leaves its pool, so it's the caller's for good.
+        """
+        with self.lock:
+            frame, self.frame = self.frame, None
+            pool, self.frame_pool = self.frame_pool, None
+        if pool is not None and frame is not None:
+            pool.detach(frame)
+        if isinstance(frame, PendingFrame):
+            frame = frame.image
+        if frame is not None:
+            return True, frame
         else:
             return False, None
         
@@ -31,8 +223,11 @@ class ICameraSource:
         
     def open(self):
         if not self.running:
+            self._decode_hist = STATS.hist("decode", source=self.name)
+            self._frame_counter = STATS.counter("frames", source=self.name)
+            self._decode_counter = STATS.counter("decodes", source=self.name)
             self.running = True
-            self.thread = threading.Thread(target=self._update, daemon=True)
+            self.thread = threading.Thread(target=self._update, daemon=True, name=f"camera:{self.name}")
             self.thread.start()
 
     def isOpened(self):
@@ -48,6 +243,10 @@ class ICameraSource:
         if self.thread is not None:
             self.thread.join()
         self.stream = None
-        self.frame = None
+        with self.lock:
+            frame, self.frame = self.frame, None
+            pool, self.frame_pool = self.frame_pool, None
+        if pool is not None and frame is not None:
+            pool.release(frame)
         self.byte_buffer = b""
         self.session.close()
\ No newline at end of file
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# JPEG decoding shared by the MJPEG and serial cameras.
+# "color"       → full-size BGR, same as before
+# "reducedGray" → single-channel, decoded at 1/2, 1/4 or 1/8 scale by libjpeg
+#                 itself, using the largest factor that still covers the model
+#                 input. Our IR eye cameras are monochrome anyway.
+DECODE_MODES = ("color", "reducedGray")
+
+# Model input is 128x128, anything smaller would have to be upscaled again
+MODEL_INPUT_SIZE = 128
+
+REDUCED_GRAYSCALE = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+# SOFn markers carry the frame size. C4 (DHT), C8 (JPG) and CC (DAC) share the range but don't.
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def jpeg_size(buf):
+    """
+    Return (width, height) from the JPEG's SOF header without decoding,
+    or None if the header can't be found.
+    """
+    n = len(buf)
+    pos = 2  # skip SOI
+    while pos + 4 <= n:
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in SOF_MARKERS:
+            if pos + 9 > n:
+                return None
+            height = (buf[pos + 5] << 8) | buf[pos + 6]
+            width  = (buf[pos + 7] << 8) | buf[pos + 8]
+            return width, height
+        if marker == 0xDA:  # start of scan, no SOF before it
+            return None
+        pos += 2 + ((buf[pos + 2] << 8) | buf[pos + 3])
+    return None
+
+def reduced_flag(size, min_size: int = MODEL_INPUT_SIZE):
+    """Largest IMREAD_REDUCED_GRAYSCALE_* that keeps both sides >= min_size."""
+    if size is not None:
+        width, height = size
+        for factor, flag in REDUCED_GRAYSCALE:
+            if width // factor >= min_size and height // factor >= min_size:
+                return flag
+    return cv2.IMREAD_GRAYSCALE
+
+class JpegDecoder:
+    def __init__(self, mode: str = "color", min_size: int = MODEL_INPUT_SIZE):
+        if mode not in DECODE_MODES:
+            raise ValueError(f"Unknown decodeMode {mode!r}, expected one of {DECODE_MODES}")
+        self.mode = mode
+        self.min_size = min_size
+        # Streams don't change resolution often, cache the flag per size
+        self._flags = {}
+
+    def decode(self, jpeg):
+        """Decode a JPEG payload (bytes-like). Returns None for corrupt data."""
+        arr = np.frombuffer(jpeg, dtype=np.uint8)
+        if arr.size == 0:
+            return None
+        if self.mode == "color":
+            return cv2.imdecode(arr, cv2.IMREAD_COLOR)
+
+        size = jpeg_size(memoryview(arr))
+        flag = self._flags.get(size)
+        if flag is None:
+            flag = self._flags[size] = reduced_flag(size, self.min_size)
+        return cv2.imdecode(arr, flag)
+
+def decode_pool(threads: int):
+    """Threads that every lazily decoding camera shares (decodeThreads), None for 0 = decode on the consumer."""
+    if threads <= 0:
+        return None
+    return ThreadPoolExecutor(threads, thread_name_prefix="JpegDecode")
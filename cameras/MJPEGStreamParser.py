@@ -0,0 +1,109 @@
+import re
+
+# Incremental multipart MJPEG parser.
+# Bytes are appended into one preallocated bytearray, marker searches resume
+# where the previous chunk stopped, and consumed bytes are only compacted away
+# once they take up half the buffer, so parsing is linear in stream size.
+# If a part carries a Content-Length header the JPEG is cut by length instead
+# of searching for the EOI marker.
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+CONTENT_LENGTH = re.compile(rb"content-length:\s*(\d+)", re.IGNORECASE)
+
+# Give up on junk without a SOI after this many bytes
+MAX_HEADER_BYTES = 64 * 1024
+
+class MJPEGStreamParser:
+    def __init__(self, capacity: int = 256 * 1024):
+        self.buf = bytearray(capacity)
+        self.mv = memoryview(self.buf)
+        self.read_pos = 0    # first unconsumed byte
+        self.write_pos = 0   # end of valid data
+        self.scan_pos = 0    # where the next marker search resumes
+        self.soi = -1        # start of the JPEG being assembled, -1 while in headers
+        self.length = None   # Content-Length of the current part, if the camera sent one
+
+        self.frames = 0
+        self.bad_lengths = 0
+
+    def reset(self):
+        """Drop all buffered data, e.g. after reconnecting."""
+        self.read_pos = self.write_pos = self.scan_pos = 0
+        self.soi = -1
+        self.length = None
+
+    def _reserve(self, n: int):
+        """Make room for n more bytes, compacting or growing the buffer."""
+        capacity = len(self.buf)
+        if self.write_pos + n <= capacity and self.read_pos < capacity // 2:
+            return
+
+        # compact: slide unconsumed data to the front (memmove via memoryview)
+        shift = self.read_pos
+        if shift:
+            used = self.write_pos - shift
+            self.mv[:used] = self.mv[shift:self.write_pos]
+            self.read_pos = 0
+            self.write_pos = used
+            self.scan_pos -= shift
+            if self.soi != -1:
+                self.soi -= shift
+
+        if self.write_pos + n > capacity:
+            grown = bytearray(max(capacity * 2, self.write_pos + n))
+            grown[:self.write_pos] = self.mv[:self.write_pos]
+            self.mv.release()
+            self.buf = grown
+            self.mv = memoryview(self.buf)
+
+    def feed(self, chunk):
+        """Append a chunk of stream data and return every JPEG it completed, oldest first."""
+        n = len(chunk)
+        self._reserve(n)
+        self.mv[self.write_pos:self.write_pos + n] = chunk
+        self.write_pos += n
+
+        frames = []
+        while True:
+            if self.soi == -1:
+                # headers / boundary: look for the next SOI
+                start = self.buf.find(SOI, self.scan_pos, self.write_pos)
+                if start == -1:
+                    # a marker may straddle the chunk boundary, keep the last byte
+                    self.scan_pos = max(self.read_pos, self.write_pos - 1)
+                    if self.write_pos - self.read_pos > MAX_HEADER_BYTES:
+                        self.read_pos = self.scan_pos
+                    break
+
+                match = CONTENT_LENGTH.search(self.buf, self.read_pos, start)
+                self.length = int(match.group(1)) if match else None
+                self.soi = self.read_pos = start
+                self.scan_pos = start + 2
+
+            if self.length:
+                end = self.soi + self.length
+                if self.write_pos < end:
+                    break
+                if self.buf[end - 2:end] == EOI:
+                    frames.append(bytes(self.mv[self.soi:end]))
+                    self._consumed(end)
+                    continue
+                # header lied; fall back to marker search for this part
+                self.bad_lengths += 1
+                self.length = None
+
+            eoi = self.buf.find(EOI, self.scan_pos, self.write_pos)
+            if eoi == -1:
+                self.scan_pos = max(self.soi + 2, self.write_pos - 1)
+                break
+            frames.append(bytes(self.mv[self.soi:eoi + 2]))
+            self._consumed(eoi + 2)
+
+        return frames
+
+    def _consumed(self, end: int):
+        self.frames += 1
+        self.read_pos = self.scan_pos = end
+        self.soi = -1
+        self.length = None
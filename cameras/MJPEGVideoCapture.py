@@ -5,41 +5,47 @@ import threading
 import time
 
 from cameras.ICameraSource import ICameraSource
+from cameras.JpegDecode import JpegDecoder
+from cameras.MJPEGStreamParser import MJPEGStreamParser
 
 # Source: https://github.com/Project-Babble/ProjectBabble/pull/105/commits/48938d19d15c177beaa04461b28d7959e1343d53
 # License is Project babble's
 
 class MJPEGVideoCapture(ICameraSource):
-    def __init__(self, url):
+    emits_jpeg = True
+
+    def __init__(self, url, decode_mode="color", chunk_size=1024):
+        """
+        :param url: MJPEG stream URL
+        :param decode_mode: "color" or "reducedGray" (see cameras/JpegDecode.py)
+        :param chunk_size: bytes per socket read. Reads block until the chunk
+                           is full, so larger chunks trade latency for CPU.
+        """
         self.url = url
         self.session = requests.Session()
+        self.decoder = JpegDecoder(decode_mode)
+        self.chunk_size = chunk_size
+        self.parser = MJPEGStreamParser()
         
         super().__init__()
+        self.name = url
     
     def _update(self):
         while self.running:
             try:
                 self.stream = self.session.get(self.url, stream=True, timeout=0.5)
-                for chunk in self.stream.iter_content(chunk_size=1024):
+                self.parser.reset()
+                for chunk in self.stream.iter_content(chunk_size=self.chunk_size):
                     if not self.running:
                         break
-                    self.byte_buffer += chunk
-                    # Process all available complete frames in the buffer
-                    while True:
-                        start = self.byte_buffer.find(b'\xff\xd8')  # JPEG start marker
-                        end = self.byte_buffer.find(b'\xff\xd9')    # JPEG end marker
-                        if start != -1 and end != -1:
-                            jpg = self.byte_buffer[start:end+2]
-                            self.byte_buffer = self.byte_buffer[end+2:]
-                            
-                            image = np.frombuffer(jpg, dtype=np.uint8)
-                            if image.size != 0:
-                                frame = cv2.imdecode(image, cv2.IMREAD_COLOR)
-                                if frame is not None:
-                                    with self.lock:
-                                        self.frame = frame  # Always update to the latest frame
-                        else:
-                            break
+                    jpegs = self.parser.feed(chunk)
+                    if not jpegs:
+                        continue
+                    ts = time.perf_counter()
+                    for jpeg in jpegs:
+                        self._publish_raw(jpeg, ts)
+                    # Only the newest complete frame is worth decoding
+                    self._publish_jpeg(jpegs[-1], ts)  # Always update to the latest frame
             except requests.RequestException:
                 # If a network error occurs, wait briefly and retry
                 time.sleep(0.1)
@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from urllib.parse import parse_qsl
+
+from cameras.FrameStore import FrameReader
+from cameras.ICameraSource import ICameraSource
+from cameras.JpegDecode import JpegDecoder
+
+# Plays a FrameStore recording back as a camera.
+#
+#   replay:/path/left.mjr                     real time, once
+#   replay:/path/left.mjr?speed=0.5&loop=1    half speed, looping
+#   replay:/path/left.mjr?mode=fast           as fast as frames decode
+#   replay:/path/left.mjr?mode=step           only on step(), for debugging
+#
+# The published ts is when the frame is handed out, so latency stats measure
+# our pipeline, not the recording.
+
+REPLAY_MODES = ("realtime", "fast", "step")
+
+class ReplayClock:
+    """
+    Maps recorded wall-clock times onto time.perf_counter(). Cameras that start
+    together on recordings made together share one anchor, so the left and
+    right eye keep their original skew on playback.
+    """
+    WINDOW = 1.0  # seconds, both for starting together and for recorded together
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.anchor = None  # (perf_counter, recorded ts)
+
+    def start(self, recorded_ts):
+        now = time.perf_counter()
+        with self.lock:
+            if (self.anchor is None or now - self.anchor[0] > self.WINDOW
+                    or abs(recorded_ts - self.anchor[1]) > self.WINDOW):
+                self.anchor = (now, recorded_ts)
+            return self.anchor
+
+SHARED_CLOCK = ReplayClock()
+
+def parse_replay_source(source: str):
+    """'replay:<path>[?key=value&...]' → (path, options dict)."""
+    spec = source[len("replay:"):]
+    path, _, query = spec.partition("?")
+    return path, dict(parse_qsl(query))
+
+class ReplayCamera(ICameraSource):
+    emits_jpeg = True
+
+    def __init__(self, path, mode="realtime", speed=1.0, loop=False, decode_mode="color", clock=SHARED_CLOCK):
+        """
+        :param path: .mjr recording made by FrameRecorder
+        :param mode: "realtime" (recorded timing / speed), "fast" or "step"
+        :param speed: playback speed for realtime mode
+        :param loop: start over at the end instead of stopping
+        """
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode {mode!r}, expected one of {REPLAY_MODES}")
+        self.path = path
+        self.reader = FrameReader(path)
+        if len(self.reader) == 0:
+            raise ValueError(f"{path} has no frames")
+        self.mode = mode
+        self.speed = float(speed)
+        self.loop = loop
+        self.decoder = JpegDecoder(decode_mode)
+        self.clock = clock
+        self.position = 0   # next frame to publish
+        self.steps = threading.Semaphore(0)
+
+        super().__init__()
+        self.name = path
+
+    @classmethod
+    def from_source(cls, source: str, decode_mode="color"):
+        path, opts = parse_replay_source(source)
+        return cls(path,
+                   mode=opts.get("mode", "realtime"),
+                   speed=float(opts.get("speed", 1.0)),
+                   loop=opts.get("loop", "0").lower() in ("1", "true", "yes"),
+                   decode_mode=decode_mode)
+
+    def step(self, n: int = 1):
+        """Publish the next n frames (step mode)."""
+        for _ in range(n):
+            self.steps.release()
+
+    def seek(self, index: int):
+        """Continue from frame `index` (takes effect with the next frame)."""
+        self.position = max(0, min(index, len(self.reader) - 1))
+
+    def _publish_index(self, i):
+        jpeg = self.reader[i]
+        ts = time.perf_counter()
+        self._publish_raw(jpeg, ts)
+        self._publish_jpeg(jpeg, ts)
+
+    def _update(self):
+        reader, n = self.reader, len(self.reader)
+        ts = reader.index["ts"]
+
+        if self.mode == "step":
+            # show the first frame right away so the pipeline primes
+            self._publish_index(self.position)
+            while self.running:
+                if self.steps.acquire(timeout=0.1):
+                    self.position = (self.position + 1) % n if self.loop else min(self.position + 1, n - 1)
+                    self._publish_index(self.position)
+            return
+
+        start_perf, start_ts = self.clock.start(float(ts[self.position]))
+        span = float(ts[-1] - ts[0]) + (float(ts[-1] - ts[-2]) if n > 1 else 0.0)  # one loop incl. last gap
+        shift = 0.0  # recorded seconds added per completed loop
+        while self.running:
+            i = self.position
+            if self.mode == "realtime":
+                due = start_perf + (float(ts[i]) + shift - start_ts) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self._publish_index(i)
+
+            if i + 1 < n:
+                self.position = i + 1
+            elif self.loop:
+                self.position = 0
+                shift += span
+            else:
+                logging.info(f"Replay of {self.path} finished ({n} frames)")
+                break
+
+    def release(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        self.frame = None
+        self.reader.close()
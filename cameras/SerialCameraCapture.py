@@ -1,28 +1,114 @@
+import logging
+import time
+
 import serial
-import cv2
-import numpy as np
 
 # Derived from: https://github.com/MagicBOTAlex/EyeTrackVR/blob/v2.0-beta-feature-branch/EyeTrackApp/Camera/SerialCamera.py
 # Not babble license
 # Fed directly into chatGPT
 
 from cameras.ICameraSource import ICameraSource
+from cameras.JpegDecode import JpegDecoder
+from stats import STATS
+
+# ETVR packet: FF A0 FF A1 <u16 little-endian length> <JPEG>
+ETVR_HEADER     = b"\xff\xa0\xff\xa1"
+ETVR_HEADER_LEN = 6
+
+class ETVRPacketParser:
+    """
+    Splits the ETVR serial byte stream into JPEG payloads.
+    Reads land directly in a preallocated bytearray (reserve() → readinto →
+    commit()), and drain() pulls out every complete packet, keeping only the
+    newest so a backlog never builds up.
+    """
+    def __init__(self, capacity: int = 256 * 1024, **labels):
+        self.buf = bytearray(capacity)
+        self.mv = memoryview(self.buf)
+        self.read_pos = 0
+        self.write_pos = 0
+
+        self.packets = 0   # complete packets seen
+        # complete packets superseded by a newer one in the same drain
+        self.dropped = STATS.counter("serial_packets_dropped", **labels)
+        # packets that failed validation (or decoding, see SerialCamera)
+        self.corrupt = STATS.counter("serial_packets_corrupt", **labels)
+
+    def reserve(self, n: int) -> memoryview:
+        """Writable view of n bytes at the end of the buffer."""
+        if self.write_pos + n > len(self.buf) or self.read_pos > len(self.buf) // 2:
+            used = self.write_pos - self.read_pos
+            if self.read_pos:
+                self.mv[:used] = self.mv[self.read_pos:self.write_pos]
+                self.read_pos, self.write_pos = 0, used
+            if used + n > len(self.buf):
+                grown = bytearray(max(len(self.buf) * 2, used + n))
+                grown[:used] = self.mv[:used]
+                self.mv.release()
+                self.buf = grown
+                self.mv = memoryview(self.buf)
+        return self.mv[self.write_pos:self.write_pos + n]
+
+    def commit(self, n: int):
+        self.write_pos += n
+
+    def drain(self):
+        """Return the newest complete JPEG payload (bytes) or None."""
+        newest = None
+        while True:
+            idx = self.buf.find(ETVR_HEADER, self.read_pos, self.write_pos)
+            if idx < 0:
+                # keep only the tail in case the header spans reads
+                self.read_pos = max(self.read_pos, self.write_pos - (len(ETVR_HEADER) - 1))
+                break
+            self.read_pos = idx
+
+            # need the full header to read the packet size
+            if self.write_pos < idx + ETVR_HEADER_LEN:
+                break
+            length = self.buf[idx + 4] | (self.buf[idx + 5] << 8)
+            start = idx + ETVR_HEADER_LEN
+            end = start + length
+
+            # a JPEG always starts with SOI; otherwise this wasn't a real header
+            if length < 4 or (self.write_pos >= start + 2 and self.buf[start:start + 2] != b"\xff\xd8"):
+                self.corrupt.inc()
+                self.read_pos = idx + 2
+                continue
+
+            # wait until the full JPEG arrives
+            if self.write_pos < end:
+                break
+
+            self.packets += 1
+            if newest is not None:
+                self.dropped.inc()
+            newest = (start, end)
+            self.read_pos = end
+
+        if newest is None:
+            return None
+        return bytes(self.mv[newest[0]:newest[1]])
+
 class SerialCamera(ICameraSource):
-    def __init__(self, port, baudrate=3000000):
+    emits_jpeg = True
+
+    def __init__(self, port, baudrate=3000000, decode_mode="color"):
         """
         :param port: Serial port (e.g. "COM3" or "/dev/ttyUSB0")
         :param baudrate: Baud rate for the ETVR camera
+        :param decode_mode: "color" or "reducedGray" (see cameras/JpegDecode.py)
         """
         super().__init__()
         self.port = port
+        self.name = port
         self.baudrate = baudrate
+        self.decoder = JpegDecoder(decode_mode)
         self.conn = None
-        self.buffer = b""
+        self.parser = ETVRPacketParser(source=port)
 
-        # ETVR headers
-        self.ETVR_HEADER      = b"\xff\xa0"
-        self.ETVR_HEADER_FRAME= b"\xff\xa1"
-        self.ETVR_HEADER_LEN  = 6
+    def _decode_failed(self):
+        self.parser.corrupt.inc()
 
     def _update(self):
         # 1) open serial port
@@ -33,46 +119,32 @@ class SerialCamera(ICameraSource):
             return
 
         # 2) read loop
+        parser = self.parser
+        last_log = time.time()
+        logged_dropped = logged_corrupt = 0
         while self.running:
-            data = self.conn.read(2048)
-            if not data:
-                continue
-            self.buffer += data
-
-            # find the start of a frame packet
-            idx = self.buffer.find(self.ETVR_HEADER + self.ETVR_HEADER_FRAME)
-            if idx < 0:
-                # keep only the tail in case header spans reads
-                if len(self.buffer) > self.ETVR_HEADER_LEN:
-                    self.buffer = self.buffer[-self.ETVR_HEADER_LEN:]
-                continue
-
-            # need at least 6 bytes to read packet-size
-            if len(self.buffer) < idx + 6:
+            # read everything the driver already has; block for 1 byte when idle
+            n = self.conn.in_waiting or 1
+            got = self.conn.readinto(parser.reserve(n))
+            if not got:
                 continue
+            parser.commit(got)
 
-            # packet-size is two bytes at offset 4..6
-            length = int.from_bytes(self.buffer[idx+4:idx+6], "little")
-            frame_end = idx + self.ETVR_HEADER_LEN + length
-
-            # wait until the full JPEG arrives
-            if len(self.buffer) < frame_end:
-                continue
-
-            # extract and drop it from buffer
-            jpeg = self.buffer[idx + self.ETVR_HEADER_LEN : frame_end]
-            self.buffer = self.buffer[frame_end:]
-
-            # decode JPEG into BGR image
-            arr = np.frombuffer(jpeg, dtype=np.uint8)
-            frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-            if frame is None:
-                # corrupted, skip
-                continue
+            jpeg = parser.drain()
+            if jpeg is not None:
+                ts = time.perf_counter()
+                self._publish_raw(jpeg, ts)
+                # decode JPEG (BGR or reduced grayscale, per decode mode), now or when taken with lazyDecode
+                self._publish_jpeg(jpeg, ts)
 
-            # store latest frame
-            with self.lock:
-                self.frame = frame
+            now = time.time()
+            if now - last_log >= 10.0:
+                dropped, corrupt = parser.dropped.value, parser.corrupt.value
+                if dropped != logged_dropped or corrupt != logged_corrupt:
+                    logging.info("%s: %d packets, %d dropped (stale), %d corrupt",
+                                 self.port, parser.packets, dropped, corrupt)
+                    logged_dropped, logged_corrupt = dropped, corrupt
+                last_log = now
 
         # 3) clean up
         self.conn.close()
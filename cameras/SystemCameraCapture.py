@@ -8,6 +8,7 @@ from colorama import Fore
 from enum import Enum
 import socket
 
+from cameras.FramePool import FramePool
 from cameras.ICameraSource import ICameraSource
 
 # Should not be subject to Babble's license.
@@ -21,6 +22,7 @@ class SystemCamera(ICameraSource):
         """
         super().__init__()
         self.source = source
+        self.name = str(source)
         self.cv2_capture = None
 
     def _update(self):
@@ -38,16 +40,21 @@ class SystemCamera(ICameraSource):
         else:
             print(f"Timed out after {timeout} seconds waiting for condition.")
 
-        # Read loop
+        # Read loop, into pool buffers once the frame size is known
+        pool = FramePool(source=self.name)
+        shape = None
         while self.running:
-            ret, frame = self.cv2_capture.read()
+            buf = pool.acquire(shape) if shape is not None else None
+            ret, frame = self.cv2_capture.read(buf)
+            if buf is not None and frame is not buf:
+                pool.release(buf)  # no frame, or the size changed and OpenCV allocated its own
             if not ret:
                 # failed to grab a frame
                 break
+            shape = frame.shape
 
-            # Store the latest frame (thread-safe)
-            with self.lock:
-                self.frame = frame
+            # Store the latest frame (thread-safe), the source keeps the acquired reference
+            self._publish(frame, pool=pool if frame is buf else None)
 
         # Clean up
         self.cv2_capture.release()
\ No newline at end of file
@@ -1,7 +1,10 @@
 import logging
 import threading
 import time
+from cameras.FramePool import release, retain
+from cameras.ICameraSource import resolve_frames
 from helpers import *
+from stats import STATS
 
 # ----------------------------
 # Setup basic logging once
@@ -11,14 +14,96 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s",
 )
 
+# ----------------------------
+# Latest-frame mailbox
+# ----------------------------
+class FrameMailbox:
+    """
+    Holds the newest Frame per eye ("L"/"R"). Both slots share one condition,
+    so a consumer sleeps until either eye has a frame it hasn't taken yet.
+    Posting overwrites; nothing ever blocks the camera threads.
+
+    A pooled frame (FramePool) is retained while it sits here; take() hands
+    that reference to the consumer, an overwritten frame releases it.
+    `queued` has how long each eye's last taken frame sat here, the time the
+    consumer was busy elsewhere.
+
+    Server mode passes one `cond` to every user's mailbox, so its single
+    inference thread wakes for a frame from anyone; `labels` tell the users'
+    stats apart.
+    """
+    EYES = ("L", "R")
+
+    def __init__(self, cond=None, labels=None):
+        labels = labels or {}
+        self.cond  = cond or threading.Condition()
+        self.slots = {eye: None for eye in self.EYES}
+        self.taken = {eye: 0 for eye in self.EYES}   # seq last handed out per eye
+        self.posted = {eye: 0.0 for eye in self.EYES}  # when the slot's frame arrived
+        self.queued = {eye: 0.0 for eye in self.EYES}  # seconds the last taken frame waited
+        self.overwritten = {eye: STATS.counter("frames_dropped", reason="overwritten", eye=eye, **labels)
+                            for eye in self.EYES}
+        STATS.gauge("mailbox_pending", self.pending, **labels)
+
+    def post(self, eye, frame):
+        retain(frame)
+        with self.cond:
+            old = self.slots[eye]
+            if old is not None and old.seq > self.taken[eye]:
+                self.overwritten[eye].inc()  # consumer never took it
+            else:
+                old = None  # taken, its reference went with it
+            self.slots[eye] = frame
+            self.posted[eye] = time.perf_counter()
+            self.cond.notify_all()
+        release(old)
+
+    def pending(self):
+        """Number of eyes holding a frame that hasn't been taken yet."""
+        with self.cond:
+            return sum(f is not None and f.seq > self.taken[eye]
+                       for eye, f in self.slots.items())
+
+    def _has_new(self):
+        return any(f is not None and f.seq > self.taken[eye]
+                   for eye, f in self.slots.items())
+
+    def take(self, timeout=None, resolve=True):
+        """
+        Wait until at least one eye has a new frame and return (frameL, frameR),
+        with None for an eye that has nothing new. Returns (None, None) on timeout.
+
+        With lazyDecode the slots hold PendingFrames; they are decoded here,
+        after the lock is released, and an eye whose JPEG was corrupt comes
+        back None. resolve=False leaves that to the caller (resolve_frames).
+        """
+        with self.cond:
+            if not self.cond.wait_for(self._has_new, timeout):
+                return None, None
+            now = time.perf_counter()
+            out = []
+            for eye in self.EYES:
+                f = self.slots[eye]
+                if f is not None and f.seq > self.taken[eye]:
+                    self.taken[eye] = f.seq
+                    self.queued[eye] = now - self.posted[eye]
+                    out.append(f)
+                else:
+                    out.append(None)
+        return tuple(resolve_frames(out) if resolve else out)
+
 # ----------------------------
 # Frame Capture Task
 # ----------------------------
 class CaptureTask(threading.Thread):
-    def __init__(self, capL, capR, queueL, queueR):
-        super().__init__(daemon=True)
+    """
+    Wires both cameras into the mailbox. Frames are handed over on the camera
+    threads as they are published; this thread only logs the rates.
+    """
+    def __init__(self, capL, capR, mailbox):
+        super().__init__(daemon=True, name="CaptureTask")
         self.capL, self.capR = capL, capR
-        self.queueL, self.queueR = queueL, queueR
+        self.mailbox = mailbox
 
         # Counters for left & right
         self.countL = 0
@@ -26,35 +111,28 @@ class CaptureTask(threading.Thread):
         # Single timer for logging both together
         self.last_log_time = time.time()
 
+        capL.subscribe(self._on_left)
+        capR.subscribe(self._on_right)
+
+    def _on_left(self, frame):
+        self.mailbox.post("L", frame)
+        self.countL += 1
+
+    def _on_right(self, frame):
+        self.mailbox.post("R", frame)
+        self.countR += 1
+
     def run(self):
         while True:
+            time.sleep(1.0)
             now = time.time()
 
-            # --- Left camera ---
-            okL, fL = self.capL.read()
-            if okL:
-                if self.queueL.full():
-                    self.queueL.get_nowait()
-                self.queueL.put(fL)
-                self.countL += 1
-
-            # --- Right camera ---
-            okR, fR = self.capR.read()
-            if okR:
-                if self.queueR.full():
-                    self.queueR.get_nowait()
-                self.queueR.put(fR)
-                self.countR += 1
-
             # Once a second, log both FPS in one line
             elapsed = now - self.last_log_time
-            if elapsed >= 1.0:
-                fpsL = self.countL / elapsed
-                fpsR = self.countR / elapsed
-                logging.info(f"Left: {fpsL:.2f} fps, Right: {fpsR:.2f} fps")
-                # reset counters & timer
-                self.countL = 0
-                self.countR = 0
-                self.last_log_time = now
-
-            time.sleep(0.001)
+            fpsL = self.countL / elapsed
+            fpsR = self.countR / elapsed
+            logging.info(f"Left: {fpsL:.2f} fps, Right: {fpsR:.2f} fps")
+            # reset counters & timer
+            self.countL = 0
+            self.countR = 0
+            self.last_log_time = now
@@ -3,32 +3,318 @@ import logging
 import os
 import threading
 import time
-from helpers import *
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from cameras.JpegDecode import DECODE_MODES
+from helpers import calculate_offset_fraction
+from model_manifest import MODEL_VARIANTS
+from osc import OSCTemplate, output_mode, output_table, parse_targets
+from sessions import MODEL_SETTINGS, required_models, session_options, standby_models
+from sync import StereoSync
+
+try:
+    # inotify on Linux, ReadDirectoryChangesW on Windows, FSEvents on macOS
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# ----------------------------
+# Settings schema
+# ----------------------------
+NUMBER = (int, float)
+
+# key: (allowed types, required)
+SCHEMA = {
+    "leftEye"               : (str, True),
+    "rightEye"              : (str, True),
+    "vrcOsc"                : ((str, list), True),
+    "vrcNative"             : (bool, True),
+    "modelFile"             : (str, True),
+    "decodeMode"            : (str, False),
+    "mjpegChunkSize"        : (int, False),
+    "lazyDecode"            : (bool, False),
+    "decodeThreads"         : (int, False),
+    "recordDir"             : (str, False),
+    "trackingForcedOffline" : (bool, True),
+    "vrcftV1"               : (bool, True),
+    "vrcftV2"               : (bool, True),
+    "pitchOffset"           : (NUMBER, True),
+    "independentEyes"       : (bool, False),
+    "independentOpenness"   : (bool, False),
+    "batchedEyes"           : (bool, False),
+    "ioBinding"             : (bool, False),
+    "stereoSync"            : (bool, False),
+    "stereoMaxSkewMs"       : (NUMBER, False),
+    "stereoDeadlineMs"      : (NUMBER, False),
+    "stereoDeadlinePolicy"  : (str, False),
+    "activeEyeTracking"     : (bool, False),
+    "activeOpennessTracking": (bool, False),
+    "opennessSliderHandles" : (list, True),
+    "verticalExaggeration"  : (NUMBER, True),
+    "horizontalExaggeration": (NUMBER, True),
+    "oscPrefix"             : (str, True),
+    "splitOutputY"          : (bool, False),
+    "blinkReleaseDelayMs"   : (NUMBER, True),
+    "oscRateHz"             : (NUMBER, False),
+    "oscExtrapolateMaxMs"   : (NUMBER, False),
+    "gazeFilter"            : (bool, False),
+    "gazeFilterMinCutoff"   : (NUMBER, False),
+    "gazeFilterBeta"        : (NUMBER, False),
+    "gazeFilterDCutoff"     : (NUMBER, False),
+    "gazePredictionMaxMs"   : (NUMBER, False),
+    "gazePredictionMaxSpeed": (NUMBER, False),
+    "modelVariant"          : (str, False),
+    "fusedPostprocess"      : (bool, False),
+    "optimizedModelCache"   : (bool, False),
+    "sessionOptions"        : (dict, False),
+    "infrencePerSecondLimit": (NUMBER, False),
+    "governor"              : (bool, False),
+    "latencyBudgetMs"       : (NUMBER, False),
+    "frameGating"           : (bool, False),
+    "frameGatingThreshold"  : (NUMBER, False),
+    "frameGatingRefreshMs"  : (NUMBER, False),
+    "statsPort"             : (int, False),
+    "multiProcess"          : (bool, False),
+}
+
+CHOICES = {
+    "decodeMode"          : DECODE_MODES,
+    "stereoDeadlinePolicy": StereoSync.POLICIES,
+    "modelVariant"        : MODEL_VARIANTS,
+}
+
+def _type_ok(value, types):
+    types = types if isinstance(types, tuple) else (types,)
+    if isinstance(value, bool) and bool not in types:
+        return False  # True is an int to Python, not to us
+    return isinstance(value, types)
+
+def validate(cfg):
+    """Problems with a parsed Settings.json, as a list of messages (empty = fine)."""
+    if not isinstance(cfg, dict):
+        return ["top level must be an object"]
+    problems = []
+    for key, (types, required) in SCHEMA.items():
+        if key not in cfg:
+            if required:
+                problems.append(f"{key} is missing")
+        elif not _type_ok(cfg[key], types):
+            names = " or ".join(t.__name__ for t in (types if isinstance(types, tuple) else (types,)))
+            problems.append(f"{key} must be {names}, not {type(cfg[key]).__name__}")
+        elif key in CHOICES and cfg[key] not in CHOICES[key]:
+            problems.append(f"{key} must be one of {', '.join(CHOICES[key])}")
+    if problems:
+        return problems
+
+    handles = cfg["opennessSliderHandles"]
+    if (len(handles) != 4 or not all(_type_ok(h, NUMBER) for h in handles)
+            or any(a > b for a, b in zip(handles, handles[1:]))):
+        problems.append("opennessSliderHandles must be 4 ascending numbers")
+    targets = cfg["vrcOsc"] if isinstance(cfg["vrcOsc"], list) else cfg["vrcOsc"].split(",")
+    if not targets:
+        problems.append("vrcOsc needs at least one host:port")
+    for target in targets:
+        host, _, port = str(target).strip().rpartition(":")
+        if not isinstance(target, str) or not host or not port.isdigit() or not 0 < int(port) < 65536:
+            problems.append(f"vrcOsc: {target!r} is not host:port")
+    for key, spec in cfg.get("sessionOptions", {}).items():
+        try:
+            session_options(spec)
+        except (ValueError, TypeError, AttributeError) as e:
+            problems.append(f"sessionOptions.{key}: {e}")
+
+    unknown = sorted(set(cfg) - set(SCHEMA))
+    if unknown:
+        logging.warning(f"Unknown settings (typo?): {', '.join(unknown)}")
+    return problems
+
+# ----------------------------
+# Immutable settings snapshot
+# ----------------------------
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _thaw(value):
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+class ConfigSnapshot(Mapping):
+    """
+    One version of Settings.json, read-only, with everything the per-frame
+    loops derive from it computed once here. Reads like a dict
+    (cfg["vrcOsc"], cfg.get("stereoSync")); lists come back as tuples.
+    """
+    def __init__(self, raw, version):
+        cfg = {k: _freeze(v) for k, v in raw.items()}
+        fields = {
+            "_values": cfg,
+            "version": version,
+            # inference
+            "offset_fraction": calculate_offset_fraction(cfg["pitchOffset"]),
+            "openness_handles": cfg["opennessSliderHandles"],
+            "model_key": tuple(cfg.get(k) for k in MODEL_SETTINGS),
+            "required_models": frozenset(required_models(cfg)),
+            "standby_models": frozenset(standby_models(cfg)),
+            # OSC
+            "output_mode": output_mode(cfg),
+            "osc_table": tuple((addr, tuple(srcs)) for addr, srcs in output_table(cfg)),
+            "osc_targets": tuple(parse_targets(cfg["vrcOsc"])),  # resolved here, not on the OSC thread
+            "blink_release": cfg["blinkReleaseDelayMs"] / 1000.0,
+        }
+        fields["osc_templates"] = tuple((OSCTemplate(addr, len(srcs)), srcs)
+                                        for addr, srcs in fields["osc_table"])
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is read-only")
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __reduce__(self):
+        # pickled (multiProcess mode) as the plain settings, derived fields are rebuilt on arrival
+        return ConfigSnapshot, (_thaw(self._values), self.version)
+
+    def __repr__(self):
+        return f"<ConfigSnapshot v{self.version}>"
+
+class SharedConfig:
+    """
+    The current ConfigSnapshot. Readers just read `.current`, ConfigTask
+    swaps in a whole new snapshot, so nobody needs a lock.
+    """
+    def __init__(self):
+        self.current = None
+        self._ready = threading.Event()
+
+    def publish(self, snapshot):
+        self.current = snapshot
+        self._ready.set()
+
+    def wait(self, timeout=None):
+        """The current snapshot, once there is one. None on timeout."""
+        self._ready.wait(timeout)
+        return self.current
 
 # ----------------------------
 # Config Loader Task
 # ----------------------------
 class ConfigTask(threading.Thread):
-    def __init__(self, path, shared, lock, interval=0.5):
-        super().__init__(daemon=True)
-        self.path = path
+    """
+    Watches Settings.json and publishes a new snapshot when it changes. Bursts
+    of writes (editors save in several steps) are debounced; a file that
+    doesn't parse or validate is reported and the previous settings stay.
+    Without watchdog installed the file's mtime is polled instead.
+    """
+    def __init__(self, path, shared, debounce=0.2, interval=0.5):
+        super().__init__(daemon=True, name="ConfigTask")
+        self.path = os.path.abspath(path)
+        self.label = os.path.basename(path)
         self.shared = shared
-        self.lock = lock
+        self.debounce = debounce
         self.interval = interval
-        self._last_mtime = 0
+        self._changed = threading.Event()
+        self._raw = None
+        self._version = 0
 
-    def run(self):
+    # --- change notification ---
+    def _watch(self):
+        if Observer is not None:
+            task = self
+
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    if event.event_type not in ("created", "modified", "moved", "closed"):
+                        return  # opened / closed_no_write: our own reads
+                    paths = (getattr(event, "src_path", ""), getattr(event, "dest_path", ""))
+                    if task.path in map(os.path.abspath, filter(None, paths)):
+                        task._changed.set()
+
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(Handler(), os.path.dirname(self.path), recursive=False)
+            observer.start()
+            return
+        threading.Thread(target=self._poll, daemon=True, name="ConfigPoll").start()
+
+    def _poll(self):
+        last = None
         while True:
             try:
-                mtime = os.path.getmtime(self.path)
-                if mtime != self._last_mtime:
-                    with open(self.path, 'r') as f:
-                        cfg = json.load(f)
-                    with self.lock:
-                        self.shared.clear()
-                        self.shared.update(cfg)
-                    self._last_mtime = mtime
-                    logging.info("Config reloaded.")
+                stat = os.stat(self.path)
+                current = (stat.st_mtime_ns, stat.st_size)
             except FileNotFoundError:
-                logging.warning("Settings.json not found.")
-            time.sleep(self.interval)
\ No newline at end of file
+                current = None
+            if current != last:
+                last = current
+                self._changed.set()
+            time.sleep(self.interval)
+
+    # --- loading ---
+    # server.py's profile watcher swaps these two for its own file format
+    def validate(self, raw):
+        return validate(raw)
+
+    def snapshot(self, raw, version):
+        return ConfigSnapshot(raw, version)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            logging.warning(f"{self.label} not found.")
+            return
+        except ValueError as e:
+            logging.error(f"{self.label} is not valid JSON ({e}), keeping the previous settings.")
+            return
+        if raw == self._raw:
+            return  # touched, not changed
+
+        problems = self.validate(raw)
+        if not problems:
+            try:
+                snapshot = self.snapshot(raw, self._version + 1)
+            except (OSError, ValueError) as e:  # vrcOsc host doesn't resolve / isn't host:port
+                problems = [f"vrcOsc: {e}"]
+        if problems:
+            logging.error(f"{self.label} has problems, keeping the previous settings:\n  "
+                          + "\n  ".join(problems))
+            return
+
+        self._raw, self._version = raw, snapshot.version
+        self.shared.publish(snapshot)
+        logging.info(f"Config reloaded (version {snapshot.version}).")
+
+    def run(self):
+        self._watch()
+        self._load()
+        while True:
+            self._changed.wait()
+            # wait until the writes have settled
+            self._changed.clear()
+            while self._changed.wait(self.debounce):
+                self._changed.clear()
+            self._load()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Offline model conversion: Keras .h5 → ONNX (dynamic batch), plus the merged
+left/right stereo graphs, a single-channel .gray.onnx of each for
+decodeMode "reducedGray", a .post.onnx of all of them with the
+post-processing fused in, and modelFile/manifest.json describing them.
+The tracker itself only loads the .onnx files, run this whenever the .h5
+models change:
+
+    python convert_models.py                     # modelFile from ./Settings.json
+    python convert_models.py --model-dir ./models --force
+"""
+import argparse
+import json
+import logging
+import os
+
+os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+import tensorflow as tf
+import tf2onnx
+import onnx
+from onnx import numpy_helper
+
+from fuse_postprocess import export_fused
+from model_manifest import (
+    GRAY_SPECS,
+    MODEL_SPECS,
+    STEREO_SPECS,
+    ONNX_OPSET,
+    base_key,
+    manifest_entry,
+    onnx_paths,
+    read_manifest,
+    stale_models,
+    write_manifest,
+)
+
+# --------------------------------
+# Conversion steps
+# --------------------------------
+def export_onnx(h5_path: str, onnx_path: str, opset: int = ONNX_OPSET):
+    logging.info(f"Converting {os.path.basename(h5_path)} → ONNX…")
+    model = tf.keras.models.load_model(h5_path, compile=False)
+
+    # 1) Patch output_names if needed
+    if not hasattr(model, "output_names"):
+        model.output_names = [
+            tensor.name.split(":")[0]
+            for tensor in model.outputs
+        ]
+
+    # 2) Build an input_signature with a dynamic batch dimension
+    input_signature = [
+        tf.TensorSpec([None, *inp.shape[1:]], inp.dtype, name=inp.name.split(":")[0])
+        for inp in model.inputs
+    ]
+
+    # 3) Convert in-process
+    tf2onnx.convert.from_keras(
+        model,
+        input_signature=input_signature,
+        opset=opset,
+        output_path=onnx_path
+    )
+    logging.info(f"  ✓ Wrote ONNX to {onnx_path}")
+
+def export_stereo_onnx(left_path: str, right_path: str, stereo_path: str):
+    """
+    Merge a left-eye and a right-eye model into one side-by-side graph,
+    so both eyes run in a single sess.run. Inputs and outputs keep their
+    names with a "left_"/"right_" prefix, left first.
+    """
+    logging.info(f"Merging {os.path.basename(left_path)} + {os.path.basename(right_path)} → stereo ONNX…")
+    left  = onnx.compose.add_prefix(onnx.load(left_path),  "left_")
+    right = onnx.compose.add_prefix(onnx.load(right_path), "right_")
+    onnx.save(onnx.compose.merge_models(left, right, io_map=[]), stereo_path)
+    logging.info(f"  ✓ Wrote stereo ONNX to {stereo_path}")
+
+# ops between an image input and the first convolution that don't mix channels
+CHANNEL_WISE = ("Transpose", "Identity", "Cast")
+
+def export_gray(src_path: str, gray_path: str):
+    """
+    Single-channel version of a converted model: every (N, H, W, C) image
+    input becomes (N, H, W, 1) and the kernel of each convolution reading it
+    is summed over its C input channels. A gray image broadcast across C
+    channels gives the same convolution, so the outputs match the colour
+    model's on gray frames, while decoding, preprocessing and the first
+    layer only touch one channel.
+    """
+    logging.info(f"Making {os.path.basename(src_path)} single-channel → {os.path.basename(gray_path)}…")
+    model = onnx.load(src_path)
+    graph = model.graph
+    inits = {init.name: init for init in graph.initializer}
+    consumers = {}
+    for node in graph.node:
+        for name in node.input:
+            consumers.setdefault(name, []).append(node)
+
+    for inp in graph.input:
+        dims = inp.type.tensor_type.shape.dim
+        if inp.name in inits or len(dims) != 4:
+            continue  # pose scalars (and initializers listed as inputs by old exporters)
+        # follow the image through layout-only ops to the convolutions that read it
+        convs, frontier, seen = [], [inp.name], set()
+        while frontier:
+            name = frontier.pop()
+            seen.add(name)
+            for node in consumers.get(name, []):
+                if node.op_type in CHANNEL_WISE:
+                    frontier.extend(node.output)
+                elif (node.op_type == "Conv" and node.input[0] == name and node.input[1] in inits
+                        and all(a.name != "group" or a.i == 1 for a in node.attribute)):
+                    convs.append(node)
+                else:
+                    raise ValueError(f"{os.path.basename(src_path)}: {inp.name} reaches {node.op_type} "
+                                     f"{node.name!r} before a convolution, can't make it single-channel")
+        for conv in convs:
+            name = f"{conv.input[1]}/gray"
+            if name not in inits:  # kernels can be shared
+                kernel = numpy_helper.to_array(inits[conv.input[1]])  # (out, in, kH, kW)
+                inits[name] = numpy_helper.from_array(kernel.sum(axis=1, keepdims=True), name)
+                graph.initializer.append(inits[name])
+            conv.input[1] = name
+        dims[3].dim_value = 1
+        # inferred shapes on the way still say C channels
+        keep = [vi for vi in graph.value_info if vi.name not in seen]
+        del graph.value_info[:]
+        graph.value_info.extend(keep)
+
+    # drop kernels only the colour convolutions used
+    used = {name for node in graph.node for name in node.input}
+    keep = [init for init in graph.initializer if init.name in used]
+    del graph.initializer[:]
+    graph.initializer.extend(keep)
+    onnx.checker.check_model(model)
+    onnx.save(model, gray_path)
+    logging.info(f"  ✓ Wrote single-channel ONNX to {gray_path}")
+
+def convert_models(model_dir: str, force: bool = False):
+    """
+    Rebuild every stale (or, with force, every) .onnx and its fused
+    post-processing version, and update the manifest. Returns the rebuilt keys.
+    """
+    paths = onnx_paths(model_dir)
+    stale = set(paths) if force else set(stale_models(model_dir))
+    manifest = read_manifest(model_dir)
+    manifest["opset"] = ONNX_OPSET
+    models = manifest.setdefault("models", {})
+
+    rebuilt = []
+    for key, fname in MODEL_SPECS.items():
+        if key in stale:
+            h5_path = os.path.join(model_dir, fname)
+            if not os.path.exists(h5_path):
+                raise FileNotFoundError(f"{h5_path} is needed to build {os.path.basename(paths[key])}")
+            export_onnx(h5_path, paths[key])
+            models[os.path.basename(paths[key])] = manifest_entry(model_dir, key)
+            rebuilt.append(key)
+
+    for key, (left_key, right_key, _) in STEREO_SPECS.items():
+        if key in stale or left_key in rebuilt or right_key in rebuilt:
+            export_stereo_onnx(paths[left_key], paths[right_key], paths[key])
+            models[os.path.basename(paths[key])] = manifest_entry(model_dir, key)
+            rebuilt.append(key)
+
+    for key, color in GRAY_SPECS.items():
+        if key in stale or color in rebuilt:
+            export_gray(paths[color], paths[key])
+            models[os.path.basename(paths[key])] = manifest_entry(model_dir, key)
+            rebuilt.append(key)
+    write_manifest(model_dir, manifest)
+
+    fused_paths = onnx_paths(model_dir, fused=True)
+    for key in set(rebuilt) | set(stale_models(model_dir, fused=True)):
+        export_fused(paths[key], fused_paths[key], base_key(key))
+        models[os.path.basename(fused_paths[key])] = manifest_entry(model_dir, key, fused=True)
+    write_manifest(model_dir, manifest)
+    return rebuilt
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--model-dir", help="defaults to modelFile in --settings")
+    ap.add_argument("--settings", default="./Settings.json")
+    ap.add_argument("--force", action="store_true", help="rebuild everything, even if up to date")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s", datefmt="%H:%M:%S")
+    model_dir = args.model_dir
+    if model_dir is None:
+        with open(args.settings) as f:
+            model_dir = json.load(f)["modelFile"]
+
+    rebuilt = convert_models(model_dir, args.force)
+    if rebuilt:
+        logging.info(f"Rebuilt {len(rebuilt)} model(s): {', '.join(rebuilt)}")
+    else:
+        logging.info(f"All models in {model_dir} are up to date")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# ----------------------------
+# Shared-memory frame ring
+# ----------------------------
+# One camera process writes decoded frames into a ring of fixed-size slots in
+# a multiprocessing.shared_memory block; the inference process copies the
+# newest one out. Nothing but the block's name ever crosses a pipe.
+#
+#   HEAD   frame shape (h, w, channels, 0 = 2-D gray), slot count, seq of
+#          the newest complete frame
+#   SLOT   per slot: seq of the frame in it (0 while being written), capture
+#          and decode time.perf_counter() stamps (system-wide clock, so they
+#          compare across processes)
+#   data   slot images, 64-byte aligned
+#
+# Slot seqs work as a seqlock: the writer zeroes a slot's seq, copies, then
+# publishes the seq; a reader whose copy overlapped a rewrite sees the seq
+# change and drops the copy.
+
+HEAD = np.dtype([("shape", "<i8", 3), ("slots", "<i8"), ("latest", "<i8")])
+SLOT = np.dtype([("seq", "<i8"), ("ts", "<f8"), ("decoded", "<f8")])
+RING_SLOTS = 4
+ALIGN = 64
+
+def _layout(shape, slots):
+    table = HEAD.itemsize
+    data = -(-(table + slots * SLOT.itemsize) // ALIGN) * ALIGN
+    frame = -(-int(np.prod(shape)) // ALIGN) * ALIGN
+    return data, frame, data + slots * frame
+
+class FrameRing:
+    """A frame ring over one shared memory block. Use create() / attach()."""
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner
+        self.head = np.ndarray((), HEAD, shm.buf)
+        h, w, c = (int(v) for v in self.head["shape"])
+        self.shape = (h, w, c) if c else (h, w)
+        self.slots = int(self.head["slots"])
+        data, frame, _ = _layout(self.shape, self.slots)
+        self.table = np.ndarray((self.slots,), SLOT, shm.buf, HEAD.itemsize)
+        self.images = [np.ndarray(self.shape, np.uint8, shm.buf, data + i * frame)
+                       for i in range(self.slots)]
+
+    @classmethod
+    def create(cls, name, shape, slots=RING_SLOTS):
+        """New ring for uint8 frames of `shape`; the creator unlinks it."""
+        shm = shared_memory.SharedMemory(name, create=True, size=_layout(shape, slots)[2])
+        head = np.ndarray((), HEAD, shm.buf)
+        head["shape"] = tuple(shape) + (0,) * (3 - len(shape))
+        head["slots"] = slots
+        head["latest"] = 0
+        np.ndarray((slots,), SLOT, shm.buf, HEAD.itemsize)["seq"] = 0
+        del head  # views have to be gone before close()
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name), owner=False)
+
+    # --- writer ---
+    def write(self, image, ts, decoded):
+        """Copy one frame into the next slot. Returns its seq."""
+        seq = int(self.head["latest"]) + 1
+        i = seq % self.slots
+        slot = self.table[i]
+        slot["seq"] = 0
+        np.copyto(self.images[i], image)
+        slot["ts"], slot["decoded"] = ts, decoded
+        slot["seq"] = seq
+        self.head["latest"] = seq
+        return seq
+
+    # --- reader ---
+    def latest(self):
+        return int(self.head["latest"])
+
+    def read(self, after_seq=0, out=None):
+        """
+        Copy of the newest frame if it is newer than `after_seq`:
+        (seq, image, ts, decoded), image None if the writer lapped the copy.
+        None if there is nothing new. The copy goes into `out` if given
+        (ring-shaped uint8, e.g. from a FramePool).
+        """
+        seq = self.latest()
+        if seq <= after_seq:
+            return None
+        slot = self.table[seq % self.slots]
+        if slot["seq"] != seq:
+            return seq, None, 0.0, 0.0
+        if out is None:
+            image = self.images[seq % self.slots].copy()
+        else:
+            image = out
+            np.copyto(image, self.images[seq % self.slots])
+        ts, decoded = float(slot["ts"]), float(slot["decoded"])
+        if slot["seq"] != seq:
+            return seq, None, 0.0, 0.0
+        return seq, image, ts, decoded
+
+    def close(self):
+        self.head = self.table = self.images = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass  # the supervisor got there first
+
+def unlink(name):
+    """Remove a ring's block by name (no-op if it is already gone)."""
+    try:
+        shm = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
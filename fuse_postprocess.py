@@ -0,0 +1,90 @@
+"""
+Appends the tracker's post-processing to a converted model as ONNX ops, so
+one sess.run returns OSC-ready values (see POST_INPUTS in model_manifest.py).
+Used by convert_models.py and quantize_models.py; mirrors theta_to_osc /
+openness_to_osc in helpers.py.
+"""
+import logging
+import os
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+from helpers import Norm
+from model_manifest import POST_INPUTS, POST_OUTPUT
+
+PREFIX = "osc_post/"
+
+class _Builder:
+    """Collects nodes and constants with unique names under PREFIX."""
+    def __init__(self):
+        self.nodes = []
+        self.inits = []
+        self.count = 0
+
+    def const(self, value, dtype=np.float32):
+        name = f"{PREFIX}c{len(self.inits)}"
+        self.inits.append(numpy_helper.from_array(np.asarray(value, dtype), name))
+        return name
+
+    def op(self, op_type, *inputs, **attrs):
+        self.count += 1
+        out = f"{PREFIX}{op_type.lower()}{self.count}"
+        self.nodes.append(helper.make_node(op_type, list(inputs), [out], name=out, **attrs))
+        return out
+
+    def column(self, x, i):
+        """x[:, i:i+1] of a (N, k) tensor, or element i of a 1-D tensor (as shape [1])."""
+        return self.op("Gather", x, self.const([i], np.int64), axis=1 if x not in POST_INPUTS else 0)
+
+def _theta(b, raw):
+    """(N, 2) raw pitch/yaw in degrees → (N, 1, 2) clamped, offset and exaggerated."""
+    offset = "osc_pitch_offset"
+    vertical, horizontal = b.column("osc_exaggeration", 0), b.column("osc_exaggeration", 1)
+    lo, hi = b.const(-1.0), b.const(1.0)  # Clip takes scalars
+
+    pitch, yaw = b.column(raw, 0), b.column(raw, 1)
+    span = b.op("Where", b.op("GreaterOrEqual", pitch, b.const(0.0)),
+                b.const(Norm.maxPosTheta1), b.const(abs(Norm.maxNegTheta1)))
+    pitch = b.op("Clip", b.op("Mul", b.op("Sub", b.op("Div", pitch, span), offset), vertical), lo, hi)
+    yaw = b.op("Clip", b.op("Mul", b.op("Div", yaw, b.const(Norm.maxAbsTheta2)), horizontal), lo, hi)
+    return b.op("Unsqueeze", b.op("Concat", pitch, yaw, axis=1), b.const([1], np.int64))
+
+def _openness(b, raw):
+    """(N, 1) raw openness → (N, 1) through the opennessSliderHandles curve."""
+    h0, h1, h2, h3 = (b.column("osc_openness_handles", i) for i in range(4))
+    zero, low, high, one = b.const(0.0), b.const(0.75), b.const(0.25), b.const(1.0)
+    rise = b.op("Mul", b.op("Div", b.op("Sub", raw, h0), b.op("Sub", h1, h0)), low)
+    top = b.op("Add", low, b.op("Mul", b.op("Div", b.op("Sub", raw, h2), b.op("Sub", h3, h2)), high))
+    # innermost first: ≥h3 → 1, <h3 → top, <h2 → 0.75, <h1 → rise, <h0 → 0 (Where broadcasts)
+    out = b.op("Where", b.op("Less", raw, h3), top, one)
+    out = b.op("Where", b.op("Less", raw, h2), low, out)
+    out = b.op("Where", b.op("Less", raw, h1), rise, out)
+    return b.op("Where", b.op("Less", raw, h0), zero, out)
+
+def export_fused(src_path: str, dst_path: str, key: str):
+    """Write `src_path` with the post-processing for session `key` appended to `dst_path`."""
+    logging.info(f"Fusing post-processing into {os.path.basename(src_path)} → {os.path.basename(dst_path)}")
+    model = onnx.load(src_path)
+    graph = model.graph
+    theta = key.endswith("_theta")
+    raw_outputs = list(graph.output)
+    batch = raw_outputs[0].type.tensor_type.shape.dim[0]
+    batch = batch.dim_param or batch.dim_value or "N"
+
+    b = _Builder()
+    names = ("osc_pitch_offset", "osc_exaggeration") if theta else ("osc_openness_handles",)
+    for name in names:
+        graph.input.append(helper.make_tensor_value_info(name, TensorProto.FLOAT, [len(POST_INPUTS[name])]))
+    # one entry per eye, left first (stereo graphs keep the left_/right_ output order)
+    eyes = [(_theta if theta else _openness)(b, out.name) for out in raw_outputs]
+    result = eyes[0] if len(eyes) == 1 else b.op("Concat", *eyes, axis=1)
+    b.nodes.append(helper.make_node("Identity", [result], [POST_OUTPUT], name=PREFIX + "out"))
+
+    graph.node.extend(b.nodes)
+    graph.initializer.extend(b.inits)
+    del graph.output[:]
+    shape = [batch, len(eyes), 2] if theta else [batch, len(eyes)]
+    graph.output.append(helper.make_tensor_value_info(POST_OUTPUT, TensorProto.FLOAT, shape))
+    onnx.save(model, dst_path)
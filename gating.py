@@ -0,0 +1,82 @@
+import time
+
+import cv2
+import numpy as np
+
+from stats import STATS
+
+# ----------------------------
+# Frame-change gating
+# ----------------------------
+class ChangeGate:
+    """
+    Skips model runs on eye frames that barely changed since the head
+    (openness / gaze) last ran on that eye.
+
+    Each frame is shrunk to a THUMB×THUMB grayscale thumbnail; its mean
+    absolute difference to the thumbnail the head last ran on, in gray levels
+    (0-255), is compared to `frameGatingThreshold`. Below it the head's last
+    outputs are reused, but never for longer than `frameGatingRefreshMs`.
+    A saccade or blink changes far more than the threshold, so it runs on the
+    very frame it shows up in. Settings changes reset every reference.
+    """
+    THUMB = 16
+    HEADS = ("open", "theta")
+
+    def __init__(self):
+        self.thumbs = {}   # eye → (frame seq, thumbnail) of the current frame
+        self.refs   = {}   # (head, eye) → (thumbnail, perf_counter time) it last ran on
+        self.version = None
+        self.counters = {(head, eye, result): STATS.counter("gated_runs", head=head, eye=eye, result=result)
+                         for head in self.HEADS for eye in ("L", "R") for result in ("run", "skipped")}
+        self.ran_count = self.skipped = 0
+
+    def _thumb(self, frame):
+        img = cv2.resize(frame.image, (self.THUMB, self.THUMB), interpolation=cv2.INTER_AREA)
+        if img.ndim == 3:
+            img = img.mean(axis=2)
+        return img.astype(np.float32)
+
+    def observe(self, cfg, eye, frame):
+        """Thumbnail a new frame of `eye` (no-op with gating off or for a frame seen before)."""
+        if not cfg.get("frameGating", False):
+            return
+        if cfg.version != self.version:
+            self.version = cfg.version
+            self.refs.clear()
+        cached = self.thumbs.get(eye)
+        if cached is None or cached[0] != frame.seq:
+            self.thumbs[eye] = (frame.seq, self._thumb(frame))
+
+    def due(self, cfg, head, eye):
+        """True if `head` has to run on `eye`'s current frame."""
+        if not cfg.get("frameGating", False):
+            return True
+        ref = self.refs.get((head, eye))
+        if ref is None:
+            return True
+        thumb, ran_at = ref
+        if time.perf_counter() - ran_at >= cfg.get("frameGatingRefreshMs", 250) / 1000.0:
+            return True
+        diff = cv2.absdiff(self.thumbs[eye][1], thumb).mean()
+        if diff >= cfg.get("frameGatingThreshold", 1.0):
+            return True
+        self.skipped += 1
+        self.counters[(head, eye, "skipped")].inc()
+        return False
+
+    def ran(self, cfg, head, eye):
+        """`head` just produced fresh outputs for `eye`: its frame becomes the new reference."""
+        if not cfg.get("frameGating", False):
+            return
+        self.refs[(head, eye)] = (self.thumbs[eye][1], time.perf_counter())
+        self.ran_count += 1
+        self.counters[(head, eye, "run")].inc()
+
+    def summary(self):
+        """One log line of gating stats since the last call, then reset."""
+        total = self.ran_count + self.skipped
+        share = self.skipped / total * 100 if total else 0.0
+        line = f"Frame gating: skipped {self.skipped} of {total} eye/head runs ({share:.0f}%)"
+        self.ran_count = self.skipped = 0
+        return line
@@ -0,0 +1,134 @@
+import math
+
+from stats import STATS
+
+# ----------------------------
+# One Euro filter
+# ----------------------------
+def _alpha(cutoff: float, dt: float) -> float:
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+class OneEuro:
+    """
+    One Euro filter (Casiez et al. 2012) for one axis: a low-pass whose
+    cutoff rises with speed, so fixations get smoothed hard and saccades
+    pass with little lag.
+
+    `v` is the velocity of the filtered output, low-passed at the same
+    adaptive cutoff, for prediction: unlike `dx` (the slow speed estimate
+    that drives the cutoff) it settles as soon as a saccade has landed, so
+    predictions don't overshoot.
+    """
+    __slots__ = ("x", "dx", "v", "t", "dt")
+    NOMINAL_DT = 1.0 / 60  # step for a repeated timestamp before any real one is known
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.x = self.dx = self.v = self.t = None
+        self.dt = self.NOMINAL_DT
+
+    def __call__(self, value, t, min_cutoff, beta, d_cutoff):
+        if self.t is None:
+            self.x, self.dx, self.v, self.t = value, 0.0, 0.0, t
+            return self.x
+        dt = t - self.t
+        if dt > 0:
+            self.t, self.dt = t, dt
+        else:
+            # timestamp didn't advance (the same capture again): still take the
+            # sample, one usual step later, rather than freezing on the old output
+            dt = self.dt
+        self.dx += _alpha(d_cutoff, dt) * ((value - self.x) / dt - self.dx)
+        a = _alpha(min_cutoff + beta * abs(self.dx), dt)
+        step = a * (value - self.x)
+        self.x += step
+        self.v += a * (step / dt - self.v)
+        return self.x
+
+# ----------------------------
+# Gaze filter between inference and OSC
+# ----------------------------
+class GazeFilter:
+    """
+    Smooths every gaze output (per eye, per axis) and predicts it forward
+    by the measured capture → send latency (EWMA, capped at
+    `gazePredictionMaxMs`, 0 = no prediction), so what goes out is where
+    the eye is now rather than where it was when the frame was taken. Only
+    movement slower than `gazePredictionMaxSpeed` (normalized units/s,
+    about the fastest smooth pursuit) is extrapolated. With the fixed-rate
+    OSC clock (`oscRateHz`) the clock does the predicting instead, see
+    prediction().
+
+    While an eye is closed (openness 0, including the blinkReleaseDelayMs
+    hold) its gaze is garbage: the last open-eye value is held instead, and
+    the filter restarts from the first sample after the eye reopens.
+    """
+    # gaze key → openness keys that all have to be closed to hold it
+    GAZE = {"tL": ("oL",), "tR": ("oR",), "t_comb": ("oL", "oR")}
+    LATENCY_ALPHA = 0.05
+
+    def __init__(self, labels=None):
+        labels = labels or {}
+        self.filters = {key: (OneEuro(), OneEuro()) for key in self.GAZE}
+        self.held = {key: None for key in self.GAZE}
+        self.latency = 0.0   # EWMA capture → send, seconds
+        self.horizon = 0.0   # prediction used for the last sample, seconds
+        STATS.gauge("gaze_prediction_ms", lambda: self.horizon * 1000, **labels)
+        self.c_held = STATS.counter("gaze_held", **labels)
+
+    def observe_latency(self, seconds: float):
+        """Feed one measured capture → send latency."""
+        if self.latency == 0.0:
+            self.latency = seconds
+        self.latency += self.LATENCY_ALPHA * (seconds - self.latency)
+
+    def prediction(self, cfg):
+        """Seconds to predict ahead: the measured latency capped at gazePredictionMaxMs, 0 with the filter off."""
+        if not cfg.get("gazeFilter", False):
+            return 0.0
+        self.horizon = min(self.latency, cfg.get("gazePredictionMaxMs", 0) / 1000.0)
+        return self.horizon
+
+    def apply(self, cfg, data, predict=True):
+        """
+        Filter and predict the gaze values in `data` (a result dict) in place.
+        predict=False only smooths (the OSC clock predicts by itself).
+        """
+        if not cfg.get("gazeFilter", False):
+            return
+        # newest fresh capture; a result without one is stamped with when it was made
+        t = data.get("_ts", data.get("_t_result"))
+        if t is None:
+            return
+        min_cutoff = cfg.get("gazeFilterMinCutoff", 1.0)
+        beta       = cfg.get("gazeFilterBeta", 5.0)
+        d_cutoff   = cfg.get("gazeFilterDCutoff", 3.0)
+        max_speed  = cfg.get("gazePredictionMaxSpeed", 1.5)
+        horizon    = self.prediction(cfg) if predict else 0.0
+
+        for key, lids in self.GAZE.items():
+            value = data.get(key)
+            if value is None:
+                continue
+            if all(data.get(lid, 1.0) == 0 for lid in lids):
+                # closed: keep sending where the eye was looking before the blink
+                if self.held[key] is None:
+                    fx, fy = self.filters[key]
+                    self.held[key] = (fx.x, fy.x) if fx.x is not None else value
+                    fx.reset()
+                    fy.reset()
+                data[key] = self.held[key]
+                self.c_held.inc()
+                continue
+            self.held[key] = None
+
+            out = []
+            for f, raw in zip(self.filters[key], value):
+                x = f(raw, t, min_cutoff, beta, d_cutoff)
+                # only smooth movement is predicted, a saccade lands before any prediction would help
+                speed = f.v if abs(f.v) <= max_speed else 0.0
+                out.append(max(-1.0, min(1.0, x + speed * horizon)))
+            data[key] = tuple(out)
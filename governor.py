@@ -0,0 +1,110 @@
+import logging
+import time
+
+# ----------------------------
+# Adaptive rate governor
+# ----------------------------
+class RateGovernor:
+    """
+    Paces the inference loop to `infrencePerSecondLimit` and backs off when
+    the loop's latency exceeds `latencyBudgetMs`: how long frames wait in the
+    mailbox for it plus the work on them (mailbox → result). StereoSync's
+    pairing wait and camera stalls aren't the loop's doing and don't count.
+
+    Back-off walks down a ladder, one step at a time:
+        level 0  configured models, full rate
+        level 1  combined models (skipped if already configured)
+        level 2+ combined models at 75%, 50%, 33% of the rate
+    and climbs back up once latency has stayed well under budget for a while.
+    """
+    RATE_SCALES = (1.0, 1.0, 0.75, 0.5, 0.33)
+
+    # consecutive-time hysteresis, in seconds
+    BACKOFF_AFTER = 0.5
+    RECOVER_AFTER = 3.0
+    RECOVER_BELOW = 0.6   # fraction of the budget that counts as headroom
+    EWMA_ALPHA    = 0.1
+
+    def __init__(self):
+        self.level = 0
+        self.latency = 0.0     # EWMA, seconds
+        self.work = 0.0        # EWMA of the inference work per cycle, seconds
+        self.next_time = None
+        self._over_since = None
+        self._under_since = None
+
+    @property
+    def combined(self):
+        """True when the governor wants the combined models instead of per-eye ones."""
+        return self.level >= 1
+
+    def rate(self, cfg):
+        limit = cfg.get("infrencePerSecondLimit", None)
+        if not limit or limit <= 0:
+            return None
+        return float(limit) * self.RATE_SCALES[self.level]
+
+    def record(self, cfg, work, latency):
+        """Feed one cycle's inference time and mailbox→result latency (seconds)."""
+        a = self.EWMA_ALPHA
+        self.work    += a * (work - self.work)
+        self.latency += a * (latency - self.latency)
+
+        budget_ms = cfg.get("latencyBudgetMs", 0)
+        if not cfg.get("governor", False) or not budget_ms:
+            if self.level:
+                self._set_level(0, cfg, "governor disabled")
+            return
+
+        budget = budget_ms / 1000.0
+        now = time.perf_counter()
+        if self.latency > budget:
+            self._under_since = None
+            self._over_since = self._over_since or now
+            if now - self._over_since >= self.BACKOFF_AFTER and self.level < len(self.RATE_SCALES) - 1:
+                level = self.level + 1
+                if level == 1 and self._already_combined(cfg):
+                    level = 2
+                self._set_level(level, cfg, f"latency {self.latency * 1000:.1f}ms > budget {budget_ms}ms")
+                self._over_since = now
+        elif self.latency < budget * self.RECOVER_BELOW:
+            self._over_since = None
+            self._under_since = self._under_since or now
+            if now - self._under_since >= self.RECOVER_AFTER and self.level > 0:
+                level = self.level - 1
+                if level == 1 and self._already_combined(cfg):
+                    level = 0
+                self._set_level(level, cfg, f"latency {self.latency * 1000:.1f}ms, headroom under {budget_ms}ms")
+                self._under_since = now
+        else:
+            self._over_since = self._under_since = None
+
+    def pace(self, cfg):
+        """Sleep until the next inference slot. Never bursts to catch up."""
+        rate = self.rate(cfg)
+        now = time.perf_counter()
+        if rate is None:
+            self.next_time = None
+            return
+        interval = 1.0 / rate
+        if self.next_time is None or now - self.next_time > interval:
+            # first cycle or fell behind: restart the schedule from now
+            self.next_time = now
+        self.next_time += interval
+        delay = self.next_time - now
+        if delay > 0:
+            time.sleep(delay)
+
+    @staticmethod
+    def _already_combined(cfg):
+        return not cfg.get("independentEyes", False) and not cfg.get("independentOpenness", False)
+
+    def _set_level(self, level, cfg, reason):
+        # leaving or entering level 0 swaps the per-eye results for combined ones
+        switched = (level == 0) != (self.level == 0) and not self._already_combined(cfg)
+        self.level = level
+        rate = self.rate(cfg)
+        models = "combined" if level >= 1 or self._already_combined(cfg) else "configured"
+        rate_txt = f"{rate:.0f}/s" if rate else "unlimited"
+        log = logging.warning if switched else logging.info
+        log(f"Governor: {reason} → level {level} ({models} models, {rate_txt}, work {self.work * 1000:.1f}ms)")
@@ -1,3 +1,5 @@
+import numpy as np
+
 # ----------------------------
 # Normalization & OSC Helpers
 # ----------------------------
@@ -38,4 +40,24 @@ def transform_openness(val: float, cfg: list) -> float:
     elif val < h3:
         return 0.75 + ((val - h2) / (h3 - h2)) * 0.25
     else:
-        return 1.0
\ No newline at end of file
+        return 1.0
+
+# ----------------------------
+# Vectorized post-processing
+# ----------------------------
+# Same math as above on whole arrays (all eyes / users of a batch at once).
+# fuse_postprocess.py builds the identical ops into the ONNX graphs.
+def theta_to_osc(raw, offset: float, vertical: float, horizontal: float):
+    """(..., 2) raw pitch/yaw in degrees → OSC-ready (..., 2), like normalize_theta* + scale_*clamp."""
+    raw = np.asarray(raw, np.float32)
+    pitch, yaw = raw[..., 0], raw[..., 1]
+    out = np.empty(raw.shape, np.float32)
+    n1 = pitch / np.where(pitch >= 0, Norm.maxPosTheta1, abs(Norm.maxNegTheta1))
+    np.clip((n1 - offset) * vertical, -1.0, 1.0, out=out[..., 0])
+    np.clip(yaw / Norm.maxAbsTheta2 * horizontal, -1.0, 1.0, out=out[..., 1])
+    return out
+
+def openness_to_osc(raw, handles):
+    """Raw openness array → OSC-ready, like transform_openness."""
+    h0, h1, h2, h3 = handles
+    return np.interp(raw, (h0, h1, h2, h3), (0.0, 0.75, 0.75, 1.0)).astype(np.float32)
@@ -1,228 +1,344 @@
 import os
-import sys
-import json
 import time
 import logging
 import threading
-import subprocess
-import shutil
-from queue import Queue, Empty
-
-import os
-os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-import tensorflow as tf
 
 import numpy as np
 import cv2
 import onnxruntime as ort
-from pythonosc import udp_client
-import tf2onnx
-from cameras.MJPEGVideoCapture import MJPEGVideoCapture
-from helpers import (
-    transform_openness,
-    calculate_offset_fraction,
-    normalize_theta1,
-    normalize_theta2,
-    scale_offset_and_clamp,
-    scale_and_clamp,
-)
-
-
-import onnxruntime as ort
+from cameras.FramePool import release
+from model_manifest import GRAY_SPECS, POST_INPUTS
+from sessions import ModelPool, ORT_DTYPES, concrete_shape, session_key
+from sync import StereoSync
+from governor import RateGovernor
+from gating import ChangeGate
+from stats import STATS
+from helpers import openness_to_osc, theta_to_osc
 
-def get_onnx_providers():
+# --------------------------------
+# Model inputs
+# --------------------------------
+def preprocess_into(frame, dst, resized, gray):
     """
-    Return a list of ONNX Runtime providers, preferring GPU if available.
+    Resize `frame` and normalize it in place into `dst[0]` (a (1, H, W, C)
+    model input), through the uint8 scratch buffers `resized` (H, W, C) and
+    `gray` (H, W). Grayscale frames (decodeMode "reducedGray") go to the
+    single-channel models as they are; colour models get them broadcast
+    across their channels and single-channel models get colour frames converted.
     """
-    available = ort.get_available_providers()
-    for _ in range(10):
-        print(available)
-    if "CUDAExecutionProvider" in available:
-        # You may also configure session options here (e.g. memory limits).
-        return ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    size = gray.shape[::-1]
+    if frame.ndim == 2 or dst.shape[3] == 1:
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        img = cv2.resize(frame, size, dst=gray)[..., None]
     else:
-        return ["CPUExecutionProvider"]
-    
-# --------------------------------
-# ONNX conversion helper
-# --------------------------------
-def ensure_onnx(h5_path: str, onnx_path: str, opset: int = 13):
-    # Only convert if ONNX is missing or stale
-    if (not os.path.exists(onnx_path)
-        or os.path.getmtime(h5_path) > os.path.getmtime(onnx_path)):
-
-        logging.info(f"Converting {os.path.basename(h5_path)} → ONNX…")
-        model = tf.keras.models.load_model(h5_path, compile=False)
-
-        # 1) Patch output_names if needed
-        if not hasattr(model, "output_names"):
-            model.output_names = [
-                tensor.name.split(":")[0]
-                for tensor in model.outputs
-            ]
-
-        # 2) Build an input_signature
-        input_signature = [
-            tf.TensorSpec(inp.shape, inp.dtype, name=inp.name.split(":")[0])
-            for inp in model.inputs
-        ]
-
-        # 3) Convert in-process
-        tf2onnx.convert.from_keras(
-            model,
-            input_signature=input_signature,
-            opset=opset,
-            output_path=onnx_path
-        )
-        logging.info(f"  ✓ Wrote ONNX to {onnx_path}")
-        
+        img = cv2.resize(frame, size, dst=resized)
+    np.multiply(img, 1.0 / 255.0, out=dst[0], casting="unsafe")
+    return dst
+
+def capture_times(frames):
+    """
+    (oldest, newest) capture time of the frames freshly captured for this
+    result, None if there are none. Reused frames (StereoSync "reuse") keep
+    their old ts and would make a stalled camera look like growing latency.
+    """
+    fresh = [f.ts for f in frames if f is not None and not f.reused]
+    return (min(fresh), max(fresh)) if fresh else None
+
+def eye_shape(sessions):
+    """(H, W, C) eye input of the colour models, from whichever {key: session} are loaded."""
+    key, sess = next(iter(sessions.items()))
+    _, h, w, c = concrete_shape(sess.get_inputs()[0].shape)
+    return h, w, 3 if key in GRAY_SPECS else c  # the gray models are made from RGB ones
+
+def eye_tensors(shape):
+    """Zeroed model inputs per eye: (1, H, W, C) "L"/"R" and (1, H, W, 1) "L_gray"/"R_gray"."""
+    h, w, c = shape
+    return {eye + suffix: np.zeros((1, h, w, 1 if suffix else c), np.float32)
+            for suffix in ("", "_gray") for eye in ("L", "R")}
+
+def session_feeds(tensors, pose):
+    """Input tensors per session key, in the sessions' input order, from one eye_tensors() set."""
+    feeds = {}
+    for suffix in ("", "_gray"):
+        L, R = tensors["L" + suffix], tensors["R" + suffix]
+        feeds.update({
+            "combined_theta" + suffix: (L, R, pose),
+            "combined_open"  + suffix: (L, R),
+            "left_theta"     + suffix: (L,),
+            "left_open"      + suffix: (L,),
+            "right_theta"    + suffix: (R,),
+            "right_open"     + suffix: (R,),
+            "stereo_theta"   + suffix: (L, R),
+            "stereo_open"    + suffix: (L, R),
+        })
+    return feeds
+
 # --------------------------------
-# Load ONNX sessions
+# Persistent IOBinding sessions
 # --------------------------------
-def load_models(model_dir):
-    specs = {
-        "combined_theta": "combined_pitchyaw.h5",
-        "combined_open" : "combined_openness.h5",
-        "left_theta"    : "left_pitchyaw.h5",
-        "left_open"     : "left_openness.h5",
-        "right_theta"   : "right_pitchyaw.h5",
-        "right_open"    : "right_openness.h5",
-    }
-    sessions = {}
-    providers = get_onnx_providers()
-    print(f"Providers: {providers}")
-
-    for key, fname in specs.items():
-        h5_path   = os.path.join(model_dir, fname)
-        onnx_path = os.path.splitext(h5_path)[0] + ".onnx"
-        ensure_onnx(h5_path, onnx_path)
-
-        # Create the session with GPU if available
-        sess = ort.InferenceSession(
-            onnx_path,
-            providers=providers
-        )
-        sessions[key] = sess
-        print("Using: " + sess.get_providers()[0])
-
-    return sessions
+class BoundSession:
+    """
+    InferenceSession whose inputs and outputs are bound once through IOBinding
+    to persistent numpy arrays. Callers write into the input arrays in place,
+    call run() and read `outputs`, which are overwritten by the next run.
+    """
+    def __init__(self, sess, inputs):
+        self.sess    = sess
+        self.binding = sess.io_binding()
+        # OrtValues wrap the numpy memory (no copy) and must outlive the binding
+        self._values = []
+
+        for meta, arr in zip(sess.get_inputs(), inputs):
+            val = ort.OrtValue.ortvalue_from_numpy(arr)
+            self.binding.bind_ortvalue_input(meta.name, val)
+            self._values.append(val)
+
+        batch = inputs[0].shape[0]
+        self.outputs = []
+        for meta in sess.get_outputs():
+            arr = np.zeros(concrete_shape(meta.shape, batch), ORT_DTYPES[meta.type])
+            val = ort.OrtValue.ortvalue_from_numpy(arr)
+            self.binding.bind_ortvalue_output(meta.name, val)
+            self._values.append(val)
+            self.outputs.append(arr)
+
+    def run(self):
+        self.sess.run_with_iobinding(self.binding)
+        return self.outputs
 
 # --------------------------------
 # Inference Task using ONNX
 # --------------------------------
 class InferenceTask(threading.Thread):
-    def __init__(self, cfg, queueL, queueR, result_queue, shared, lock):
-        super().__init__(daemon=True)
-        self.models = load_models(cfg["modelFile"])
-        self.queueL, self.queueR = queueL, queueR
+    def __init__(self, cfg, mailbox, result_queue, shared):
+        super().__init__(daemon=True, name="InferenceTask")
+        # Only the sessions these settings use, loaded in parallel and warmed
+        # up before the cameras start; the governor's fallbacks follow in the background
+        cache_dir = (os.path.join(cfg["modelFile"], ".ortcache")
+                     if cfg.get("optimizedModelCache", True) else None)
+        self.models = ModelPool(cfg["modelFile"], cache_dir, cfg.get("sessionOptions"),
+                                cfg.get("modelVariant", "fp32"), cfg.get("fusedPostprocess", False))
+        self.models.load(cfg.required_models or {"left_theta"})  # input shape comes from a session
+        self.models.request(cfg.standby_models)
+        self._model_cfg = cfg.model_key
+        self.mailbox = mailbox
+        self.sync = StereoSync(mailbox)
+        self.governor = RateGovernor()
+        self.gate = ChangeGate()
+
+        # telemetry, fetched once so the hot path is just observe()/inc()
+        self.h_enqueue    = {eye: STATS.hist("enqueue", eye=eye) for eye in ("L", "R")}
+        self.h_preprocess = STATS.hist("preprocess")
+        self.h_run        = {}
+        self.h_post       = STATS.hist("postprocess")
+        self.h_latency    = STATS.hist("capture_to_result")
+        self.c_inferences = STATS.counter("inferences")
+        self._run_time    = 0.0
+        self._prep_time   = 0.0
+        STATS.gauge("result_queue_depth", result_queue.qsize)
+        STATS.gauge("governor_level", lambda: self.governor.level)
         self.result_queue = result_queue
         self.shared = shared
-        self.lock = lock
         self.fL = None
         self.fR = None
         
-        self.last_theta = {"tL": (0.0, 0.0), "tR": (0.0, 0.0)}
+        self.last_theta = {"tL": (0.0, 0.0), "tR": (0.0, 0.0), "t_comb": (0.0, 0.0)}
         self.last_open  = {"oL": 0.0,        "oR": 0.0}
-        self._last_inference_time = time.perf_counter()
 
-    def preprocess(self, frame):
-        img = cv2.resize(frame, (128, 128))
-        return img.astype(np.float32) / 255.0
+        # Persistent model inputs: one (1, H, W, C) tensor per eye, shared by
+        # every session that reads that eye (and a 1-channel one for the gray
+        # models), plus uint8 resize scratch buffers
+        h, w, c = eye_shape(self.models.sessions)
+        self.tensors  = eye_tensors((h, w, c))
+        self._resized = np.zeros((h, w, c), np.uint8)
+        self._gray    = np.zeros((h, w), np.uint8)
+        self._pose    = np.array([[0.75]], np.float32)  # optional “head pose” scalar
+
+        feeds = session_feeds(self.tensors, self._pose)
+        self.feeds = feeds
+        self.feed_tensors = {key: [name for name, tensor in self.tensors.items()
+                                   if any(arr is tensor for arr in arrays)]
+                             for key, arrays in feeds.items()}
+        self._prepared = set()  # tensors holding this cycle's frame
+        self.bound = {}  # key → BoundSession, bound on first use
+        self.inputs = {} # key → (session, its input tuple, fused?), refreshed when a session is rebuilt
+
+        # runtime inputs of the fused post-processing graphs, updated in place on settings changes
+        self.post = {name: np.array(value, np.float32) for name, value in POST_INPUTS.items()}
+        self._post_version = None
+
+    def preprocess(self, frame, name):
+        """Resize and normalize `frame` in place into input tensor `name` ("L", "R_gray", …)."""
+        return preprocess_into(frame, self.tensors[name], self._resized, self._gray)
+
+    def _prepare(self, key):
+        """Preprocess the eye frames `key` reads, once per cycle and only if some model needs them."""
+        for name in self.feed_tensors[key]:
+            if name not in self._prepared:
+                t0 = time.perf_counter()
+                self.preprocess((self.fL if name[0] == "L" else self.fR).image, name)
+                self._prep_time += time.perf_counter() - t0
+                self._prepared.add(name)
+
+    def _ran(self, cfg, head, eyes):
+        for eye in eyes:
+            self.gate.ran(cfg, head, eye)
+
+    def ready(self, key, cfg):
+        """True if model `key`'s session is loaded; otherwise it starts loading in the background."""
+        return self.models.get(session_key(cfg, key)) is not None
+
+    def _inputs(self, key):
+        """(session, input arrays, fused?) for `key`; fused graphs also take the post-processing inputs."""
+        sess = self.models.get(key)
+        cached = self.inputs.get(key)
+        if cached is None or cached[0] is not sess:
+            metas = sess.get_inputs()
+            fused = any(meta.name in POST_INPUTS for meta in metas)
+            arrays = tuple(self.post[meta.name] if meta.name in POST_INPUTS else arr
+                           for meta, arr in zip(metas, self.feeds[key] + (None,) * len(metas)))
+            cached = self.inputs[key] = (sess, arrays, fused)
+        return cached
+
+    def _run(self, key, cfg):
+        """
+        Run one model on the current eye tensors (its gray twin with
+        decodeMode "reducedGray"). Returns OSC-ready values: (eyes, 2)
+        pitch/yaw for gaze models, (eyes,) for openness. Fused graphs compute
+        them in the session, otherwise helpers.py does.
+        """
+        name = session_key(cfg, key)
+        sess, inputs, fused = self._inputs(name)
+        self._prepare(name)
+        t0 = time.perf_counter()
+        if cfg.get("ioBinding", False):
+            bound = self.bound.get(name)
+            if bound is None or bound.sess is not sess:  # first use or rebuilt with new sessionOptions
+                bound = self.bound[name] = BoundSession(sess, inputs)
+            out = bound.run()
+        else:
+            out = sess.run(None, {meta.name: arr for meta, arr in zip(sess.get_inputs(), inputs)})
+        dt = time.perf_counter() - t0
+        self._run_time += dt
+        hist = self.h_run.get(name)
+        if hist is None:
+            hist = self.h_run[name] = STATS.hist("run", model=name)
+        hist.observe(dt)
+
+        if fused:
+            return out[0][0]
+        raw = np.concatenate(out)  # one row per eye
+        if key.endswith("_theta"):
+            return theta_to_osc(raw, cfg.offset_fraction,
+                                cfg["verticalExaggeration"], cfg["horizontalExaggeration"])
+        return openness_to_osc(raw.reshape(-1), cfg.openness_handles)
+
+    def _update_post(self, cfg):
+        """Copy the settings the fused graphs read into their (bound) input arrays."""
+        self._post_version = cfg.version
+        self.post["osc_pitch_offset"][0] = cfg.offset_fraction
+        self.post["osc_exaggeration"][:] = (cfg["verticalExaggeration"], cfg["horizontalExaggeration"])
+        self.post["osc_openness_handles"][:] = cfg.openness_handles
 
     def run(self):
         infer_count = 0
         start_time  = time.perf_counter()
 
         while True:
-            # ────────────────────── 1. grab the latest frames ──────────────────
-            try:
-                self.fL = self.queueL.get(timeout=0.1)
-            except Empty:
-                self.fL = None
-
-            try:
-                self.fR = self.queueR.get(timeout=0.1)
-            except Empty:
-                self.fR = None
-
-            # if absolutely nothing new, take a tiny nap and loop
+            # current settings snapshot (immutable, swapped whole by ConfigTask)
+            cfg = self.shared.current
+            if cfg.version != self._post_version:
+                self._update_post(cfg)
+
+            # settings switched models → load the new ones without stalling this loop
+            if cfg.model_key != self._model_cfg:
+                self._model_cfg = cfg.model_key
+                self.models.configure(cfg.get("sessionOptions"), cfg.get("modelVariant", "fp32"),
+                                      cfg.get("fusedPostprocess", False))
+                self.models.request(cfg.required_models | cfg.standby_models)
+
+            # ────────────────────── 1. wait for the latest frames ─────────────
+            # wakes as soon as either eye publishes something new; with
+            # stereoSync on, left/right are paired by capture timestamp for
+            # the models that take both eyes
+            self.fL, self.fR = self.sync.next(cfg, timeout=1.0, combined=self.governor.combined)
             if self.fL is None and self.fR is None:
-                time.sleep(0.01)
                 continue
 
-            lt_np = (np.expand_dims(self.preprocess(self.fL), 0)
-                    if self.fL is not None else None)
-            rt_np = (np.expand_dims(self.preprocess(self.fR), 0)
-                    if self.fR is not None else None)
-
-            # take a snapshot of shared settings
-            with self.lock:
-                cfg = dict(self.shared)
+            work_start = time.perf_counter()
+            haveL = self.fL is not None
+            haveR = self.fR is not None
+            for eye, f in (("L", self.fL), ("R", self.fR)):
+                if f is not None:
+                    if not f.reused:
+                        self.h_enqueue[eye].observe(work_start - f.decoded)
+                    self.gate.observe(cfg, eye, f)
+            self._prepared.clear()
+            self._prep_time = self._run_time = 0.0
 
             outputs = {}
 
-            # ────────────────────── 2. openness inference ──────────────────────
-            if cfg.get("activeOpennessTracking", False):
-                handles = cfg["opennessSliderHandles"]
+            # the governor may fall back to the cheaper combined models under load
+            combined   = self.governor.combined
+            indep_open = cfg.get("independentOpenness", False) and not combined
+            indep_eyes = cfg.get("independentEyes", False) and not combined
+
+            # frame gating: which eyes each head has to run on, the others keep
+            # their last outputs (every eye that has a frame when gating is off)
+            due = {head: (haveL and self.gate.due(cfg, head, "L"), haveR and self.gate.due(cfg, head, "R"))
+                   for head, active in (("open", "activeOpennessTracking"), ("theta", "activeEyeTracking"))
+                   if cfg.get(active, False)}
 
-                if not cfg.get("independentOpenness", False):
+            # ────────────────────── 2. openness inference ──────────────────────
+            # both eyes due → left and right heads share one stereo sess.run
+            if "open" in due:
+                dueL, dueR = due["open"]
+                if not indep_open:
                     # combined model needs *both* eyes
-                    if lt_np is not None and rt_np is not None:
-                        sess   = self.models["combined_open"]
-                        i0, i1 = (t.name for t in sess.get_inputs())
-                        raw    = sess.run(None, {i0: lt_np, i1: rt_np})[0].item()
-                        o      = transform_openness(raw, handles)
-                        outputs["oL"] = outputs["oR"] = o
+                    if haveL and haveR and (dueL or dueR) and self.ready("combined_open", cfg):
+                        outputs["oL"] = outputs["oR"] = self._run("combined_open", cfg).item()
+                        self._ran(cfg, "open", "LR")
+                elif cfg.get("batchedEyes", False) and dueL and dueR and self.ready("stereo_open", cfg):
+                    outputs["oL"], outputs["oR"] = self._run("stereo_open", cfg).tolist()
+                    self._ran(cfg, "open", "LR")
                 else:
-                    if lt_np is not None:
-                        sess = self.models["left_open"]
-                        raw  = sess.run(None, {sess.get_inputs()[0].name: lt_np})[0].item()
-                        outputs["oL"] = transform_openness(raw, handles)
-                    if rt_np is not None:
-                        sess = self.models["right_open"]
-                        raw  = sess.run(None, {sess.get_inputs()[0].name: rt_np})[0].item()
-                        outputs["oR"] = transform_openness(raw, handles)
+                    if dueL and self.ready("left_open", cfg):
+                        outputs["oL"] = self._run("left_open", cfg).item()
+                        self._ran(cfg, "open", "L")
+                    if dueR and self.ready("right_open", cfg):
+                        outputs["oR"] = self._run("right_open", cfg).item()
+                        self._ran(cfg, "open", "R")
 
             # ────────────────────── 3. pitch / yaw inference ────────────────────
-            if cfg.get("activeEyeTracking", False):
-                off_frac = calculate_offset_fraction(cfg["pitchOffset"])
-                hor, ver = cfg["horizontalExaggeration"], cfg["verticalExaggeration"]
-
-                if not cfg.get("independentEyes", False):
+            # rows come back normalized, offset, exaggerated and clamped
+            if "theta" in due:
+                dueL, dueR = due["theta"]
+                if not indep_eyes:
                     # combined model needs *both* eyes
-                    if lt_np is not None and rt_np is not None:
-                        sess            = self.models["combined_theta"]
-                        i0, i1, *opt    = sess.get_inputs()
-                        feed            = {i0.name: lt_np, i1.name: rt_np}
-                        if opt:         # optional “head pose” scalar
-                            feed[opt[0].name] = np.array([[0.75]], np.float32)
-                        raw_p, raw_y    = sess.run(None, feed)[0][0]
-                        n1, n2          = normalize_theta1(raw_p), normalize_theta2(raw_y)
-                        outputs["t_comb"] = (
-                            scale_offset_and_clamp(n1, off_frac, ver),
-                            scale_and_clamp(n2, hor)
-                        )
+                    if haveL and haveR and (dueL or dueR) and self.ready("combined_theta", cfg):
+                        outputs["t_comb"] = tuple(self._run("combined_theta", cfg)[0].tolist())
+                        self._ran(cfg, "theta", "LR")
+                elif cfg.get("batchedEyes", False) and dueL and dueR and self.ready("stereo_theta", cfg):
+                    left, right = self._run("stereo_theta", cfg).tolist()
+                    outputs["tL"], outputs["tR"] = tuple(left), tuple(right)
+                    self._ran(cfg, "theta", "LR")
                 else:
-                    if lt_np is not None:
-                        sess = self.models["left_theta"]
-                        p, y = sess.run(None, {sess.get_inputs()[0].name: lt_np})[0][0]
-                        n1, n2 = normalize_theta1(p), normalize_theta2(y)
-                        outputs["tL"] = (
-                            scale_offset_and_clamp(n1, off_frac, ver),
-                            scale_and_clamp(n2, hor)
-                        )
-                    if rt_np is not None:
-                        sess = self.models["right_theta"]
-                        p, y = sess.run(None, {sess.get_inputs()[0].name: rt_np})[0][0]
-                        n1, n2 = normalize_theta1(p), normalize_theta2(y)
-                        outputs["tR"] = (
-                            scale_offset_and_clamp(n1, off_frac, ver),
-                            scale_and_clamp(n2, hor)
-                        )
+                    if dueL and self.ready("left_theta", cfg):
+                        outputs["tL"] = tuple(self._run("left_theta", cfg)[0].tolist())
+                        self._ran(cfg, "theta", "L")
+                    if dueR and self.ready("right_theta", cfg):
+                        outputs["tR"] = tuple(self._run("right_theta", cfg)[0].tolist())
+                        self._ran(cfg, "theta", "R")
+
+                # forced combined while configured independent: both eyes follow
+                if combined and "t_comb" in outputs and cfg.get("independentEyes", False):
+                    outputs["tL"] = outputs["tR"] = outputs["t_comb"]
+            if self._prepared:
+                self.h_preprocess.observe(self._prep_time)
 
             # ────────────────────── 4. fill missing keys with last-seen values ─
-            for k in ("tL", "tR"):
+            for k in ("tL", "tR", "t_comb"):
                 if k not in outputs:
                     outputs[k] = self.last_theta[k]
             for k in ("oL", "oR"):
@@ -230,27 +346,43 @@ class InferenceTask(threading.Thread):
                     outputs[k] = self.last_open[k]
 
             # update the “last-seen” caches
-            self.last_theta.update({k: outputs[k] for k in ("tL", "tR")})
+            self.last_theta.update({k: outputs[k] for k in ("tL", "tR", "t_comb")})
             self.last_open .update({k: outputs[k] for k in ("oL", "oR")})
 
+            # preprocessing is done, pooled frame buffers can be reused (only ts is read below)
+            release(self.fL)
+            release(self.fR)
+
             # ────────────────────── 5. hand results to the consumer ─────────────
+            # _ts (newest fresh capture) / _t_result travel with the result for
+            # downstream latency stats and the gaze filter
+            done     = time.perf_counter()
+            captured = capture_times((self.fL, self.fR))
+            outputs["_t_result"] = done
+            if captured is not None:
+                outputs["_ts"] = captured[1]
             self.result_queue.put(outputs)
             infer_count += 1
 
+            self.h_post.observe(done - work_start - self._prep_time - self._run_time)
+            self.c_inferences.inc()
+            if captured is not None:
+                self.h_latency.observe(done - captured[0])
+            # the governor only answers for its own loop: time in the mailbox plus
+            # this cycle's work, not pairing waits or camera stalls
+            self.governor.record(cfg, done - work_start, self.sync.queued + done - work_start)
+
             # ────────────────────── 6. rate logging and sleep ───────────────────
             now      = time.perf_counter()
             elapsed  = now - start_time
             if elapsed >= 1.0:
                 logging.info(f"Inference rate: {infer_count / elapsed:.2f} updates/s")
+                if cfg.get("stereoSync", False):
+                    logging.info(self.sync.summary())
+                if cfg.get("frameGating", False):
+                    logging.info(self.gate.summary())
                 infer_count = 0
                 start_time  = now
                 
-            # ────── 7 enforce inference-per-second limit ──────
-            limit = cfg.get("infrencePerSecondLimit", None)
-            if limit and limit > 0:
-                now = time.perf_counter()
-                desired_interval = 1.0 / float(limit)
-                elapsed = now - self._last_inference_time
-                if elapsed < desired_interval:
-                    time.sleep(desired_interval - elapsed)
-                self._last_inference_time = time.perf_counter()         
\ No newline at end of file
+            # ────── 7 pace to the (governed) inference-per-second limit ──────
+            self.governor.pace(cfg)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+
+# ----------------------------
+# Model files and their manifest
+# ----------------------------
+# The .onnx files are produced offline by convert_models.py, which records in
+# modelFile/manifest.json what each was built from (sha256 of the sources),
+# the opset and the sha256 of the result. The runtime only checks hashes, so
+# it never needs TensorFlow, tf2onnx or onnx.
+
+ONNX_OPSET = 13
+MANIFEST_NAME = "manifest.json"
+
+# session key → Keras model in modelFile (converted to the same name .onnx)
+MODEL_SPECS = {
+    "combined_theta": "combined_pitchyaw.h5",
+    "combined_open" : "combined_openness.h5",
+    "left_theta"    : "left_pitchyaw.h5",
+    "left_open"     : "left_openness.h5",
+    "right_theta"   : "right_pitchyaw.h5",
+    "right_open"    : "right_openness.h5",
+}
+
+# Left/right model pairs that get merged into one graph for batched runs
+STEREO_SPECS = {
+    "stereo_theta": ("left_theta", "right_theta", "stereo_pitchyaw.onnx"),
+    "stereo_open" : ("left_open",  "right_open",  "stereo_openness.onnx"),
+}
+
+# decodeMode "reducedGray": a single-channel twin of every model above,
+# <name>.gray.onnx, taking (N, H, W, 1) eye images. convert_models.py sums the
+# first convolution's kernel over its input channels, so it gives the same
+# result as the colour model fed the gray image on all three channels.
+GRAY_SPECS = {f"{key}_gray": key for key in (*MODEL_SPECS, *STEREO_SPECS)}
+
+def base_key(key: str) -> str:
+    """The colour model a session key is (or is derived from)."""
+    return GRAY_SPECS.get(key, key)
+
+# "modelVariant": fp32 is what convert_models.py writes, the others come
+# from quantize_models.py as <name>.<variant>.onnx next to it
+MODEL_VARIANTS = ("fp32", "fp16", "int8")
+
+# "fusedPostprocess": <name>[.<variant>].post.onnx has the normalization,
+# exaggeration/offset and openness curve appended as ONNX ops
+# (fuse_postprocess.py). The settings they depend on are runtime inputs
+# (name → neutral value), the result is one OSC-ready output: per eye
+# (pitch, yaw) for gaze models, shape (N, eyes, 2), or openness, (N, eyes).
+POST_INPUTS = {
+    "osc_pitch_offset"    : (0.0,),                   # calculate_offset_fraction(pitchOffset)
+    "osc_exaggeration"    : (1.0, 1.0),               # vertical, horizontal
+    "osc_openness_handles": (0.22, 0.53, 0.95, 1.0),  # opennessSliderHandles
+}
+POST_OUTPUT = "osc_values"
+
+def onnx_name(key: str, variant: str = "fp32", fused: bool = False) -> str:
+    if key in GRAY_SPECS:
+        name = f"{os.path.splitext(onnx_name(GRAY_SPECS[key]))[0]}.gray.onnx"
+    elif key in STEREO_SPECS:
+        name = STEREO_SPECS[key][2]
+    else:
+        name = os.path.splitext(MODEL_SPECS[key])[0] + ".onnx"
+    if variant != "fp32":
+        name = f"{os.path.splitext(name)[0]}.{variant}.onnx"
+    if fused:
+        name = f"{os.path.splitext(name)[0]}.post.onnx"
+    return name
+
+def source_names(key: str, variant: str = "fp32", fused: bool = False):
+    """Files in modelFile that `key`'s .onnx is built from."""
+    if fused:
+        return [onnx_name(key, variant)]
+    if variant != "fp32":
+        return [onnx_name(key)]
+    if key in GRAY_SPECS:
+        return [onnx_name(GRAY_SPECS[key])]
+    if key in STEREO_SPECS:
+        left_key, right_key, _ = STEREO_SPECS[key]
+        return [onnx_name(left_key), onnx_name(right_key)]
+    return [MODEL_SPECS[key]]
+
+def onnx_paths(model_dir: str, variant: str = "fp32", fused: bool = False):
+    """{session key: .onnx path} for every model, stereo and gray ones included."""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown modelVariant {variant!r}, expected one of {MODEL_VARIANTS}")
+    keys = list(MODEL_SPECS) + list(STEREO_SPECS) + list(GRAY_SPECS)
+    return {key: os.path.join(model_dir, onnx_name(key, variant, fused)) for key in keys}
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def read_manifest(model_dir: str) -> dict:
+    try:
+        with open(os.path.join(model_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"models": {}}
+
+def write_manifest(model_dir: str, manifest: dict):
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(path + ".tmp", path)
+
+def manifest_entry(model_dir: str, key: str, variant: str = "fp32", fused: bool = False) -> dict:
+    """What convert_models.py / quantize_models.py record for a freshly written .onnx."""
+    return {
+        "sha256": sha256_file(os.path.join(model_dir, onnx_name(key, variant, fused))),
+        "opset": ONNX_OPSET,
+        "sources": {name: sha256_file(os.path.join(model_dir, name))
+                    for name in source_names(key, variant, fused)},
+    }
+
+def stale_models(model_dir: str, keys=None, variant: str = "fp32", fused: bool = False):
+    """
+    Session keys whose .onnx (of `variant`) is missing, wasn't written by our
+    tools, was modified since, uses another opset or whose sources changed.
+    Sources that aren't there (release builds ship only the .onnx) aren't checked.
+    """
+    manifest = read_manifest(model_dir).get("models", {})
+    digests = {}  # stereo sources are models themselves, hash each file once
+
+    def digest(name):
+        if name not in digests:
+            digests[name] = sha256_file(os.path.join(model_dir, name))
+        return digests[name]
+
+    stale = []
+    for key in keys or onnx_paths(model_dir):
+        name = onnx_name(key, variant, fused)
+        entry = manifest.get(name)
+        if (entry is None or not os.path.exists(os.path.join(model_dir, name))
+                or entry.get("opset") != ONNX_OPSET
+                or entry.get("sha256") != digest(name)):
+            stale.append(key)
+            continue
+        for source, source_digest in entry.get("sources", {}).items():
+            if os.path.exists(os.path.join(model_dir, source)) and digest(source) != source_digest:
+                stale.append(key)
+                break
+    return stale
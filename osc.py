@@ -1,123 +1,284 @@
 import threading
 import time
+import socket
+import struct
 from helpers import *
-from pythonosc import udp_client
+from stats import STATS
+from gaze_filter import GazeFilter
+from output_clock import OutputClock
+from queue import Empty
 import logging
-import numpy as np
+
+# ----------------------------
+# Pre-encoded OSC bundle output
+# ----------------------------
+# Every parameter is a preencoded bundle element (size, padded address, type
+# tags) with only its float payload patched per frame. All changed parameters
+# of one result go out as a single "#bundle" datagram to every destination.
+BUNDLE_HEADER = b"#bundle\0" + (1).to_bytes(8, "big")  # timetag 1 = immediately
+
+def osc_string(s: str) -> bytes:
+    b = s.encode() + b"\0"
+    return b + b"\0" * (-len(b) % 4)
+
+def parse_targets(value):
+    """vrcOsc: "host:port", "host:port,host:port" or a list of those."""
+    items = value if isinstance(value, (list, tuple)) else str(value).split(",")
+    targets = []
+    for item in items:
+        host, port = item.strip().rsplit(":", 1)
+        targets.append((socket.gethostbyname(host), int(port)))
+    return targets
+
+class OSCTemplate:
+    """Bundle element for `address` with `count` float arguments."""
+    def __init__(self, address: str, count: int):
+        msg = osc_string(address) + osc_string("," + "f" * count)
+        self.address = address
+        self.head = struct.pack(">i", len(msg) + 4 * count) + msg
+        self.size = len(self.head) + 4 * count
+        self.fmt = ">" + "f" * count
+
+# A source picks one float out of a result: (key, index or None, sign)
+def _src(key, idx=None, sign=1.0):
+    return (key, idx, sign)
+
+def output_mode(cfg):
+    return ("none" if cfg["trackingForcedOffline"]
+            else "native" if cfg["vrcNative"]
+            else "v1"    if cfg["vrcftV1"]
+            else "v2"    if cfg["vrcftV2"]
+            else "none")
+
+def output_table(cfg):
+    """[(address, [source, ...]), ...] for the current output mode."""
+    mode = output_mode(cfg)
+    indep_eyes = cfg.get("independentEyes", False)
+    indep_open = cfg.get("independentOpenness", False)
+    table = []
+
+    # NATIVE
+    if mode == "native":
+        if not indep_eyes:
+            table.append(("/avatar/eye/native/combined", [_src("t_comb", 0), _src("t_comb", 1)]))
+        else:
+            table.append(("/avatar/eye/native/independent",
+                          [_src("tL", 0), _src("tL", 1), _src("tR", 0), _src("tR", 1)]))
+        table.append(("/avatar/eye/native/openness", [_src("oL")]))
+
+    # V1
+    elif mode == "v1":
+        p = "/avatar/parameters/"
+        if not indep_eyes:
+            table += [(p+"LeftEyeX",  [_src("t_comb", 1)]),
+                      (p+"RightEyeX", [_src("t_comb", 1)]),
+                      (p+"EyesY",     [_src("t_comb", 0, -1.0)])]
+        else:
+            table += [(p+"LeftEyeX",  [_src("tL", 1)]),
+                      (p+"RightEyeX", [_src("tR", 1)]),
+                      (p+"EyesY",     [_src("tL", 0, -1.0)])]
+        if indep_open:
+            table += [(p+"LeftEyeLid",  [_src("oL")]),
+                      (p+"RightEyeLid", [_src("oR")])]
+        else:
+            table.append((p+"CombinedEyeLid", [_src("oL")]))
+
+    # V2
+    elif mode == "v2":
+        pfx = cfg["oscPrefix"].strip("/")
+        base = f"/avatar/parameters/{pfx}/v2/" if pfx else "/avatar/parameters/v2/"
+        splitY = cfg.get("splitOutputY", False)
+        left, right = ("t_comb", "t_comb") if not indep_eyes else ("tL", "tR")
+        table += [(base+"EyeLeftX",  [_src(left, 1)]),
+                  (base+"EyeRightX", [_src(right, 1)])]
+        if splitY:
+            table += [(base+"EyeLeftY",  [_src(left, 0, -1.0)]),
+                      (base+"EyeRightY", [_src(right, 0, -1.0)])]
+        else:
+            table.append((base+"EyeY", [_src(left, 0, -1.0)]))
+        table += [(base+"EyeLidLeft",  [_src("oL")]),
+                  (base+"EyeLidRight", [_src("oR" if indep_open else "oL")])]
+
+    return table
+
+class OSCOutputEngine:
+    """
+    Takes the address table and endpoints precompiled in the config snapshot
+    and sends each result as one bundle of the parameters whose values changed.
+    """
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.version = None
+        self.table = None
+        self.entries = []
+        self.targets = []
+        self.buf = bytearray(len(BUNDLE_HEADER))
+        self.mv = memoryview(self.buf)
+        self.packets = 0
+
+    def configure(self, cfg):
+        """Pick up a new ConfigSnapshot; cheap no-op while the version is unchanged."""
+        if cfg.version == self.version:
+            return
+        self.version = cfg.version
+
+        if cfg.osc_targets != self.targets:
+            self.targets = cfg.osc_targets
+            logging.info("OSC endpoint set to %s", ", ".join(f"{h}:{p}" for h, p in self.targets))
+        if cfg.osc_table == self.table:
+            return  # other settings changed, keep the last sent values
+        self.table = cfg.osc_table
+
+        # entry: [template, sources, last sent values]
+        self.entries = [[tpl, srcs, None] for tpl, srcs in cfg.osc_templates]
+        self.mv.release()
+        self.buf = bytearray(len(BUNDLE_HEADER) + sum(e[0].size for e in self.entries))
+        self.buf[:len(BUNDLE_HEADER)] = BUNDLE_HEADER
+        self.mv = memoryview(self.buf)
+
+    def send(self, data, every=False):
+        """
+        Encode every changed parameter of `data` into one bundle and send it.
+        With `every`, unchanged parameters go out too (fixed-rate ticks).
+        """
+        buf = self.buf
+        pos = len(BUNDLE_HEADER)
+        for entry in self.entries:
+            tpl, srcs, prev = entry
+            try:
+                vals = tuple(float(data[k] if i is None else data[k][i]) * sign
+                             for k, i, sign in srcs)
+            except KeyError:
+                continue
+            if vals == prev and not every:
+                continue
+            entry[2] = vals
+            n = len(tpl.head)
+            buf[pos:pos + n] = tpl.head
+            struct.pack_into(tpl.fmt, buf, pos + n, *vals)
+            pos += tpl.size
+
+        if pos == len(BUNDLE_HEADER):
+            return
+        packet = self.mv[:pos]
+        for target in self.targets:
+            self.sock.sendto(packet, target)
+        self.packets += 1
 
 # ----------------------------
 # Post-Process & OSC Sender Task
 # ----------------------------
 class OSCSenderTask(threading.Thread):
-    def __init__(self, result_queue, shared, lock):
-        super().__init__(daemon=True)
+    """
+    Post-processes results (blink hold, gaze filter) and sends them. With
+    `oscRateHz` unset every result goes out as it arrives; with it set, the
+    output runs on its own fixed-rate clock instead and each tick sends all
+    parameters, resampled to that moment (OutputClock).
+    """
+    def __init__(self, result_queue, shared, labels=None):
+        labels = labels or {}  # per-user stats in server mode
+        super().__init__(daemon=True, name="OSCSenderTask" + "".join(f":{v}" for v in labels.values()))
         self.queue = result_queue
         self.shared = shared
-        self.lock = lock
-        self.prev = {}
+        self.engine = OSCOutputEngine()
+        self.gaze = GazeFilter(labels)
+        self.clock = OutputClock(labels)
         self.blink_ts = {"left":0, "right":0, "combined":0}
 
+        self.h_wait    = STATS.hist("osc_queue_wait", **labels)
+        self.h_send    = STATS.hist("osc_send", **labels)
+        self.h_e2e     = STATS.hist("capture_to_send", **labels)
+        self.h_late    = STATS.hist("osc_tick_late", **labels)
+        self.c_packets = STATS.counter("osc_packets", **labels)
+        self.c_missed  = {reason: STATS.counter("osc_deadline_misses", reason=reason, **labels)
+                          for reason in ("late", "skipped")}
+
+    def _prepare(self, cfg, data, received, predict=True):
+        if "_t_result" in data:
+            self.h_wait.observe(received - data["_t_result"])
+
+        # blink-release logic
+        now = time.time()
+        for eye in ["left","right"]:
+            o = data.get("o"+eye[0].upper())
+            if o == 0:
+                self.blink_ts[eye] = now
+            elif now <= self.blink_ts[eye] + cfg.blink_release:
+                data["o"+eye[0].upper()] = 0
+
+        if "oL" in data and not cfg.get("independentOpenness",False):
+            cb = data["oL"]
+            if cb == 0:
+                self.blink_ts["combined"] = now
+            elif now <= self.blink_ts["combined"] + cfg.blink_release:
+                data["oL"] = data["oR"] = 0
+
+        # smoothing + latency compensation, gaze held while the eye is shut
+        self.gaze.apply(cfg, data, predict)
+
+    def _send(self, data, start, fresh=True, every=False):
+        packets = self.engine.packets
+        self.engine.send(data, every)
+        sent = time.perf_counter()
+        self.h_send.observe(sent - start)
+        if fresh and "_ts" in data:
+            self.h_e2e.observe(sent - data["_ts"])
+            self.gaze.observe_latency(sent - data["_ts"])
+        self.c_packets.inc(self.engine.packets - packets)
+
+    def _tick(self, cfg, due, period):
+        """Sleep until the tick at `due`, send it, return when the next one is due."""
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        now = time.perf_counter()
+        late = now - due
+        self.h_late.observe(max(late, 0.0))
+        if late > period:
+            # fell behind (stall, suspend): drop the missed ticks instead of bursting them out
+            missed = int(late // period)
+            self.c_missed["skipped"].inc(missed)
+            due += missed * period
+        elif late > period / 2:
+            self.c_missed["late"].inc()
+
+        while True:
+            try:
+                data = self.queue.get_nowait()
+            except Empty:
+                break
+            self._prepare(cfg, data, now, predict=False)
+            self.clock.push(data)
+        fresh = self.clock.fresh
+        # the sample time trails the clock by the usual capture → send latency (a
+        # steady delay); gaze prediction, when on, moves it forward again here,
+        # the only place latency is compensated on this path
+        data = self.clock.sample(cfg, now - self.gaze.latency + self.gaze.prediction(cfg))
+        if data is not None:
+            # every tick is a packet, held values included: left to the
+            # unchanged-value check a held result would send nothing
+            self._send(data, now, fresh, every=True)
+        return due + period
+
     def run(self):
-        osc = None
+        due = None
         while True:
-            data = self.queue.get()
-            with self.lock:
-                cfg = dict(self.shared)
-            # OSC client update
-            if osc is None or cfg["vrcOsc"] != f"{osc._address}:{osc._port}":
-                host, port = cfg["vrcOsc"].split(":")
-                osc = udp_client.SimpleUDPClient(host, int(port))
-                logging.info("OSC endpoint set to %s:%s", host, port)
-
-            # blink-release logic
-            now = time.time()
-            for eye in ["left","right"]:
-                o = data.get("o"+eye[0].upper())
-                if o == 0:
-                    self.blink_ts[eye] = now
-                elif now <= self.blink_ts[eye] + cfg["blinkReleaseDelayMs"]/1000.0:
-                    data["o"+eye[0].upper()] = 0
-
-            if "oL" in data and not cfg.get("independentOpenness",False):
-                cb = data["oL"]
-                if cb == 0:
-                    self.blink_ts["combined"] = now
-                elif now <= self.blink_ts["combined"] + cfg["blinkReleaseDelayMs"]/1000.0:
-                    data["oL"] = data["oR"] = 0
-
-            # determine mode and send
-            mode = ("none" if cfg["trackingForcedOffline"]
-                    else "native" if cfg["vrcNative"]
-                    else "v1"    if cfg["vrcftV1"]
-                    else "v2"    if cfg["vrcftV2"]
-                    else "none")
-
-            def send(key, *vals):
-                # Convert each value to a type python-osc understands
-                cleaned = []
-                for v in vals:
-                    if isinstance(v, np.generic):       # NumPy scalar → built-in float/int
-                        v = float(v) if v.dtype.kind == "f" else int(v)
-                    cleaned.append(v)
-
-                if self.prev.get(key) != tuple(cleaned):
-                    self.prev[key] = tuple(cleaned)
-                    osc.send_message(key, cleaned)
-
-            # NATIVE
-            if mode == "native":
-                if "t_comb" in data and not cfg.get("independentEyes",False):
-                    send("/avatar/eye/native/combined", *data["t_comb"])
-                elif "tL" in data and cfg.get("independentEyes",False):
-                    yL,xL = data["tL"]; yR,xR = data["tR"]
-                    send("/avatar/eye/native/independent", yL, xL, yR, xR)
-                if "oL" in data:
-                    send("/avatar/eye/native/openness", data["oL"])
-
-            # V1
-            elif mode == "v1":
-                if "t_comb" in data and not cfg.get("independentEyes",False):
-                    y,x = data["t_comb"]
-                    send("/avatar/parameters/LeftEyeX", x)
-                    send("/avatar/parameters/RightEyeX", x)
-                    send("/avatar/parameters/EyesY",    -y)
-                elif "tL" in data and cfg.get("independentEyes",False):
-                    yL,xL = data["tL"]; yR,xR = data["tR"]
-                    send("/avatar/parameters/LeftEyeX", xL)
-                    send("/avatar/parameters/RightEyeX", xR)
-                    send("/avatar/parameters/EyesY",    -yL)
-                if "oL" in data:
-                    if cfg.get("independentOpenness",False):
-                        send("/avatar/parameters/LeftEyeLid",  data["oL"])
-                        send("/avatar/parameters/RightEyeLid", data["oR"])
-                    else:
-                        send("/avatar/parameters/CombinedEyeLid", data["oL"])
-
-            # V2
-            elif mode == "v2":
-                pfx = cfg["oscPrefix"].strip("/")
-                base = f"/avatar/parameters/{pfx}/v2/" if pfx else "/avatar/parameters/v2/"
-                splitY = cfg.get("splitOutputY", False)
-                if "t_comb" in data and not cfg.get("independentEyes",False):
-                    y,x = data["t_comb"]
-                    if splitY:
-                        send(base+"EyeLeftX",  x); send(base+"EyeLeftY",  -y)
-                        send(base+"EyeRightX", x); send(base+"EyeRightY", -y)
-                    else:
-                        send(base+"EyeLeftX",  x); send(base+"EyeRightX", x)
-                        send(base+"EyeY",      -y)
-                elif "tL" in data and cfg.get("independentEyes",False):
-                    yL,xL = data["tL"]; yR,xR = data["tR"]
-                    if splitY:
-                        send(base+"EyeLeftX",  xL); send(base+"EyeLeftY",  -yL)
-                        send(base+"EyeRightX", xR); send(base+"EyeRightY", -yR)
-                    else:
-                        send(base+"EyeLeftX",  xL); send(base+"EyeRightX", xR)
-                        send(base+"EyeY",      -yL)
-                if "oL" in data:
-                    if cfg.get("independentOpenness",False):
-                        send(base+"EyeLidLeft",  data["oL"])
-                        send(base+"EyeLidRight", data["oR"])
-                    else:
-                        send(base+"EyeLidLeft",  data["oL"])
-                        send(base+"EyeLidRight", data["oL"])
\ No newline at end of file
+            cfg = self.shared.current
+            # OSC table / endpoint update
+            self.engine.configure(cfg)
+
+            rate = cfg.get("oscRateHz", 0)
+            if rate > 0:
+                due = self._tick(cfg, due or time.perf_counter(), 1.0 / rate)
+                continue
+            due = None
+
+            try:
+                data = self.queue.get(timeout=1.0)  # wakes now and then to notice oscRateHz being set
+            except Empty:
+                continue
+            received = time.perf_counter()
+            cfg = self.shared.current
+            self.engine.configure(cfg)
+            self._prepare(cfg, data, received)
+            self._send(data, received)
@@ -0,0 +1,61 @@
+from gaze_filter import GazeFilter
+from stats import STATS
+
+# ----------------------------
+# Fixed-rate output resampling
+# ----------------------------
+def _lerp(a, b, t):
+    return a + (b - a) * t
+
+class OutputClock:
+    """
+    Resamples inference results onto the fixed-rate OSC clock (`oscRateHz`).
+
+    Keeps the two newest results (after blink hold and GazeFilter) and, for
+    each tick, blends them at the tick's sample time on the capture
+    timestamps (`_ts`). Between the two it interpolates; past the newest it
+    extrapolates the gaze along the line through both, for at most
+    `oscExtrapolateMaxMs` and only below `gazePredictionMaxSpeed` (a
+    saccade isn't continued). Only the gaze is blended: openness and
+    everything else is held from the newest result, so a blink goes out
+    as the step it is instead of being smeared over two results.
+    """
+    KINDS = ("interpolated", "extrapolated", "held")
+
+    def __init__(self, labels=None):
+        labels = labels or {}
+        self.prev = self.last = None   # (capture ts, result)
+        self.fresh = False             # newest result not sampled yet
+        self.c_ticks = {kind: STATS.counter("osc_ticks", kind=kind, **labels) for kind in self.KINDS}
+
+    def push(self, data):
+        if "_ts" not in data:
+            return
+        if self.last is not None and data["_ts"] <= self.last[0]:
+            self.last = (self.last[0], data)  # same capture (stereo reuse), just newer values
+        else:
+            self.prev, self.last = self.last, (data["_ts"], data)
+        self.fresh = True
+
+    def sample(self, cfg, t):
+        """The output for sample time `t` (perf_counter, capture clock), None before the first result."""
+        if self.last is None:
+            return None
+        t1, new = self.last
+        out = dict(new)
+        self.fresh = False
+        if self.prev is None or t >= t1 + cfg.get("oscExtrapolateMaxMs", 25) / 1000.0:
+            self.c_ticks["held"].inc()
+            return out
+        t0, old = self.prev
+        a = max(0.0, (t - t0) / (t1 - t0))
+        kind = "interpolated" if a <= 1.0 else "extrapolated"
+        self.c_ticks[kind].inc()
+
+        max_step = cfg.get("gazePredictionMaxSpeed", 1.5) * (t1 - t0)
+        for key in GazeFilter.GAZE:
+            if key in new and key in old:
+                if a > 1.0 and any(abs(n - o) > max_step for o, n in zip(old[key], new[key])):
+                    continue  # saccade: hold where it landed
+                out[key] = tuple(max(-1.0, min(1.0, _lerp(o, n, a))) for o, n in zip(old[key], new[key]))
+        return out
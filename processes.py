@@ -0,0 +1,438 @@
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing import connection
+
+from cameras.FramePool import FramePool
+from cameras.ICameraSource import Frame
+from frame_ring import FrameRing, unlink
+from stats import STATS
+
+# ----------------------------
+# Process-per-stage pipeline ("multiProcess": true)
+# ----------------------------
+#   camera:L, camera:R   camera source + JPEG decode, frames into a FrameRing
+#   inference            RingReader → FrameMailbox → InferenceTask
+#   main                 ConfigTask, OSCSenderTask, StatsServer, StageSupervisor
+#
+# Frames only move through shared memory. Pipes carry ring names, settings
+# snapshots, results and each child's STATS (mirrored into the main registry
+# with a process=<stage> label). A shared semaphore wakes the ring reader
+# whenever either camera wrote a frame.
+
+EYES = ("L", "R")
+STATS_INTERVAL = 1.0       # seconds between STATS reports from a child
+RESTART_DELAY = (1.0, 30.0)  # first / longest wait before restarting a crashed stage
+STABLE_AFTER = 60.0        # a stage that ran this long gets the short delay again
+
+class _Link:
+    """One end of a duplex Pipe that several threads send() on."""
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, *msg):
+        with self.lock:
+            self.conn.send(msg)
+
+def _child_setup(name):
+    # Ctrl-C goes to the whole process group; only the main process acts on it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s %(levelname)s [{name}]: %(message)s",
+                        datefmt="%H:%M:%S")
+
+def _serve(link, handlers, tick=None):
+    """
+    A child's main loop: handle messages from the supervisor and report STATS
+    every STATS_INTERVAL. Returns on "stop" or when the main process is gone.
+    """
+    next_report = time.perf_counter()
+    while True:
+        try:
+            if time.perf_counter() >= next_report:
+                next_report += STATS_INTERVAL
+                if tick is not None:
+                    tick()
+                link.send("stats", STATS.export())
+            if not link.conn.poll(max(0.0, next_report - time.perf_counter())):
+                continue
+            kind, *args = link.conn.recv()
+            if kind == "stop":
+                return
+            elif kind == "stats":
+                link.send("stats", STATS.export())
+            elif kind == "reset_stats":
+                STATS.reset()
+            else:
+                handlers[kind](*args)
+        except (EOFError, OSError):
+            return
+
+# ----------------------------
+# Camera process
+# ----------------------------
+class _RingWriter:
+    """Camera subscriber: copies every frame into this process's ring and wakes the reader."""
+    def __init__(self, eye, link, wake):
+        self.eye, self.link, self.wake = eye, link, wake
+        self.ring = None
+        self.generation = 0
+        self.count = 0
+
+    def __call__(self, frame):
+        image = frame.image
+        if self.ring is None or self.ring.shape != image.shape:
+            # first frame, or the camera switched resolution: new ring, announced
+            old = self.ring
+            self.generation += 1
+            self.ring = FrameRing.create(f"mlet{os.getpid()}{self.eye}{self.generation}", image.shape)
+            self.link.send("ring", self.eye, self.ring.name)
+            if old is not None:
+                old.close()
+        self.ring.write(image, frame.ts, frame.decoded)
+        self.wake.release()
+        self.count += 1
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+def camera_main(eye, spec, conn, wake):
+    """Entry point of a camera process. `spec`: source, decodeMode, chunkSize, record (path or None)."""
+    _child_setup(f"camera:{eye}")
+    from cameras.CameraFactory import CameraFactory
+    from cameras.FrameStore import FrameRecorder
+
+    link = _Link(conn)
+    cap = CameraFactory.get_camera_from_string_type(spec["source"], spec["decodeMode"], spec["chunkSize"])
+    recorder = FrameRecorder(cap, spec["record"]) if spec["record"] else None
+    writer = _RingWriter(eye, link, wake)
+    cap.subscribe(writer)
+    cap.open()
+
+    side = "Left" if eye == "L" else "Right"
+    last = [time.perf_counter(), 0]
+    def log_rate():
+        now = time.perf_counter()
+        if now - last[0] >= 1.0:
+            logging.info(f"{side}: {(writer.count - last[1]) / (now - last[0]):.2f} fps")
+            last[:] = now, writer.count
+
+    try:
+        _serve(link, {}, log_rate)
+    finally:
+        cap.running = False
+        if cap.thread is not None:
+            cap.thread.join(1.0)  # don't block on a stalled stream, the process is ending anyway
+        writer.close()
+        if recorder is not None:
+            recorder.close()
+
+# ----------------------------
+# Inference process
+# ----------------------------
+class _ResultPipe:
+    """InferenceTask's result_queue inside the inference process: put() sends to the main process."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def put(self, item):
+        try:
+            self.conn.send(item)
+        except OSError:
+            raise SystemExit  # main process is gone, ends InferenceTask quietly
+
+    def qsize(self):
+        return 0  # the real queue is in the main process
+
+class RingReader(threading.Thread):
+    """
+    Copies the newest frame of each eye's ring into the FrameMailbox whenever
+    a camera signals, into buffers the inference is done with (FramePool). Frames are renumbered here, so a restarted camera
+    (whose ring starts over at seq 1) doesn't look stale to the mailbox.
+    """
+    def __init__(self, mailbox, wake):
+        super().__init__(daemon=True, name="RingReader")
+        self.mailbox, self.wake = mailbox, wake
+        self.lock  = threading.Lock()
+        self.names = {}   # eye → ring to switch to
+        self.rings = {}   # eye → attached FrameRing
+        self.after = {}   # eye → ring seq last read
+        self.seq   = {eye: 0 for eye in EYES}
+        self.pools = {eye: FramePool(eye=eye) for eye in EYES}  # frames copied out of the rings
+        self.h_handoff = {eye: STATS.hist("ring_handoff", eye=eye) for eye in EYES}
+        self.c_torn    = {eye: STATS.counter("frames_dropped", reason="torn", eye=eye) for eye in EYES}
+
+    def attach(self, eye, name):
+        with self.lock:
+            self.names[eye] = name
+        self.wake.release()
+
+    def _switch(self):
+        with self.lock:
+            names, self.names = self.names, {}
+        for eye, name in names.items():
+            old = self.rings.pop(eye, None)
+            if old is not None:
+                old.close()
+            try:
+                self.rings[eye] = FrameRing.attach(name)
+            except FileNotFoundError:
+                continue  # that camera already moved on, its next ring gets announced
+            self.after[eye] = 0
+            logging.info(f"Reading eye {eye} frames from shared memory {name}")
+
+    def run(self):
+        while True:
+            self.wake.acquire(True, 1.0)
+            while self.wake.acquire(False):
+                pass  # one pass picks up every frame signalled so far
+            if self.names:
+                self._switch()
+            for eye, ring in self.rings.items():
+                pool = self.pools[eye]
+                buf = pool.acquire(ring.shape)
+                got = ring.read(self.after[eye], buf)
+                if got is None:
+                    pool.release(buf)
+                    continue
+                seq, image, ts, decoded = got
+                self.after[eye] = seq
+                if image is None:
+                    pool.release(buf)
+                    self.c_torn[eye].inc()  # overwritten while copying
+                    continue
+                self.seq[eye] += 1
+                self.h_handoff[eye].observe(time.perf_counter() - decoded)
+                self.mailbox.post(eye, Frame(image, self.seq[eye], ts, decoded, pool=pool))
+                pool.release(buf)  # the mailbox holds its own reference now
+
+def inference_main(snapshot, conn, results, wake):
+    """Entry point of the inference process."""
+    _child_setup("inference")
+    from capture import FrameMailbox
+    from config import SharedConfig
+    from inference import InferenceTask
+
+    link = _Link(conn)
+    shared = SharedConfig()
+    shared.publish(snapshot)
+    mailbox = FrameMailbox()
+    InferenceTask(snapshot, mailbox, _ResultPipe(results), shared).start()
+    reader = RingReader(mailbox, wake)
+    reader.start()
+    link.send("ready")
+    _serve(link, {"config": shared.publish, "ring": reader.attach})
+
+# ----------------------------
+# Main process side
+# ----------------------------
+class ResultRelay(threading.Thread):
+    """Feeds results from the (current) inference process into the local queue OSCSenderTask reads."""
+    def __init__(self, results):
+        super().__init__(daemon=True, name="ResultRelay")
+        self.results = results
+        self.conn = None
+        self.cond = threading.Condition()
+
+    def attach(self, conn):
+        with self.cond:
+            self.conn = conn
+            self.cond.notify_all()
+
+    def run(self):
+        done = None
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.conn is not None and self.conn is not done)
+                conn = self.conn
+            try:
+                while True:
+                    self.results.put(conn.recv())
+            except (EOFError, OSError):
+                done = conn  # that process ended, wait for its replacement
+                conn.close()
+
+class _Stage:
+    def __init__(self, name, eye=None):
+        self.name, self.eye = name, eye
+        self.process = None
+        self.link = None
+        self.started = 0.0
+        self.failures = 0
+        self.restart_at = None
+        self.ready = False
+        self.rings = []       # shared memory blocks it announced, unlinked once it exits
+        self.reports = 0      # STATS reports received
+        self.c_restarts = STATS.counter("process_restarts", process=name)
+
+class StageSupervisor(threading.Thread):
+    """
+    Starts the inference process, then (once its models are loaded) one
+    process per camera. Routes ring announcements and settings changes to
+    the inference process, mirrors every child's STATS, and restarts a stage
+    that dies, with exponential backoff. stop() shuts everything down.
+    """
+    def __init__(self, shared, results, cameras):
+        super().__init__(daemon=True, name="StageSupervisor")
+        self.ctx = multiprocessing.get_context("spawn")  # what Windows does anyway, and no forked threads
+        self.shared = shared
+        self.cameras = cameras   # eye → camera_main spec
+        self.wake = self.ctx.Semaphore(0)
+        self.relay = ResultRelay(results)
+        self.stages = {"inference": _Stage("inference")}
+        self.stages.update({eye: _Stage(f"camera:{eye}", eye) for eye in EYES})
+        self.rings = {}          # eye → newest ring name
+        self.models_ready = threading.Event()
+        self.primed = threading.Event()
+        self.failed = None
+        self.stopping = False
+        self._sent_version = None
+        self._reported = threading.Condition()
+
+    # --- lifecycle ---
+    def _launch(self, stage):
+        parent, child = self.ctx.Pipe()
+        if stage.eye is None:
+            recv, send = self.ctx.Pipe(duplex=False)
+            cfg = self.shared.current
+            process = self.ctx.Process(target=inference_main, args=(cfg, child, send, self.wake),
+                                       name=stage.name, daemon=True)
+        else:
+            process = self.ctx.Process(target=camera_main, args=(stage.eye, self.cameras[stage.eye], child, self.wake),
+                                       name=stage.name, daemon=True)
+        process.start()
+        child.close()
+        stage.process, stage.link = process, _Link(parent)
+        stage.started = time.perf_counter()
+        stage.ready = False
+        if stage.eye is None:
+            send.close()  # so the relay sees EOF when the process dies
+            self.relay.attach(recv)
+            self._sent_version = cfg.version
+            for eye, name in self.rings.items():
+                stage.link.send("ring", eye, name)
+        logging.info(f"Started {stage.name} process (pid {process.pid})")
+
+    def _receive(self, stage):
+        try:
+            while stage.link.conn.poll():
+                kind, *args = stage.link.conn.recv()
+                if kind == "stats":
+                    STATS.absorb(args[0], process=stage.name)
+                    with self._reported:
+                        stage.reports += 1
+                        self._reported.notify_all()
+                elif kind == "ready":
+                    stage.ready = True
+                    if not self.models_ready.is_set():
+                        self.models_ready.set()
+                        for eye in EYES:
+                            self._launch(self.stages[eye])
+                elif kind == "ring":
+                    eye, name = args
+                    stage.rings.append(name)
+                    self.rings[eye] = name
+                    self._send(self.stages["inference"], "ring", eye, name)
+                    self.primed.set()
+        except (EOFError, OSError):
+            pass  # the sentinel reports the exit
+
+    def _exited(self, stage):
+        stage.process.join()
+        code = stage.process.exitcode
+        stage.process = None
+        stage.link.conn.close()
+        for name in stage.rings:
+            unlink(name)  # a crashed camera can't clean up after itself
+        stage.rings = []
+        if self.stopping:
+            return
+        if stage.eye is None and not self.models_ready.is_set():
+            self.failed = f"inference process exited ({code}) before the models were loaded"
+            self.stopping = True
+            self.models_ready.set()
+            return
+        ran = time.perf_counter() - stage.started
+        stage.failures = 1 if ran >= STABLE_AFTER else stage.failures + 1
+        delay = min(RESTART_DELAY[1], RESTART_DELAY[0] * 2 ** (stage.failures - 1))
+        logging.error(f"{stage.name} process exited with code {code}, restarting in {delay:.0f} s")
+        stage.restart_at = time.perf_counter() + delay
+
+    def _send(self, stage, *msg):
+        if stage.process is not None:
+            try:
+                stage.link.send(*msg)
+            except OSError:
+                pass  # just died, the restart resends what it needs
+
+    def run(self):
+        self.relay.start()
+        self._launch(self.stages["inference"])
+        while not self.stopping:
+            live = [s for s in self.stages.values() if s.process is not None]
+            waiting = {s.link.conn: s for s in live}
+            exits = {s.process.sentinel: s for s in live}
+            ready = connection.wait(list(waiting) + list(exits), timeout=0.2)
+            for obj in ready:
+                if obj in waiting:
+                    self._receive(waiting[obj])
+            for obj in ready:
+                if obj in exits:
+                    self._exited(exits[obj])
+
+            now = time.perf_counter()
+            for stage in self.stages.values():
+                if stage.restart_at is not None and now >= stage.restart_at and not self.stopping:
+                    stage.restart_at = None
+                    stage.c_restarts.inc()
+                    self._launch(stage)
+
+            # settings changed → new snapshot for the inference process
+            cfg = self.shared.current
+            inference = self.stages["inference"]
+            if inference.process is not None and cfg.version != self._sent_version:
+                self._sent_version = cfg.version
+                self._send(inference, "config", cfg)
+
+    def stop(self, timeout=3.0):
+        """Ask every stage to exit, terminate the ones that don't, remove the rings."""
+        self.stopping = True
+        if self.is_alive():
+            self.join()
+        live = [s for s in self.stages.values() if s.process is not None]
+        for stage in live:
+            self._send(stage, "stop")
+        deadline = time.perf_counter() + timeout
+        for stage in live:
+            stage.process.join(max(0.0, deadline - time.perf_counter()))
+            if stage.process.is_alive():
+                logging.warning(f"{stage.name} process didn't stop, terminating it")
+                stage.process.terminate()
+                stage.process.join(1.0)
+            self._exited(stage)
+
+    # --- telemetry ---
+    def processes(self):
+        """{stage name: pid} of the running child processes."""
+        return {s.name: s.process.pid for s in self.stages.values() if s.process is not None}
+
+    def reset_stats(self):
+        STATS.reset()
+        for stage in self.stages.values():
+            self._send(stage, "reset_stats")
+
+    def sync_stats(self, timeout=2.0):
+        """Wait until every child has sent a fresh STATS report."""
+        live = [s for s in self.stages.values() if s.process is not None]
+        with self._reported:
+            before = {s: s.reports for s in live}
+        for stage in live:
+            self._send(stage, "stats")
+        with self._reported:
+            self._reported.wait_for(lambda: all(s.reports > n or s.process is None for s, n in before.items()),
+                                    timeout)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Offline quantization: INT8 (static, calibrated on eye frames) and FP16
+variants of the converted models, plus a speed/accuracy report against FP32.
+Pick one with "modelVariant" in Settings.json.
+
+    python quantize_models.py --frames rec/left.mjr                 # int8 + fp16 for every model
+    python quantize_models.py --variants int8 --models left_theta right_theta
+
+Run convert_models.py first. Writes <model>.<variant>.onnx and its fused
+post-processing version <model>.<variant>.post.onnx next to the FP32 files,
+their manifest entries and modelFile/quantization_report.json.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+from onnxruntime.quantization.shape_inference import quant_pre_process
+from onnxruntime.transformers.float16 import convert_float_to_float16
+
+from benchmarks.eye_frames import decoded_frames, model_feeds
+from fuse_postprocess import export_fused
+from model_manifest import (
+    MODEL_VARIANTS,
+    base_key,
+    manifest_entry,
+    onnx_paths,
+    read_manifest,
+    stale_models,
+    write_manifest,
+)
+from sessions import get_onnx_providers, model_options, session_options
+
+REPORT_NAME = "quantization_report.json"
+
+# --------------------------------
+# Building variants
+# --------------------------------
+class FeedReader(CalibrationDataReader):
+    def __init__(self, feeds):
+        self.feeds = iter(feeds)
+
+    def get_next(self):
+        return next(self.feeds, None)
+
+def export_int8(fp32_path, out_path, calibration_feeds):
+    """Static QDQ quantization, per-channel int8 weights, uint8 activations calibrated on real frames."""
+    with tempfile.TemporaryDirectory() as tmp:
+        # the merged stereo graphs import the default opset once per eye, the quantizer wants it once
+        model = onnx.load(fp32_path)
+        opsets = {(o.domain, o.version): o for o in model.opset_import}
+        del model.opset_import[:]
+        model.opset_import.extend(opsets.values())
+        src_path = os.path.join(tmp, "src.onnx")
+        onnx.save(model, src_path)
+
+        pre_path = os.path.join(tmp, "pre.onnx")
+        try:
+            # shape inference + folding, helps the quantizer. Only the batch dim is dynamic,
+            # the symbolic pass isn't needed
+            quant_pre_process(src_path, pre_path, skip_symbolic_shape=True)
+        except Exception as e:
+            logging.warning(f"  pre-processing failed ({e}), quantizing the model as is")
+            pre_path = src_path
+        quantize_static(
+            pre_path, out_path, FeedReader(calibration_feeds),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+        )
+
+def export_fp16(fp32_path, out_path):
+    """FP16 weights and compute; inputs/outputs stay float32 so the runtime feeds don't change."""
+    model = convert_float_to_float16(onnx.load(fp32_path), keep_io_types=True)
+    onnx.save(model, out_path)
+
+# --------------------------------
+# Report
+# --------------------------------
+def time_session(sess, feeds, repeats=5):
+    for feed in feeds[:5]:
+        sess.run(None, feed)
+    times = []
+    for _ in range(repeats):
+        for feed in feeds:
+            t0 = time.perf_counter()
+            sess.run(None, feed)
+            times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+def model_errors(key, reference, outputs):
+    """
+    Gaze models: angle error in degrees, hypot of the pitch and yaw deltas per
+    eye. Openness models: absolute openness error. Summarised as mean/p95/max.
+    """
+    ref = np.concatenate([np.concatenate([o.reshape(-1) for o in outs]) for outs in reference])
+    got = np.concatenate([np.concatenate([o.reshape(-1) for o in outs]) for outs in outputs])
+    diff = got.astype(np.float64) - ref.astype(np.float64)
+    if key.endswith("_theta"):
+        err, metric = np.hypot(diff[0::2], diff[1::2]), "gaze_error_deg"
+    else:
+        err, metric = np.abs(diff), "openness_error"
+    return {"metric": metric, "mean": float(err.mean()), "p95": float(np.percentile(err, 95)),
+            "max": float(err.max())}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--model-dir", help="defaults to modelFile in --settings")
+    ap.add_argument("--settings", default="./Settings.json")
+    ap.add_argument("--frames", help=".mjr recording, multipart stream or directory of .jpg (default: synthetic)")
+    ap.add_argument("--variants", nargs="*", default=["int8", "fp16"], choices=MODEL_VARIANTS[1:])
+    ap.add_argument("--models", nargs="*", help="session keys (default: all)")
+    ap.add_argument("--calibration", type=int, default=200, help="frames used for INT8 calibration")
+    ap.add_argument("--eval", type=int, default=100, help="held-out frames for the accuracy report")
+    ap.add_argument("--force", action="store_true", help="rebuild variants even if up to date")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s", datefmt="%H:%M:%S")
+    with open(args.settings) as f:
+        cfg = json.load(f)
+    model_dir = args.model_dir or cfg["modelFile"]
+    fp32_paths = onnx_paths(model_dir)
+    keys = args.models or list(fp32_paths)
+    stale = stale_models(model_dir, keys)
+    if stale:
+        raise SystemExit(f"FP32 models out of date ({', '.join(stale)}), run convert_models.py first")
+
+    # every 4th frame is held out for evaluation, the rest calibrates
+    frames = decoded_frames(args.frames, cfg.get("decodeMode", "color"), args.calibration + args.eval)
+    eval_frames = frames[::4] or frames
+    calib_frames = [f for i, f in enumerate(frames) if i % 4] or frames
+    providers = get_onnx_providers()
+    options = cfg.get("sessionOptions", {})
+
+    manifest = read_manifest(model_dir)
+    models = manifest.setdefault("models", {})
+    report = {}
+    for key in keys:
+        fp32 = ort.InferenceSession(fp32_paths[key], sess_options=session_options(model_options(options, key)),
+                                    providers=providers)
+        eval_feeds = model_feeds(fp32, eval_frames, len(eval_frames))
+        reference = [fp32.run(None, feed) for feed in eval_feeds]
+        base_ms = time_session(fp32, eval_feeds)
+        report[key] = {"fp32": {"latency_ms": base_ms}}
+
+        for variant in args.variants:
+            out_path = onnx_paths(model_dir, variant)[key]
+            if args.force or stale_models(model_dir, [key], variant):
+                logging.info(f"{key}: building {variant} → {os.path.basename(out_path)}")
+                if variant == "int8":
+                    export_int8(fp32_paths[key], out_path, model_feeds(fp32, calib_frames, len(calib_frames)))
+                else:
+                    export_fp16(fp32_paths[key], out_path)
+                models[os.path.basename(out_path)] = manifest_entry(model_dir, key, variant)
+                write_manifest(model_dir, manifest)
+            if args.force or stale_models(model_dir, [key], variant, fused=True):
+                fused_path = onnx_paths(model_dir, variant, fused=True)[key]
+                export_fused(out_path, fused_path, base_key(key))
+                models[os.path.basename(fused_path)] = manifest_entry(model_dir, key, variant, fused=True)
+                write_manifest(model_dir, manifest)
+
+            sess = ort.InferenceSession(out_path, sess_options=session_options(model_options(options, key)),
+                                        providers=providers)
+            outputs = [sess.run(None, feed) for feed in eval_feeds]
+            latency = time_session(sess, eval_feeds)
+            report[key][variant] = {"latency_ms": latency, "speedup": base_ms / latency,
+                                    **model_errors(base_key(key), reference, outputs)}
+
+    report_path = os.path.join(model_dir, REPORT_NAME)
+    with open(report_path, "w") as f:
+        json.dump({"providers": providers, "eval_frames": len(eval_frames),
+                   "calibration_frames": len(calib_frames), "models": report}, f, indent=4)
+
+    print(f"\n{'model':16s} {'variant':7s} {'ms':>8s} {'speedup':>8s}   error (mean / p95 / max)")
+    for key, variants in report.items():
+        for variant, r in variants.items():
+            line = f"{key:16s} {variant:7s} {r['latency_ms']:8.3f}"
+            if variant != "fp32":
+                unit = "deg" if r["metric"] == "gaze_error_deg" else "openness"
+                line += f" {r['speedup']:7.2f}x   {r['mean']:.4f} / {r['p95']:.4f} / {r['max']:.4f} {unit}"
+            print(line)
+    print(f"\nReport written to {report_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+import logging
+import os
+import threading
+import time
+from queue import Full, Queue
+
+import numpy as np
+
+from cameras.CameraFactory import CameraFactory
+from cameras.FramePool import release
+from cameras.ICameraSource import resolve_frames
+from cameras.JpegDecode import decode_pool
+from capture import FrameMailbox
+from config import ConfigSnapshot, ConfigTask, SharedConfig, validate
+from helpers import openness_to_osc, theta_to_osc
+from inference import capture_times, eye_shape, eye_tensors, preprocess_into, session_feeds
+from model_manifest import GRAY_SPECS, base_key
+from osc import OSCSenderTask
+from sessions import MODEL_HEADS, ModelPool, session_key
+from stats import STATS, StatsServer
+
+# ----------------------------
+# Server mode: many headsets, one process
+# ----------------------------
+# The profiles file is a Settings.json with a "users" list; each entry is
+# one headset and overrides the top-level settings for it:
+#
+#   { ...Settings.json..., "serverMaxBatch": 8,
+#     "users": [{"name": "booth-1", "leftEye": "...", "rightEye": "...", "vrcOsc": "...", "pitchOffset": 4},
+#               {"name": "booth-2", ...}] }
+#
+# Every user shares one ModelPool (one copy of each session, one ORT thread
+# pool). Each cycle, the users due for an update go through every session
+# they need in one batched run per session; post-processing uses each
+# user's own tuning (in NumPy, the fused graphs take one set per run).
+# Stats carry a user=<name> label.
+
+EYES = ("L", "R")
+SERVER_KEYS = ("users", "serverMaxBatch")
+# how the sessions are built and served, the same for everyone
+SHARED_KEYS = ("modelFile", "modelVariant", "sessionOptions", "optimizedModelCache",
+               "fusedPostprocess", "statsPort", "multiProcess", "decodeThreads")
+FEED_EYES = {"combined": "LR", "stereo": "LR", "left": "L", "right": "R"}
+
+def user_settings(raw, user):
+    """One user's effective settings: the top level with their profile on top."""
+    base = {k: v for k, v in raw.items() if k not in SERVER_KEYS}
+    return {**base, **{k: v for k, v in user.items() if k != "name"}}
+
+def validate_profiles(raw):
+    """Problems with a parsed profiles file, as a list of messages (empty = fine)."""
+    if not isinstance(raw, dict):
+        return ["top level must be an object"]
+    users = raw.get("users")
+    if not isinstance(users, list) or not users or not all(isinstance(u, dict) for u in users):
+        return ["users must be a non-empty list of objects"]
+    problems = []
+    max_batch = raw.get("serverMaxBatch", 8)
+    if isinstance(max_batch, bool) or not isinstance(max_batch, int) or max_batch < 1:
+        problems.append("serverMaxBatch must be a positive int")
+    seen = set()
+    for i, user in enumerate(users):
+        name = user.get("name")
+        if not isinstance(name, str) or not name:
+            problems.append(f"users[{i}]: name is missing")
+            continue
+        if name in seen:
+            problems.append(f"users[{i}]: name {name} is used twice")
+        seen.add(name)
+        shared = sorted(set(user) & set(SHARED_KEYS))
+        if shared:
+            problems.append(f"{name}: {', '.join(shared)} can only be set for everyone")
+        problems += [f"{name}: {p}" for p in validate(user_settings(raw, user))]
+    return problems
+
+class ServerSnapshot:
+    """One version of the profiles file: a ConfigSnapshot per user, all with the same version."""
+    def __init__(self, raw, version):
+        self.version = version
+        self.max_batch = raw.get("serverMaxBatch", 8)
+        self.users = {u["name"]: ConfigSnapshot(user_settings(raw, u), version) for u in raw["users"]}
+        # SHARED_KEYS are equal for every user, any of them will do
+        self.models = next(iter(self.users.values()))
+
+    @property
+    def model_key(self):
+        return self.models.get("sessionOptions"), self.models.get("modelVariant", "fp32")
+
+    def required_models(self):
+        return set().union(*(cfg.required_models for cfg in self.users.values()))
+
+class ServerConfigTask(ConfigTask):
+    """ConfigTask for the profiles file."""
+    def validate(self, raw):
+        return validate_profiles(raw)
+
+    def snapshot(self, raw, version):
+        return ServerSnapshot(raw, version)
+
+# ----------------------------
+# One headset
+# ----------------------------
+class Tenant:
+    """A user's settings, cameras, latest-frame mailbox, model inputs and OSC sender."""
+    def __init__(self, name, cfg, cond, shape, decoders=None):
+        self.name = name
+        labels = {"user": name}
+        self.shared = SharedConfig()
+        self.shared.publish(cfg)
+        self.cfg = cfg
+        self.mailbox = FrameMailbox(cond, labels)
+        self.results = Queue(maxsize=5)
+        self.osc = OSCSenderTask(self.results, self.shared, labels)
+
+        decode_mode = cfg.get("decodeMode", "color")
+        chunk_size  = cfg.get("mjpegChunkSize", 1024)
+        lazy        = cfg.get("lazyDecode", False)
+        self.capL = CameraFactory.get_camera_from_string_type(cfg["leftEye"], decode_mode, chunk_size, lazy, decoders)
+        self.capR = CameraFactory.get_camera_from_string_type(cfg["rightEye"], decode_mode, chunk_size, lazy, decoders)
+        self.capL.subscribe(lambda frame: self.mailbox.post("L", frame))
+        self.capR.subscribe(lambda frame: self.mailbox.post("R", frame))
+
+        # this user's rows of the batched inputs
+        self.tensors = eye_tensors(shape)
+        self.feeds = session_feeds(self.tensors, np.array([[0.75]], np.float32))
+        self.frames = dict.fromkeys(EYES)
+        self.prepared = set()
+        self.outputs = {}
+        self.last = {"tL": (0.0, 0.0), "tR": (0.0, 0.0), "t_comb": (0.0, 0.0), "oL": 0.0, "oR": 0.0}
+        self.next_due = 0.0
+
+        self.h_latency    = STATS.hist("capture_to_result", **labels)
+        self.c_inferences = STATS.counter("inferences", **labels)
+        self.c_dropped    = STATS.counter("results_dropped", **labels)
+
+    def start(self):
+        self.osc.start()
+        self.capL.open()
+        self.capR.open()
+
+    def take(self):
+        """
+        Pick up the newest frames and settings for this cycle (called under the
+        mailbox lock, so lazyDecode frames are still undecoded, see _next_batch).
+        """
+        self.frames = dict(zip(EYES, self.mailbox.take(0, resolve=False)))
+        self.cfg = self.shared.current
+        self.prepared.clear()
+        self.outputs = {}
+
+    def keys(self):
+        """Sessions this user needs for the frames it has, like InferenceTask at governor level 0."""
+        haveL, haveR = (self.frames[eye] is not None for eye in EYES)
+        keys = []
+        for active, independent, combined, left, right, stereo in MODEL_HEADS:
+            if not self.cfg.get(active, False):
+                continue
+            if not self.cfg.get(independent, False):
+                if haveL and haveR:  # combined model needs *both* eyes
+                    keys.append(combined)
+            elif self.cfg.get("batchedEyes", False) and haveL and haveR:
+                keys.append(stereo)
+            else:
+                keys += [key for key, have in ((left, haveL), (right, haveR)) if have]
+        return [session_key(self.cfg, key) for key in keys]
+
+    def prepare(self, key, resized, gray):
+        suffix = "_gray" if key in GRAY_SPECS else ""
+        for eye in FEED_EYES[key.split("_")[0]]:
+            if eye + suffix not in self.prepared:
+                preprocess_into(self.frames[eye].image, self.tensors[eye + suffix], resized, gray)
+                self.prepared.add(eye + suffix)
+
+    def store(self, key, raw):
+        """Post-process one run's raw rows (one per eye) with this user's tuning into the result."""
+        out, cfg, key = self.outputs, self.cfg, base_key(key)
+        if key.endswith("_theta"):
+            rows = [tuple(r) for r in theta_to_osc(raw, cfg.offset_fraction, cfg["verticalExaggeration"],
+                                                   cfg["horizontalExaggeration"]).tolist()]
+            if key == "combined_theta":
+                out["t_comb"] = rows[0]
+            elif key == "stereo_theta":
+                out["tL"], out["tR"] = rows
+            else:
+                out["t" + key[0].upper()] = rows[0]
+        else:
+            values = openness_to_osc(raw.reshape(-1), cfg.openness_handles).tolist()
+            if key == "combined_open":
+                out["oL"] = out["oR"] = values[0]
+            elif key == "stereo_open":
+                out["oL"], out["oR"] = values
+            else:
+                out["o" + key[0].upper()] = values[0]
+
+    def finish(self, start, done):
+        """Hand this cycle's result to the OSC sender and schedule the next update."""
+        out = self.outputs
+        for k, v in self.last.items():
+            out.setdefault(k, v)
+        self.last.update({k: out[k] for k in self.last})
+
+        captured = capture_times(self.frames.values())
+        for frame in self.frames.values():
+            release(frame)  # preprocessed, pooled buffers can be reused
+        out["_t_result"] = done
+        if captured is not None:
+            out["_ts"] = captured[1]
+        try:
+            self.results.put_nowait(out)
+        except Full:
+            self.c_dropped.inc()  # this user's OSC sender is behind, don't hold up everyone else
+        if captured is not None:
+            self.h_latency.observe(done - captured[0])
+        self.c_inferences.inc()
+
+        limit = self.cfg.get("infrencePerSecondLimit", None)
+        self.next_due = max(self.next_due + 1.0 / limit, start) if limit and limit > 0 else 0.0
+
+# ----------------------------
+# Batched inference across users
+# ----------------------------
+class BatchedInferenceTask(threading.Thread):
+    """
+    Server mode's one inference loop. Each cycle takes the users that have a
+    new frame and are due under their own infrencePerSecondLimit, at most
+    serverMaxBatch of them, round-robin from where the last cycle stopped so
+    a busy headset can't starve the others. Their eye frames go through each
+    session in one batched run (row per user) and every user's result goes
+    to their own OSC sender.
+    """
+    def __init__(self, shared, pool, tenants, cond):
+        super().__init__(daemon=True, name="BatchedInferenceTask")
+        self.shared = shared
+        self.pool = pool
+        self.tenants = tenants
+        self.by_name = {t.name: t for t in tenants}
+        self.cond = cond
+        self.next = 0   # round-robin position
+        self.version = shared.current.version
+        self.model_key = shared.current.model_key
+
+        _, h, w, c = tenants[0].tensors["L"].shape
+        self._resized = np.zeros((h, w, c), np.uint8)
+        self._gray    = np.zeros((h, w), np.uint8)
+
+        self.h_cycle = STATS.hist("server_cycle")
+        self.h_run   = {}
+        self.c_rows  = {}   # model → users run, / runs = mean batch size
+        self.c_runs  = {}
+        STATS.gauge("server_users", lambda: len(self.tenants))
+
+    def _configure(self, snap):
+        self.version = snap.version
+        for name, cfg in snap.users.items():
+            tenant = self.by_name.get(name)
+            if tenant is None:
+                logging.warning(f"New user {name}: restart the server to add users")
+            else:
+                tenant.shared.publish(cfg)
+        for name in set(self.by_name) - set(snap.users):
+            logging.warning(f"User {name} was removed from the profiles, still served until a restart")
+        if snap.model_key != self.model_key:
+            self.model_key = snap.model_key
+            self.pool.configure(snap.models.get("sessionOptions"), snap.models.get("modelVariant", "fp32"))
+        self.pool.request(snap.required_models())
+
+    def _next_batch(self, max_batch):
+        """Users to run this cycle, their frames taken. Empty after a second without any."""
+        def ready():
+            now = time.perf_counter()
+            order = self.tenants[self.next:] + self.tenants[:self.next]
+            return [t for t in order if t.next_due <= now and t.mailbox.pending()]
+
+        with self.cond:
+            batch = ready()
+            if not batch:
+                # sleep until a frame arrives or the next user becomes due
+                now = time.perf_counter()
+                self.cond.wait(min([t.next_due - now for t in self.tenants if t.next_due > now] + [1.0]))
+                batch = ready()
+            batch = batch[:max_batch]
+            for tenant in batch:
+                tenant.take()
+        if batch:
+            self.next = (self.tenants.index(batch[-1]) + 1) % len(self.tenants)
+            # lazyDecode: decode everyone's frames now that the cameras can post again, spread over the pool
+            frames = resolve_frames([t.frames[eye] for t in batch for eye in EYES])
+            for i, tenant in enumerate(batch):
+                tenant.frames = dict(zip(EYES, frames[2 * i:2 * i + 2]))
+            batch = [t for t in batch if any(f is not None for f in t.frames.values())]  # corrupt JPEGs
+        return batch
+
+    def _run(self, key, group):
+        """One session over every user in `group`, batched when the model takes a dynamic batch."""
+        sess = self.pool.get(key)
+        if sess is None:
+            return  # still loading
+        for tenant in group:
+            tenant.prepare(key, self._resized, self._gray)
+        metas = sess.get_inputs()
+        t0 = time.perf_counter()
+        if len(group) > 1 and not isinstance(metas[0].shape[0], int):
+            feeds = {meta.name: np.concatenate([t.feeds[key][i] for t in group])
+                     for i, meta in enumerate(metas)}
+            outs = sess.run(None, feeds)
+            rows = [[out[i:i + 1] for out in outs] for i in range(len(group))]
+            runs = 1
+        else:
+            rows = [sess.run(None, {meta.name: arr for meta, arr in zip(metas, t.feeds[key])}) for t in group]
+            runs = len(group)
+        dt = time.perf_counter() - t0
+
+        if key not in self.h_run:
+            self.h_run[key]  = STATS.hist("run", model=key)
+            self.c_rows[key] = STATS.counter("batch_rows", model=key)
+            self.c_runs[key] = STATS.counter("batch_runs", model=key)
+        self.h_run[key].observe(dt)
+        self.c_rows[key].inc(len(group))
+        self.c_runs[key].inc(runs)
+        for tenant, out in zip(group, rows):
+            tenant.store(key, np.concatenate(out))  # one row per eye
+
+    def run(self):
+        while True:
+            snap = self.shared.current
+            if snap.version != self.version:
+                self._configure(snap)
+            batch = self._next_batch(snap.max_batch)
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            jobs = {}
+            for tenant in batch:
+                for key in tenant.keys():
+                    jobs.setdefault(key, []).append(tenant)
+            for key, group in jobs.items():
+                self._run(key, group)
+            done = time.perf_counter()
+            for tenant in batch:
+                tenant.finish(start, done)
+            self.h_cycle.observe(done - start)
+
+# ----------------------------
+# Startup
+# ----------------------------
+def start_server(path):
+    """Start the profile watcher, shared models, every user's cameras and OSC, and the inference loop."""
+    shared = SharedConfig()
+    ServerConfigTask(path, shared).start()
+    snap = None
+    while snap is None:
+        snap = shared.wait(0.1)
+    cfg = snap.models
+
+    if cfg.get("statsPort", 0):
+        StatsServer(cfg["statsPort"]).start()
+    if cfg.get("fusedPostprocess", False):
+        logging.info("Server mode post-processes per user, using the unfused models")
+
+    cache_dir = (os.path.join(cfg["modelFile"], ".ortcache")
+                 if cfg.get("optimizedModelCache", True) else None)
+    pool = ModelPool(cfg["modelFile"], cache_dir, cfg.get("sessionOptions"), cfg.get("modelVariant", "fp32"))
+    sessions = pool.load(snap.required_models() or {"left_theta"})  # input shape comes from a session
+    shape = eye_shape(sessions)
+
+    cond = threading.Condition()
+    # one decode pool for every user's lazyDecode cameras
+    lazy = any(user_cfg.get("lazyDecode", False) for user_cfg in snap.users.values())
+    decoders = decode_pool(cfg.get("decodeThreads", 1)) if lazy else None
+    tenants = [Tenant(name, user_cfg, cond, shape, decoders) for name, user_cfg in snap.users.items()]
+    task = BatchedInferenceTask(shared, pool, tenants, cond)
+    task.start()
+    for tenant in tenants:
+        tenant.start()
+    logging.info(f"Serving {len(tenants)} users: {', '.join(t.name for t in tenants)}")
+    return task
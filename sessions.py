@@ -0,0 +1,315 @@
+import os
+import logging
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+import onnxruntime as ort
+from model_manifest import POST_INPUTS, onnx_paths, read_manifest, stale_models
+
+# --------------------------------
+# Providers
+# --------------------------------
+def get_onnx_providers():
+    """
+    Return a list of ONNX Runtime providers, preferring GPU if available.
+    """
+    available = ort.get_available_providers()
+    logging.info(f"ONNX Runtime providers available: {available}")
+    if "CUDAExecutionProvider" in available:
+        # per-session tuning lives in Settings.json "sessionOptions"
+        return ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    else:
+        return ["CPUExecutionProvider"]
+
+# --------------------------------
+# Session options
+# --------------------------------
+# Settings.json "sessionOptions": {"default": {...}, "<session key>": {...}}.
+# Per-model entries override "default"; anything left out stays ORT's default.
+#   intraOpThreads     threads one operator may use (0 = ORT picks, all cores)
+#   interOpThreads     threads for independent branches, "parallel" mode only
+#   graphOptimization  "disabled" | "basic" | "extended" | "all"
+#   executionMode      "sequential" | "parallel"
+#   allowSpinning      keep idle pool threads busy-waiting for the next run
+GRAPH_OPTIMIZATION = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic"   : ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all"     : ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel"  : ort.ExecutionMode.ORT_PARALLEL,
+}
+SESSION_OPTION_KEYS = ("intraOpThreads", "interOpThreads", "graphOptimization", "executionMode", "allowSpinning")
+
+def model_options(options, key):
+    """Effective sessionOptions entry for one session key."""
+    return {**options.get("default", {}), **options.get(key, {})}
+
+def session_options(spec):
+    """ort.SessionOptions from one sessionOptions entry."""
+    unknown = set(spec) - set(SESSION_OPTION_KEYS)
+    if unknown:
+        logging.warning(f"Ignoring unknown sessionOptions: {', '.join(sorted(unknown))}")
+
+    opts = ort.SessionOptions()
+    if "intraOpThreads" in spec:
+        opts.intra_op_num_threads = int(spec["intraOpThreads"])
+    if "interOpThreads" in spec:
+        opts.inter_op_num_threads = int(spec["interOpThreads"])
+    if "graphOptimization" in spec:
+        if spec["graphOptimization"] not in GRAPH_OPTIMIZATION:
+            raise ValueError(f"graphOptimization must be one of {tuple(GRAPH_OPTIMIZATION)}")
+        opts.graph_optimization_level = GRAPH_OPTIMIZATION[spec["graphOptimization"]]
+    if "executionMode" in spec:
+        if spec["executionMode"] not in EXECUTION_MODES:
+            raise ValueError(f"executionMode must be one of {tuple(EXECUTION_MODES)}")
+        opts.execution_mode = EXECUTION_MODES[spec["executionMode"]]
+    if "allowSpinning" in spec:
+        flag = "1" if spec["allowSpinning"] else "0"
+        opts.add_session_config_entry("session.intra_op.allow_spinning", flag)
+        opts.add_session_config_entry("session.inter_op.allow_spinning", flag)
+    return opts
+
+# --------------------------------
+# Tensor helpers
+# --------------------------------
+ORT_DTYPES = {
+    "tensor(float)"  : np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)" : np.float64,
+    "tensor(int64)"  : np.int64,
+    "tensor(int32)"  : np.int32,
+}
+
+def concrete_shape(shape, batch: int = 1):
+    """Replace symbolic/unknown dims: batch for the leading one, 1 elsewhere."""
+    return tuple(d if isinstance(d, int) else (batch if i == 0 else 1)
+                 for i, d in enumerate(shape))
+
+# --------------------------------
+# Which sessions the settings need
+# --------------------------------
+# (on/off setting, independent setting, combined, left, right, stereo)
+MODEL_HEADS = (
+    ("activeOpennessTracking", "independentOpenness", "combined_open",  "left_open",  "right_open",  "stereo_open"),
+    ("activeEyeTracking",      "independentEyes",     "combined_theta", "left_theta", "right_theta", "stereo_theta"),
+)
+
+# settings that change which sessions are needed or how they're built
+MODEL_SETTINGS = ("activeOpennessTracking", "independentOpenness", "activeEyeTracking",
+                  "independentEyes", "batchedEyes", "governor", "sessionOptions", "modelVariant",
+                  "fusedPostprocess", "decodeMode")
+
+def session_key(cfg, key):
+    """The session that runs model `key`: its single-channel twin for decodeMode "reducedGray" frames."""
+    return f"{key}_gray" if cfg.get("decodeMode", "color") == "reducedGray" else key
+
+def required_models(cfg):
+    """Session keys InferenceTask runs with these settings at full governor level."""
+    keys = set()
+    for active, independent, combined, left, right, stereo in MODEL_HEADS:
+        if not cfg.get(active, False):
+            continue
+        if cfg.get(independent, False):
+            keys |= {left, right}  # also the single-eye fallback when batched
+            if cfg.get("batchedEyes", False):
+                keys.add(stereo)
+        else:
+            keys.add(combined)
+    return {session_key(cfg, key) for key in keys}
+
+def reads_both_eyes(cfg, combined=False):
+    """
+    True if an active head runs a model that takes both eyes: a combined one
+    (configured, or forced by the governor with `combined`) or, with
+    batchedEyes, a stereo one. Per-eye models are happy with either eye alone.
+    """
+    return any(cfg.get(active, False) and (combined or not cfg.get(independent, False)
+                                           or cfg.get("batchedEyes", False))
+               for active, independent, *_ in MODEL_HEADS)
+
+def standby_models(cfg):
+    """Sessions that can be needed at short notice: the combined models the governor falls back to."""
+    if not cfg.get("governor", False):
+        return set()
+    return {session_key(cfg, combined) for active, _, combined, *_ in MODEL_HEADS if cfg.get(active, False)}
+
+# --------------------------------
+# Session pool
+# --------------------------------
+class ModelPool:
+    """
+    Creates InferenceSessions on demand, several at once on a small loader
+    pool, and warms each one up before handing it out. With `cache_dir` the
+    ORT-optimized graph is saved on first load and reused by later starts.
+    """
+    WARMUP_RUNS = 2
+
+    def __init__(self, model_dir, cache_dir=None, options=None, variant="fp32", fused=False, workers=4):
+        self.model_dir = model_dir
+        self.variant = variant
+        self.fused = fused
+        self.paths = onnx_paths(model_dir, variant, fused)
+        self.cache_dir = cache_dir
+        self.options = options or {}
+        self.providers = get_onnx_providers()
+        logging.info(f"Using providers: {self.providers}")
+        self.sessions = {}
+        self.pending = {}   # key → Future
+        self.failed = set() # not retried in the background, load() still tries
+        self.generation = {}  # key → number of the latest submitted build
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(workers, os.cpu_count() or 1)),
+                                           thread_name_prefix="ModelLoader")
+
+    def _check(self, keys, variant=None, fused=None):
+        variant = variant or self.variant
+        fused = self.fused if fused is None else fused
+        stale = stale_models(self.model_dir, keys, variant, fused)
+        if stale:
+            tool = "convert_models.py" if variant == "fp32" else "quantize_models.py"
+            kind = f"{variant}{' fused' if fused else ''}"
+            raise RuntimeError(
+                f"{kind} ONNX models in {self.model_dir} are missing or out of date ({', '.join(stale)}). "
+                f"Run: python {tool} --model-dir {self.model_dir}")
+
+    def _cache_path(self, key, level):
+        """
+        Optimized graph location, keyed by model hash, optimization level, ORT
+        version, provider and machine: optimized graphs may use CPU-specific
+        kernels (NCHWc).
+        """
+        name = os.path.basename(self.paths[key])
+        entry = read_manifest(self.model_dir).get("models", {}).get(name, {})
+        tag = "-".join([entry.get("sha256", "unknown")[:16], level, ort.__version__,
+                        self.providers[0].replace("ExecutionProvider", "").lower(),
+                        platform.node() or "host"])
+        return os.path.join(self.cache_dir, f"{os.path.splitext(name)[0]}.{tag}.onnx")
+
+    def _create(self, key, generation):
+        spec = model_options(self.options, key)
+        opts = session_options(spec)
+        level = spec.get("graphOptimization", "all")
+        path = self.paths[key]
+        cached = tmp = None
+        if self.cache_dir and level != "disabled":
+            cached = self._cache_path(key, level)
+            if os.path.exists(cached):
+                # already optimized for this machine, skip the optimizer
+                path = cached
+                opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            else:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = f"{cached}.{threading.get_ident()}.tmp"
+                opts.optimized_model_filepath = tmp
+
+        # Create the session with GPU if available
+        sess = ort.InferenceSession(path, sess_options=opts, providers=self.providers)
+        if tmp is not None and os.path.exists(tmp):
+            os.replace(tmp, cached)
+
+        # first runs allocate arenas and pick kernels, pay that here and not on the first frame
+        feeds = {meta.name: (np.array(POST_INPUTS[meta.name], np.float32) if meta.name in POST_INPUTS
+                             else np.zeros(concrete_shape(meta.shape), ORT_DTYPES[meta.type]))
+                 for meta in sess.get_inputs()}
+        for _ in range(self.WARMUP_RUNS):
+            sess.run(None, feeds)
+
+        logging.info(f"Model {key} ready on {sess.get_providers()[0]}"
+                     + (" (cached optimized graph)" if path == cached else ""))
+        with self.lock:
+            if generation == self.generation[key]:  # a newer rebuild wins
+                self.sessions[key] = sess
+                self.pending.pop(key, None)
+                self.failed.discard(key)
+        return sess
+
+    def _submit(self, keys, reload=False):
+        """Start loading whichever of `keys` isn't loaded or loading yet. Returns their futures."""
+        futures = []
+        with self.lock:
+            for key in keys:
+                if key in self.sessions and not reload:
+                    continue
+                future = self.pending.get(key)
+                if future is None or reload:
+                    self.generation[key] = self.generation.get(key, 0) + 1
+                    future = self.pending[key] = self.executor.submit(self._create, key, self.generation[key])
+                    future.add_done_callback(lambda f, key=key: self._failed(key, f))
+                futures.append(future)
+        return futures
+
+    def _failed(self, key, future):
+        if future.exception() is not None:
+            logging.error(f"Loading model {key} failed: {future.exception()}")
+            with self.lock:
+                if self.pending.get(key) is future:
+                    del self.pending[key]
+                    self.failed.add(key)
+
+    def load(self, keys):
+        """Load `keys` in parallel and block until all are ready. Raises on the first failure."""
+        keys = set(keys)
+        self._check(keys)
+        done, _ = wait(self._submit(keys))
+        for future in done:
+            future.result()
+        return {key: self.sessions[key] for key in keys}
+
+    def request(self, keys):
+        """Load `keys` in the background."""
+        keys = {key for key in keys
+                if key not in self.sessions and key not in self.pending and key not in self.failed}
+        if keys:
+            try:
+                self._check(keys)
+            except RuntimeError as e:
+                logging.error(e)
+                self.failed |= keys
+                return
+            self._submit(keys)
+
+    def configure(self, options, variant="fp32", fused=False):
+        """
+        New sessionOptions / modelVariant / fusedPostprocess: affected sessions
+        are rebuilt in the background and swapped in, the old ones keep
+        running meanwhile.
+        """
+        options = options or {}
+        with self.lock:
+            changed = set()
+            if (variant, fused) != (self.variant, self.fused):
+                try:
+                    self._check(set(self.sessions), variant, fused)
+                except (RuntimeError, ValueError) as e:
+                    logging.error(f"Staying on the current models: {e}")
+                else:
+                    logging.info(f"Models: {self.variant}{' fused' if self.fused else ''} → "
+                                 f"{variant}{' fused' if fused else ''}")
+                    self.variant, self.fused = variant, fused
+                    self.paths = onnx_paths(self.model_dir, variant, fused)
+                    self.failed.clear()
+                    changed |= set(self.sessions)
+            if options != self.options:
+                old, self.options = self.options, options
+                changed |= {key for key in self.sessions
+                            if model_options(old, key) != model_options(options, key)}
+            if changed:
+                logging.info(f"Rebuilding {', '.join(sorted(changed))}")
+                self._submit(changed, reload=True)
+
+    def get(self, key):
+        """The session if it's ready, else None (and it starts loading in the background)."""
+        sess = self.sessions.get(key)
+        if sess is None:
+            self.request((key,))
+        return sess
+
+def load_models(model_dir, keys=None, cache_dir=None, options=None, variant="fp32", fused=False):
+    """Load (all or `keys`) sessions in parallel, blocking. Returns {key: session}."""
+    pool = ModelPool(model_dir, cache_dir, options, variant, fused)
+    return pool.load(keys or pool.paths)
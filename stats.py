@@ -0,0 +1,260 @@
+import json
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ----------------------------
+# Pipeline telemetry
+# ----------------------------
+# Stage latencies go into fixed log-scale histograms (10 µs … ~30 s, 15% wide
+# buckets), so observe() is a bisect and an increment under a lock. Percentiles
+# cover the last one to two rotation windows. Everything is served as JSON
+# (/stats) and Prometheus text (/metrics) by StatsServer.
+
+BOUNDS = [1e-5 * 1.15 ** i for i in range(107)]
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "mlet_"
+
+class Histogram:
+    def __init__(self, window: float = 10.0):
+        self.lock = threading.Lock()
+        self.window = window
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.cur  = [0] * (len(BOUNDS) + 1)
+            self.prev = [0] * (len(BOUNDS) + 1)
+            self.rotated = time.monotonic()
+            self.count = 0     # lifetime, for Prometheus _count/_sum
+            self.sum = 0.0
+
+    def observe(self, seconds: float):
+        i = bisect_left(BOUNDS, seconds)
+        with self.lock:
+            self._rotate()
+            self.cur[i] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def _rotate(self):
+        now = time.monotonic()
+        if now - self.rotated >= self.window:
+            # a long idle gap means the previous window is stale too
+            self.prev = self.cur if now - self.rotated < 2 * self.window else [0] * len(self.cur)
+            self.cur = [0] * len(self.cur)
+            self.rotated = now
+
+    def state(self):
+        """Bucket counts and totals, for handing to another process."""
+        with self.lock:
+            self._rotate()
+            return self.cur[:], self.prev[:], self.count, self.sum
+
+    def load(self, state):
+        """Take over a state() from another process."""
+        cur, prev, count, total = state
+        with self.lock:
+            self.cur, self.prev = list(cur), list(prev)
+            self.count, self.sum = count, total
+            self.rotated = time.monotonic()
+
+    def percentiles(self, qs=QUANTILES):
+        """Upper bucket bound (seconds) for each quantile over the recent windows."""
+        with self.lock:
+            self._rotate()
+            counts = [a + b for a, b in zip(self.cur, self.prev)]
+        total = sum(counts)
+        if not total:
+            return [math.nan for _ in qs]
+        out = []
+        for q in qs:
+            target, acc = q * total, 0
+            for i, c in enumerate(counts):
+                acc += c
+                if acc >= target:
+                    out.append(BOUNDS[i] if i < len(BOUNDS) else math.inf)
+                    break
+        return out
+
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, n: int = 1):
+        with self.lock:
+            self.value += n
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def _labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hists = {}
+        self.counters = {}
+        self.gauges = {}
+        self.clashes = set()  # metric names already warned about
+
+    def hist(self, stage: str, **labels) -> Histogram:
+        """Histogram of a pipeline stage's duration. Fetch once and keep it."""
+        key = _key(stage, labels)
+        with self.lock:
+            h = self.hists.get(key)
+            if h is None:
+                h = self.hists[key] = Histogram()
+        return h
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = _key(name, labels)
+        with self.lock:
+            c = self.counters.get(key)
+            if c is None:
+                c = self.counters[key] = Counter()
+        return c
+
+    def gauge(self, name: str, fn, **labels):
+        """Register a callable that returns the gauge's current value when scraped."""
+        with self.lock:
+            self.gauges[_key(name, labels)] = fn
+
+    def reset(self):
+        """Forget all observations (benchmarks call this after warm-up). Gauges stay."""
+        for h in list(self.hists.values()):
+            h.clear()
+        for c in list(self.counters.values()):
+            with c.lock:
+                c.value = 0
+
+    def export(self):
+        """Everything as plain data (picklable), gauges evaluated now."""
+        return {
+            "hists":    [(name, labels, h.state()) for (name, labels), h in self._items(self.hists)],
+            "counters": [(name, labels, c.value) for (name, labels), c in self._items(self.counters)],
+            "gauges":   [(name, labels, _safe(fn)) for (name, labels), fn in self._items(self.gauges)],
+        }
+
+    def absorb(self, data, **extra):
+        """Mirror another process's export(), with `extra` labels added to every entry."""
+        for name, labels, state in data["hists"]:
+            self.hist(name, **dict(labels), **extra).load(state)
+        for name, labels, value in data["counters"]:
+            c = self.counter(name, **dict(labels), **extra)
+            with c.lock:
+                c.value = value
+        for name, labels, value in data["gauges"]:
+            self.gauge(name, lambda value=value: value, **dict(labels), **extra)
+
+    def _items(self, table):
+        with self.lock:
+            return sorted(table.items())
+
+    def to_json(self):
+        stages, counters, gauges = [], [], []
+        for (name, labels), h in self._items(self.hists):
+            p50, p95, p99 = h.percentiles()
+            stages.append({"stage": name, **dict(labels), "count": h.count,
+                           "mean_ms": h.sum / h.count * 1000 if h.count else None,
+                           "p50_ms": _ms(p50), "p95_ms": _ms(p95), "p99_ms": _ms(p99)})
+        for (name, labels), c in self._items(self.counters):
+            counters.append({"name": name, **dict(labels), "value": c.value})
+        for (name, labels), fn in self._items(self.gauges):
+            gauges.append({"name": name, **dict(labels), "value": _safe(fn)})
+        return {"stages": stages, "counters": counters, "gauges": gauges}
+
+    def to_prometheus(self):
+        lines = []
+        kinds = {}  # metric family -> kind its "# TYPE" line declared
+
+        def family(name, kind):
+            """TYPE line before a family's first sample; False if the name is another kind's."""
+            seen = kinds.get(name)
+            if seen is None:
+                kinds[name] = kind
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+            elif seen != kind:
+                if name not in self.clashes:
+                    self.clashes.add(name)
+                    logging.warning(f"Stats: {kind} {METRIC_PREFIX}{name} clashes with a {seen}, left out of /metrics")
+                return False
+            return True
+
+        family("stage_seconds", "summary")
+        kinds["stage_seconds_sum"] = kinds["stage_seconds_count"] = "summary"  # its samples too
+        for (name, labels), h in self._items(self.hists):
+            lbl = (("stage", name),) + labels
+            for q, v in zip(QUANTILES, h.percentiles()):
+                lines.append(f"{METRIC_PREFIX}stage_seconds{_labels(lbl, quantile=q)} {_prom(v)}")
+            lines.append(f"{METRIC_PREFIX}stage_seconds_sum{_labels(lbl)} {h.sum}")
+            lines.append(f"{METRIC_PREFIX}stage_seconds_count{_labels(lbl)} {h.count}")
+
+        for (name, labels), c in self._items(self.counters):
+            if family(f"{name}_total", "counter"):
+                lines.append(f"{METRIC_PREFIX}{name}_total{_labels(labels)} {c.value}")
+        for (name, labels), fn in self._items(self.gauges):
+            if family(name, "gauge"):
+                lines.append(f"{METRIC_PREFIX}{name}{_labels(labels)} {_prom(_safe(fn))}")
+        return "\n".join(lines) + "\n"
+
+def _prom(v):
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return "NaN" if math.isnan(v) else repr(v)
+
+def _ms(v):
+    return None if math.isnan(v) or math.isinf(v) else round(v * 1000, 3)
+
+def _safe(fn):
+    try:
+        return float(fn())
+    except Exception:
+        return math.nan
+
+# Process-wide registry
+STATS = Stats()
+
+# ----------------------------
+# Local HTTP endpoint
+# ----------------------------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path in ("/", "/stats"):
+            body = json.dumps(self.server.stats.to_json(), indent=1).encode()
+            ctype = "application/json"
+        elif path == "/metrics":
+            body = self.server.stats.to_prometheus().encode()
+            ctype = "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass  # scrapes would flood the console
+
+class StatsServer(threading.Thread):
+    """Serves STATS on http://<host>:<port>/stats (JSON) and /metrics (Prometheus)."""
+    def __init__(self, port: int, host: str = "127.0.0.1", stats: Stats = STATS):
+        super().__init__(daemon=True, name="StatsServer")
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stats = stats
+        logging.info(f"Stats endpoint on http://{host}:{port}/stats and /metrics")
+
+    def run(self):
+        self.httpd.serve_forever()
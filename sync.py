@@ -0,0 +1,153 @@
+import time
+
+from cameras.FramePool import release, retain
+from cameras.ICameraSource import resolve_frames
+from sessions import reads_both_eyes
+from stats import STATS
+
+# ----------------------------
+# Stereo frame synchronizer
+# ----------------------------
+class StereoSync:
+    """
+    Pairs left/right frames from the FrameMailbox by capture timestamp.
+
+    Two frames pair when their timestamps are within `stereoMaxSkewMs`. A
+    frame whose partner is already newer than the skew budget can never
+    pair and is dropped. When only one eye has arrived, it waits at most
+    `stereoDeadlineMs` (from that frame's capture time) and then follows
+    `stereoDeadlinePolicy`:
+        "single" → hand the lone eye over on its own
+        "reuse"  → pair it with the last frame used for the other eye,
+                   marked `reused` so latency stats and filters skip it
+    With `stereoSync` off, or while only per-eye models run (nothing to
+    pair for), frames pass straight through as they arrive.
+
+    `queued` is how long the emitted fresh frames waited in the mailbox
+    (the longer of the two), not counting the time spent here waiting for
+    a partner.
+    """
+    POLICIES = ("single", "reuse")
+
+    def __init__(self, mailbox):
+        self.mailbox = mailbox
+        self.pending = {"L": None, "R": None}
+        self.pending_queued = {"L": 0.0, "R": 0.0}  # mailbox wait of the pending frames
+        self.last    = {"L": None, "R": None}
+        self.queued  = 0.0
+        self.wait_start = None  # capture time of the oldest lone frame
+
+        self.reset_stats()
+        self.counters = {kind: STATS.counter("stereo_sync", result=kind)
+                         for kind in ("paired", "single", "reused", "dropped")}
+        self.skew_hist = STATS.hist("stereo_skew")
+
+    def reset_stats(self):
+        self.paired = self.single = self.reused = self.dropped = 0
+        self.skew_sum = self.skew_max = 0.0
+
+    def summary(self):
+        """One log line of pairing stats since the last call, then reset."""
+        mean = self.skew_sum / self.paired * 1000 if self.paired else 0.0
+        line = (f"Stereo sync: paired={self.paired} single={self.single} reused={self.reused} "
+                f"dropped={self.dropped} skew mean={mean:.1f}ms max={self.skew_max * 1000:.1f}ms")
+        self.reset_stats()
+        return line
+
+    def next(self, cfg, timeout=1.0, combined=False):
+        """
+        Return the next (frameL, frameR) to run inference on. Either may be
+        None for a single-eye update; (None, None) means nothing arrived in
+        time. `combined`: the governor has switched to the combined models.
+        """
+        if not cfg.get("stereoSync", False) or not reads_both_eyes(cfg, combined):
+            fL, fR = self.mailbox.take(timeout)
+            for eye, f in (("L", fL), ("R", fR)):
+                if f is not None:
+                    self.pending_queued[eye] = self.mailbox.queued[eye]
+            return self._emit(fL, fR)
+
+        max_skew = cfg.get("stereoMaxSkewMs", 8) / 1000.0
+        deadline = cfg.get("stereoDeadlineMs", 15) / 1000.0
+        policy   = cfg.get("stereoDeadlinePolicy", "single")
+        give_up  = time.perf_counter() + timeout
+
+        while True:
+            pL, pR = self.pending["L"], self.pending["R"]
+            if pL is not None and pR is not None:
+                skew = abs(pL.ts - pR.ts)
+                if skew <= max_skew:
+                    self.paired += 1
+                    self.counters["paired"].inc()
+                    self.skew_hist.observe(skew)
+                    self.skew_sum += skew
+                    self.skew_max = max(self.skew_max, skew)
+                    return self._emit(pL, pR)
+                # the older frame's partner has already been passed by
+                older = "L" if pL.ts < pR.ts else "R"
+                release(self.pending[older])
+                self.pending[older] = None
+                self.dropped += 1
+                self.counters["dropped"].inc()
+                self.wait_start = self.pending["R" if older == "L" else "L"].ts
+                continue
+
+            now = time.perf_counter()
+            if pL is not None or pR is not None:
+                wait = self.wait_start + deadline - now
+                if wait <= 0:
+                    return self._expire(pL, pR, policy)
+            else:
+                wait = give_up - now
+                if wait <= 0:
+                    return None, None
+
+            fL, fR = self.mailbox.take(wait, resolve=False)  # lazyDecode: only decode what gets emitted
+            for eye, f in (("L", fL), ("R", fR)):
+                if f is None:
+                    continue
+                if self.pending[eye] is not None:
+                    self.dropped += 1  # superseded before a partner showed up
+                    self.counters["dropped"].inc()
+                    release(self.pending[eye])
+                elif self.wait_start is None:
+                    self.wait_start = f.ts
+                self.pending[eye] = f
+                self.pending_queued[eye] = self.mailbox.queued[eye]
+
+    def _expire(self, pL, pR, policy):
+        if policy == "reuse":
+            if pL is None and self.last["L"] is not None:
+                self.reused += 1
+                self.counters["reused"].inc()
+                return self._emit(self._reuse("L"), pR)
+            if pR is None and self.last["R"] is not None:
+                self.reused += 1
+                self.counters["reused"].inc()
+                return self._emit(pL, self._reuse("R"))
+        self.single += 1
+        self.counters["single"].inc()
+        return self._emit(pL, pR)
+
+    def _reuse(self, eye):
+        frame = self.last[eye]._replace(reused=True)
+        retain(frame)  # the consumer's reference, `last` keeps its own
+        return frame
+
+    def _emit(self, fL, fR):
+        # pending frames that aren't going out (stereoSync just switched off) are done with
+        for eye, f in (("L", fL), ("R", fR)):
+            if self.pending[eye] is not None and self.pending[eye] is not f:
+                release(self.pending[eye])
+        self.queued = max([self.pending_queued[eye] for eye, f in (("L", fL), ("R", fR))
+                           if f is not None and not f.reused] or [0.0])
+        fL, fR = resolve_frames((fL, fR))
+        self.pending["L"] = self.pending["R"] = None
+        self.wait_start = None
+        # keep the last fresh frame per eye for "reuse", with a reference of its own
+        for eye, f in (("L", fL), ("R", fR)):
+            if f is not None and not f.reused:
+                retain(f)
+                release(self.last[eye])
+                self.last[eye] = f
+        return fL, fR
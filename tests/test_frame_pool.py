@@ -0,0 +1,192 @@
+import time
+import unittest
+
+import numpy as np
+import requests
+
+from capture import FrameMailbox
+from cameras.FramePool import FramePool, release, retain
+from cameras.ICameraSource import Frame, ICameraSource
+from sync import StereoSync
+
+SHAPE = (4, 4)
+
+def refs(pool, buf):
+    """References the pool counts for `buf`, 0 if it's free or not pooled."""
+    entry = pool.held.get(id(buf))
+    return entry[1] if entry is not None else 0
+
+def is_free(pool, buf):
+    return any(b is buf for b in pool.free)
+
+def pooled_frame(pool, seq, ts=None):
+    ts = time.perf_counter() if ts is None else ts
+    return Frame(pool.acquire(SHAPE), seq, ts, ts, pool=pool)
+
+class StubCamera(ICameraSource):
+    """A source driven by the test: _publish()/_publish_jpeg() are called directly."""
+    def __init__(self):
+        super().__init__()
+        self.session = requests.Session()  # release() closes it
+
+    def _update(self):
+        pass
+
+class FramePoolTest(unittest.TestCase):
+    def test_buffer_is_reused_only_after_the_last_release(self):
+        pool = FramePool(limit=4)
+        buf = pool.acquire(SHAPE)
+        pool.retain(buf)
+        self.assertEqual(refs(pool, buf), 2)
+
+        pool.release(buf)
+        self.assertIsNot(pool.acquire(SHAPE), buf)  # still held once
+        pool.release(buf)
+        self.assertTrue(is_free(pool, buf))
+        self.assertIs(pool.acquire(SHAPE), buf)
+        self.assertEqual(refs(pool, buf), 1)
+
+    def test_release_of_a_free_buffer_is_ignored(self):
+        pool = FramePool(limit=4)
+        buf = pool.acquire(SHAPE)
+        pool.release(buf)
+        pool.release(buf)  # a double release must not free it twice
+        self.assertEqual(len(pool.free), 1)
+        self.assertTrue(is_free(pool, buf))
+        self.assertIs(pool.acquire(SHAPE), buf)
+        self.assertIsNot(pool.acquire(SHAPE), buf)
+
+    def test_buffers_over_the_limit_are_not_pooled(self):
+        pool = FramePool(limit=2)
+        allocs = pool.allocs.value  # STATS counters are shared by every unlabelled pool
+        bufs = [pool.acquire(SHAPE) for _ in range(3)]
+        self.assertEqual(len(pool.held), 2)
+        for buf in bufs:
+            pool.release(buf)
+        self.assertEqual(len(pool.free), 2)
+        self.assertFalse(is_free(pool, bufs[2]))
+        self.assertEqual(pool.allocs.value - allocs, 3)
+
+    def test_free_buffers_of_another_shape_are_dropped(self):
+        pool = FramePool(limit=4)
+        old = pool.acquire(SHAPE)
+        pool.release(old)
+        new = pool.acquire((8, 8))
+        self.assertEqual(new.shape, (8, 8))
+        self.assertEqual(pool.free, [])
+
+    def test_detached_buffer_is_never_reused(self):
+        pool = FramePool(limit=4)
+        buf = pool.acquire(SHAPE)
+        pool.retain(buf)
+        pool.detach(buf)
+        pool.release(buf)
+        pool.release(buf)
+        self.assertEqual(pool.free, [])
+        self.assertIsNot(pool.acquire(SHAPE), buf)
+
+    def test_frame_helpers_skip_unpooled_frames(self):
+        retain(None)
+        release(None)
+        frame = Frame(np.zeros(SHAPE, np.uint8), 1, 0.0, 0.0)
+        retain(frame)
+        release(frame)
+
+class MailboxOwnershipTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = FramePool(limit=8)
+        self.mailbox = FrameMailbox()
+
+    def test_overwritten_frame_is_released(self):
+        first = pooled_frame(self.pool, 1)
+        self.mailbox.post("L", first)
+        self.assertEqual(refs(self.pool, first.image), 2)  # the source's and the slot's
+        release(first)  # the source moved on
+
+        self.mailbox.post("L", pooled_frame(self.pool, 2))
+        self.assertTrue(is_free(self.pool, first.image))
+
+    def test_taken_frame_belongs_to_the_consumer(self):
+        first = pooled_frame(self.pool, 1)
+        self.mailbox.post("L", first)
+        release(first)
+        fL, fR = self.mailbox.take(0)
+        self.assertIs(fL, first)
+        self.assertIsNone(fR)
+
+        # overwriting a taken frame must not release the consumer's reference
+        self.mailbox.post("L", pooled_frame(self.pool, 2))
+        self.assertEqual(refs(self.pool, first.image), 1)
+        release(fL)
+        self.assertTrue(is_free(self.pool, first.image))
+
+    def test_reuse_policy_keeps_exact_counts(self):
+        sync = StereoSync(self.mailbox)
+        cfg = {"stereoSync": True, "activeEyeTracking": True, "stereoDeadlineMs": 0,
+               "stereoDeadlinePolicy": "reuse"}
+        now = time.perf_counter()
+        left, right = pooled_frame(self.pool, 1, now), pooled_frame(self.pool, 1, now)
+        self.mailbox.post("L", left)
+        self.mailbox.post("R", right)
+        release(left)
+        release(right)
+        for f in sync.next(cfg, timeout=0.1):
+            release(f)
+        # StereoSync keeps the pair for "reuse"
+        self.assertEqual((refs(self.pool, left.image), refs(self.pool, right.image)), (1, 1))
+
+        newer = pooled_frame(self.pool, 2)
+        self.mailbox.post("L", newer)
+        release(newer)
+        fL, fR = sync.next(cfg, timeout=0.1)
+        self.assertIs(fL, newer)
+        self.assertTrue(fR.reused)
+        self.assertIs(fR.image, right.image)
+        self.assertEqual(refs(self.pool, right.image), 2)  # `last` and the consumer
+        self.assertTrue(is_free(self.pool, left.image))  # replaced in `last`
+        release(fL)
+        release(fR)
+        self.assertEqual(refs(self.pool, right.image), 1)
+        self.assertEqual(refs(self.pool, newer.image), 1)
+
+class SourceOwnershipTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = FramePool(limit=8)
+        self.cam = StubCamera()
+        self.cam.open()
+
+    def tearDown(self):
+        self.cam.release()
+
+    def test_source_releases_its_frame_when_replaced(self):
+        first = self.pool.acquire(SHAPE)
+        self.cam._publish(first, pool=self.pool)
+        self.assertEqual(refs(self.pool, first), 1)
+        self.cam._publish(self.pool.acquire(SHAPE), pool=self.pool)
+        self.assertTrue(is_free(self.pool, first))
+
+    def test_lazy_jpeg_replaces_a_pooled_frame(self):
+        buf = self.pool.acquire(SHAPE)
+        self.cam._publish(buf, pool=self.pool)
+        self.cam.decode_lazily()
+        self.cam._publish_jpeg(b"\xff\xd8\xff\xd9", time.perf_counter())
+        self.assertIsNone(self.cam.frame_pool)
+        self.assertTrue(is_free(self.pool, buf))
+
+    def test_read_hands_the_buffer_over(self):
+        buf = self.pool.acquire(SHAPE)
+        self.cam._publish(buf, pool=self.pool)
+        ok, image = self.cam.read()
+        self.assertTrue(ok)
+        self.assertIs(image, buf)
+        self.assertNotIn(id(buf), self.pool.held)
+        self.assertIsNot(self.pool.acquire(SHAPE), buf)
+
+    def test_closing_releases_the_last_frame(self):
+        buf = self.pool.acquire(SHAPE)
+        self.cam._publish(buf, pool=self.pool)
+        self.cam.release()
+        self.assertTrue(is_free(self.pool, buf))
+
+if __name__ == "__main__":
+    unittest.main()
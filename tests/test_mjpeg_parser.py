@@ -0,0 +1,100 @@
+import random
+import unittest
+
+import cv2
+import numpy as np
+
+from cameras.MJPEGStreamParser import MAX_HEADER_BYTES, MJPEGStreamParser
+
+BOUNDARY = b"123456789000000000000987654321"
+
+def jpegs(count, size=48, seed=0):
+    """Small real JPEGs (noise compresses poorly, so they still span many chunks)."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(count):
+        img = rng.integers(0, 255, (size, size), np.uint8)
+        ok, jpg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        out.append(jpg.tobytes())
+    return out
+
+def multipart(frames, content_length=True, lengths=None):
+    """A multipart/x-mixed-replace body like the ESP32 cameras send."""
+    parts = []
+    for i, jpg in enumerate(frames):
+        header = b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+        if content_length:
+            header += b"Content-Length: %d\r\n" % (lengths[i] if lengths else len(jpg))
+        parts.append(header + b"\r\n" + jpg + b"\r\n")
+    return b"".join(parts)
+
+def parse(stream, sizes, capacity=256 * 1024):
+    """Feed `stream` in chunks of the given sizes (cycled), return every frame."""
+    parser = MJPEGStreamParser(capacity)
+    frames, pos, i = [], 0, 0
+    while pos < len(stream):
+        n = sizes[i % len(sizes)]
+        frames += parser.feed(stream[pos:pos + n])
+        pos += n
+        i += 1
+    return frames, parser
+
+class MJPEGStreamParserTest(unittest.TestCase):
+    def setUp(self):
+        self.frames = jpegs(6)
+
+    def check_random_chunks(self, stream, capacity=256 * 1024):
+        whole, _ = parse(stream, [len(stream)], capacity)
+        self.assertEqual(whole, self.frames)
+        rng = random.Random(1)
+        for max_chunk in (1, 2, 7, 64, 1000, 5000):
+            sizes = [rng.randint(1, max_chunk) for _ in range(200)]
+            chunked, _ = parse(stream, sizes, capacity)
+            self.assertEqual(chunked, whole, f"chunks up to {max_chunk} bytes")
+
+    def test_random_chunks_with_content_length(self):
+        self.check_random_chunks(multipart(self.frames))
+
+    def test_random_chunks_with_boundary_scanning(self):
+        self.check_random_chunks(multipart(self.frames, content_length=False))
+
+    def test_buffer_grows_and_compacts(self):
+        # capacity well below one frame: every part forces _reserve() to grow or slide data
+        self.check_random_chunks(multipart(self.frames), capacity=64)
+        self.check_random_chunks(multipart(self.frames, content_length=False), capacity=64)
+
+    def test_every_split_point(self):
+        # two reads, split at every byte: through boundaries, headers, SOI and EOI markers
+        frames = jpegs(2, size=16)
+        stream = multipart(frames)
+        for split in range(1, len(stream)):
+            parser = MJPEGStreamParser(64)
+            got = parser.feed(stream[:split]) + parser.feed(stream[split:])
+            self.assertEqual(got, frames, f"split at {split}")
+
+    def test_wrong_content_length_falls_back_to_eoi(self):
+        lengths = [len(jpg) + (5 if i % 2 else -5) for i, jpg in enumerate(self.frames)]
+        # a length past the end can only be found wrong once more bytes arrive
+        stream = multipart(self.frames, lengths=lengths) + b"--" + BOUNDARY + b"--\r\n"
+        frames, parser = parse(stream, [333])
+        self.assertEqual(frames, self.frames)
+        self.assertEqual(parser.bad_lengths, len(self.frames))
+
+    def test_junk_without_soi_is_dropped(self):
+        junk = b"x" * (3 * MAX_HEADER_BYTES)
+        stream = junk + multipart(self.frames)
+        frames, parser = parse(stream, [4096])
+        self.assertEqual(frames, self.frames)
+        self.assertLessEqual(len(parser.buf), 256 * 1024)  # never held all of the junk
+
+    def test_reset_drops_a_partial_frame(self):
+        stream = multipart(self.frames)
+        parser = MJPEGStreamParser()
+        cut = stream.index(self.frames[1]) + len(self.frames[1]) // 2
+        self.assertEqual(parser.feed(stream[:cut]), self.frames[:1])
+        parser.reset()
+        # the reconnected stream starts over with a fresh part
+        self.assertEqual(parser.feed(multipart(self.frames[2:])), self.frames[2:])
+
+if __name__ == "__main__":
+    unittest.main()
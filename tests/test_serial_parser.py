@@ -0,0 +1,99 @@
+import itertools
+import random
+import unittest
+
+from cameras.SerialCameraCapture import ETVR_HEADER, ETVRPacketParser
+
+def payload(i, size=300):
+    """A JPEG-looking payload: SOI, bytes that never form a header, EOI."""
+    rng = random.Random(i)
+    return b"\xff\xd8" + bytes(rng.randrange(0, 0xff) for _ in range(size)) + b"\xff\xd9"
+
+def packet(data, length=None):
+    return ETVR_HEADER + (len(data) if length is None else length).to_bytes(2, "little") + data
+
+def read(parser, data, short=0):
+    """One serial read: reserve/readinto/commit, the driver delivering `short` bytes fewer than asked for."""
+    view = parser.reserve(len(data) + short)
+    view[:len(data)] = data
+    parser.commit(len(data))
+
+PARSERS = itertools.count()
+
+class ETVRPacketParserTest(unittest.TestCase):
+    def parser(self, capacity=256 * 1024):
+        # STATS counters are per label set, give every parser its own
+        return ETVRPacketParser(capacity, source=f"test-{next(PARSERS)}")
+
+    def feed(self, parser, stream, sizes):
+        """Read `stream` in chunks of the given sizes (cycled), drain after every read."""
+        got, pos, i = [], 0, 0
+        while pos < len(stream):
+            n = sizes[i % len(sizes)]
+            read(parser, stream[pos:pos + n], short=i % 3)
+            jpeg = parser.drain()
+            if jpeg is not None:
+                got.append(jpeg)
+            pos += n
+            i += 1
+        return got
+
+    def test_packets_split_across_reads(self):
+        payloads = [payload(i) for i in range(8)]
+        stream = b"".join(packet(p) for p in payloads)
+        rng = random.Random(0)
+        for max_chunk in (1, 3, 6, 50, 299):
+            parser = self.parser(capacity=128)  # grows and compacts along the way
+            got = self.feed(parser, stream, [rng.randint(1, max_chunk) for _ in range(100)])
+            self.assertEqual(got, payloads, f"reads up to {max_chunk} bytes")
+            self.assertEqual(parser.packets, len(payloads))
+            self.assertEqual(parser.dropped.value, 0)
+            self.assertEqual(parser.corrupt.value, 0)
+
+    def test_drain_keeps_only_the_newest_packet(self):
+        payloads = [payload(i) for i in range(4)]
+        parser = self.parser()
+        read(parser, b"".join(packet(p) for p in payloads) + packet(payload(9))[:20])
+        self.assertEqual(parser.drain(), payloads[-1])
+        self.assertEqual(parser.dropped.value, 3)
+        self.assertIsNone(parser.drain())  # the partial one is still coming
+
+    def test_garbage_between_packets(self):
+        payloads = [payload(i) for i in range(5)]
+        junk = [
+            b"\x00\x01\x02" * 40,
+            b"\xff\xa0\xff",                             # header cut short, then a real one
+            ETVR_HEADER + b"\x02\x00" + b"\xff\xd8",    # length too small to hold a JPEG
+            ETVR_HEADER + b"\x10\x00" + b"garbage!",    # payload without SOI
+            b"\xff" * 7,
+        ]
+        stream = b"".join(j + packet(p) for j, p in zip(junk, payloads))
+        for sizes in ([1], [7, 13], [len(stream)]):
+            parser = self.parser()
+            got = self.feed(parser, stream, sizes)
+            if sizes == [len(stream)]:
+                self.assertEqual(got, payloads[-1:])  # one read, one drain: newest only
+            else:
+                self.assertEqual(got, payloads)
+            self.assertEqual(parser.corrupt.value, 2)
+
+    def test_truncated_final_packet(self):
+        payloads = [payload(i) for i in range(3)]
+        stream = b"".join(packet(p) for p in payloads) + packet(payload(7))[:-50]
+        parser = self.parser()
+        self.assertEqual(self.feed(parser, stream, [64]), payloads)
+        self.assertIsNone(parser.drain())
+        # only the unfinished packet stays buffered
+        self.assertEqual(parser.write_pos - parser.read_pos, len(packet(payload(7))) - 50)
+
+    def test_resync_after_a_truncated_packet(self):
+        # the camera restarted mid-packet: the cut packet swallows the start of
+        # the next one (and fails to decode), later packets come through again
+        cut = packet(payload(7))[:-50]
+        payloads = [payload(i) for i in range(4)]
+        stream = cut + b"".join(packet(p) for p in payloads)
+        got = self.feed(self.parser(), stream, [1])
+        self.assertEqual(got[-3:], payloads[-3:])
+
+if __name__ == "__main__":
+    unittest.main()